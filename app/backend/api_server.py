@@ -1,14 +1,33 @@
 # uvicorn api_server:app --host 0.0.0.0 --port 8000 --reload
 
 import os
+import gzip
+import queue
 import shutil
-from fastapi import FastAPI, Request
+import threading
+import uuid
+from typing import Optional
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 # Updated imports after modular refactor
-from parser import ResumeParser, clear_cache  # type: ignore
-from parser.config import CACHE_DIR, VECTOR_DB_DIR  # type: ignore
+from parser import ResumeParser, clear_cache, clear_vector_cache, DirectoryWatcher, get_corpus_registry, get_cache_stats  # type: ignore
+from parser.config import CACHE_DIR, VECTOR_DB_DIR, ENABLE_DIRECTORY_WATCHER, WATCH_DIRS, AI_PROVIDER, UPLOAD_WARM_EMBEDDINGS  # type: ignore
+from parser.metrics import render_metrics, get_trace, get_extract_report  # type: ignore
+from parser.usage import get_usage_report  # type: ignore
+from parser.serialization import dumps  # type: ignore
+from parser.results import save_result, get_result_page, delete_result, SORT_FIELDS  # type: ignore
+from parser.archive import ingest_archive, warm_upload  # type: ignore
 
-app = FastAPI()
+class FastJSONResponse(Response):
+    """JSON through the pluggable serializer (orjson/msgspec when installed) instead of FastAPI's default encoder."""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -20,44 +39,282 @@ app.add_middleware(
 )
 
 agent = ResumeParser()  # Initialize AI agent
+watcher = None
+
+@app.on_event("startup")
+async def start_directory_watcher():
+    """Pre-extract and pre-embed resumes in WATCH_DIRS so queries hit warm data."""
+    global watcher
+    if ENABLE_DIRECTORY_WATCHER and WATCH_DIRS:
+        watcher = DirectoryWatcher(WATCH_DIRS)
+        watcher.start()
+
+@app.on_event("shutdown")
+async def stop_directory_watcher():
+    if watcher:
+        watcher.stop()
+
+def build_summary(result: list, cache_info: dict) -> dict:
+    return {
+        "total_candidates": len(result),
+        "total_resumes_processed": cache_info.get("total_resumes", 0),
+        "resumes_after_filtering": cache_info.get("filtered_resumes", 0),
+        "processing_time": cache_info.get("processing_time", 0),
+        "used_cache": cache_info.get("genai_cache_hit", False) or cache_info.get("vector_cache_hit", False),
+        "corpus_id": cache_info.get("corpus_id"),
+        "trace_id": cache_info.get("trace_id"),
+        "tokens": {
+            "prompt": cache_info.get("prompt_tokens", 0),
+            "cached_prompt": cache_info.get("cached_prompt_tokens", 0),
+            "output": cache_info.get("output_tokens", 0)
+        },
+        "estimated_cost_usd": cache_info.get("estimated_cost_usd", 0.0),
+        "saved_tokens": cache_info.get("saved_prompt_tokens", 0) + cache_info.get("saved_output_tokens", 0),
+        "saved_cost_usd": cache_info.get("saved_cost_usd", 0.0),
+        "near_duplicates": {
+            "skipped_files": cache_info.get("near_duplicate_files", 0),
+            "rate": cache_info.get("near_duplicate_rate", 0.0),
+            "llm_resumes_saved": cache_info.get("llm_resumes_saved", 0)
+        },
+        "normalization": {
+            "chars_saved": cache_info.get("normalization_chars_saved", 0),
+            "tokens_saved": cache_info.get("normalization_tokens_saved", 0),
+            "rate": cache_info.get("normalization_rate", 0.0)
+        }
+    }
+
+# JSON bodies below this size aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+def json_response(request: Request, data) -> Response:
+    """
+    JSON response, gzip-compressed when the client accepts it. Only used for plain JSON
+    payloads: the NDJSON stream is left uncompressed so candidates arrive as they're parsed.
+    """
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def request_trace_id(request: Request) -> str:
+    """
+    Use the caller's X-Request-ID as the trace id so client and server logs line up.
+    The trace id is also sent to Azure, which expects a GUID, so any other value gets a fresh UUID.
+    """
+    header = request.headers.get("x-request-id", "").strip()
+    try:
+        return str(uuid.UUID(header))
+    except ValueError:
+        trace_id = str(uuid.uuid4())
+        if header:
+            print(f"🔖 X-Request-ID {header[:64]!r} is not a UUID; tracing the request as {trace_id}")
+        return trace_id
 
 @app.post("/parse-resume")
 async def parse_resume(request: Request):
     request_data = await request.json()
     directory_path = request_data.get("dirPath")
+    corpus_id = request_data.get("corpusId")
     query_string = request_data.get("query")
     force_analyze = request_data.get("forceAnalyze", False)
+    page_size = request_data.get("pageSize")  # if set, only the first page (best match first) is returned
     
-    print(f"📨 Received request to parse resumes in directory: {directory_path}")
+    print(f"📨 Received request to parse resumes in {'corpus: ' + corpus_id if corpus_id else 'directory: ' + str(directory_path)}")
     print(f"🔍 Query: {query_string}")
     print(f"🔥 Force analyze: {force_analyze}")
     
-    if not directory_path or not query_string:
-        return {"error": "Both 'directory_path' and 'query_string' are required."}
+    if not (directory_path or corpus_id) or not query_string:
+        return {"error": "Either 'dirPath' or 'corpusId', and 'query' are required."}
     
     try:
-        result, cache_info = agent.main(directory_path, query_string, force_analyze)
+        result, cache_info = agent.main(directory_path, query_string, force_analyze, corpus_id=corpus_id,
+                                        trace_id=request_trace_id(request))
         
-        # Enhanced response with performance metrics
+        # Enhanced response with performance metrics; the candidates are stored for GET /results/{id}
+        summary = build_summary(result, cache_info)
+        result_id = save_result(result, cache_info, query_string, summary)
+        summary["result_id"] = result_id
         response_data = {
             "result": result, 
+            "result_id": result_id,
             "cache_info": cache_info,
-            "summary": {
-                "total_candidates": len(result),
-                "total_resumes_processed": cache_info.get("total_resumes", 0),
-                "resumes_after_filtering": cache_info.get("filtered_resumes", 0),
-                "processing_time": cache_info.get("processing_time", 0),
-                "used_cache": cache_info.get("genai_cache_hit", False) or cache_info.get("vector_cache_hit", False)
-            }
+            "summary": summary
         }
+        if page_size and result_id:
+            page = get_result_page(result_id, limit=int(page_size))
+            response_data["result"] = page["result"]
+            response_data["page"] = {k: page[k] for k in ("total", "offset", "limit", "next_offset", "sort", "order")}
         
         print(f"✅ Request completed: {len(result)} candidates found")
-        return response_data
+        return json_response(request, response_data)
         
     except Exception as e:
         print(f"❌ Error processing request: {e}")
         return {"error": f"An error occurred while processing the request: {str(e)}"}
 
+@app.post("/parse-resume/stream")
+async def parse_resume_stream(request: Request):
+    """
+    Same input as /parse-resume, but responds with NDJSON: one {"type": "candidate"} line
+    per candidate as soon as it is parsed from the model's response, then a final
+    {"type": "done"} line with cache_info and summary (or {"type": "error"}).
+    """
+    request_data = await request.json()
+    directory_path = request_data.get("dirPath")
+    corpus_id = request_data.get("corpusId")
+    query_string = request_data.get("query")
+    force_analyze = request_data.get("forceAnalyze", False)
+
+    if not (directory_path or corpus_id) or not query_string:
+        return {"error": "Either 'dirPath' or 'corpusId', and 'query' are required."}
+
+    print(f"📨 Received streaming request for {'corpus: ' + corpus_id if corpus_id else 'directory: ' + str(directory_path)}")
+    events = queue.Queue()
+    trace_id = request_trace_id(request)
+
+    def run():
+        try:
+            result, cache_info = agent.main(directory_path, query_string, force_analyze, corpus_id=corpus_id,
+                                            on_candidate=lambda c: events.put({"type": "candidate", "candidate": c}),
+                                            trace_id=trace_id)
+            summary = build_summary(result, cache_info)
+            summary["result_id"] = save_result(result, cache_info, query_string, summary)
+            events.put({"type": "done", "result_id": summary["result_id"], "cache_info": cache_info, "summary": summary})
+        except Exception as e:
+            print(f"❌ Error processing streaming request: {e}")
+            events.put({"type": "error", "error": f"An error occurred while processing the request: {str(e)}"})
+        events.put(None)
+
+    def ndjson():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield dumps(event) + b"\n"
+
+    threading.Thread(target=run, daemon=True).start()
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers={"X-Trace-Id": trace_id})
+
+@app.get("/results/{result_id}")
+async def get_results(request: Request, result_id: str, offset: int = 0, limit: Optional[int] = None,
+                      sort: str = "match_score", order: str = "desc", fields: Optional[str] = None,
+                      min_score: Optional[float] = None, min_years: Optional[float] = None,
+                      max_years: Optional[float] = None, skill: Optional[str] = None):
+    """
+    A page of a stored search result, without re-running the search. Filters (min_score,
+    min_years, max_years, skill) apply first, then sort (match_score or years_of_experience,
+    order asc/desc) and offset/limit; fields is a comma-separated projection, e.g.
+    fields=name,match_score,source_file.
+    """
+    if sort not in SORT_FIELDS:
+        return {"error": f"sort must be one of {', '.join(SORT_FIELDS)}"}
+    page = get_result_page(result_id, offset, limit, sort, order,
+                           [f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+                           min_score=min_score, min_years=min_years, max_years=max_years, skill=skill)
+    if page is None:
+        return {"error": f"Result '{result_id}' not found (it may have expired)"}
+    return json_response(request, page)
+
+@app.delete("/results/{result_id}")
+async def delete_results(result_id: str):
+    if not delete_result(result_id):
+        return {"success": False, "error": f"Result '{result_id}' not found"}
+    return {"success": True}
+
+@app.post("/corpora")
+async def register_corpus(request: Request):
+    """Register a set of directories as a corpus and return its stable ID."""
+    try:
+        request_data = await request.json()
+        paths = request_data.get("paths") or ([request_data["dirPath"]] if request_data.get("dirPath") else [])
+        missing = [p for p in paths if not os.path.isdir(p)]
+        if not paths or missing:
+            return {"success": False, "error": f"Directories not found: {', '.join(missing) or '(none given)'}"}
+        corpus = get_corpus_registry().register(paths, request_data.get("name"))
+        print(f"📚 Corpus registered: {corpus['id']} ({len(corpus['paths'])} director(ies))")
+        return {"success": True, "corpus": corpus}
+    except Exception as e:
+        print(f"❌ Error registering corpus: {e}")
+        return {"success": False, "error": str(e)}
+
+@app.get("/corpora")
+async def list_corpora():
+    return {"corpora": get_corpus_registry().list()}
+
+@app.delete("/corpora/{corpus_id}")
+async def remove_corpus(corpus_id: str):
+    """Unregister a corpus. Shared text, embeddings and profiles are kept for other corpora."""
+    if get_corpus_registry().remove(corpus_id):
+        return {"success": True}
+    return {"success": False, "error": f"Corpus '{corpus_id}' not found"}
+
+@app.post("/uploads")
+async def upload_archive(request: Request, background_tasks: BackgroundTasks):
+    """
+    Ingest a multipart-uploaded ZIP or TAR ('file' field, optional 'name') as a corpus.
+    Members are extracted in memory straight into the text store; the returned corpus id
+    works with /parse-resume. Embeddings are computed in the background afterwards.
+    """
+    try:
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "file"):
+            return {"success": False, "error": "A 'file' field with a ZIP or TAR archive is required."}
+        print(f"📨 Received archive upload: {upload.filename}")
+        corpus, stats = await run_in_threadpool(ingest_archive, upload.file, upload.filename or "", form.get("name"))
+        if UPLOAD_WARM_EMBEDDINGS:
+            background_tasks.add_task(warm_upload, corpus["id"])
+        return {"success": True, "corpus": corpus, "ingest": stats}
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    except Exception as e:
+        print(f"❌ Error ingesting archive: {e}")
+        return {"success": False, "error": str(e)}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Size, limits and hit/miss/eviction counters for every cache layer."""
+    return {"caches": get_cache_stats()}
+
+@app.get("/usage")
+async def token_usage(days: int = 30):
+    """Token counts, estimated cost and cache savings per day (last `days` days) and per corpus."""
+    return get_usage_report(days)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape: per-phase latency histograms, cache hit ratios, in-flight batches, tokens."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/extract-report")
+async def extract_report():
+    """Files per extraction outcome (ok, truncated, timeout, image_only, error, abandoned) and the slowest files."""
+    return get_extract_report()
+
+@app.get("/traces/{trace_id}")
+async def trace_spans(trace_id: str):
+    """Spans of a recent request (trace_id is in cache_info/summary and the X-Trace-Id header)."""
+    spans = get_trace(trace_id)
+    if spans is None:
+        return {"error": f"Trace '{trace_id}' not found (only recent requests are kept)"}
+    return spans
+
+@app.get("/providers")
+async def provider_status(check: bool = False):
+    """
+    Provider pool members with circuit state and counters (check=true runs their health checks),
+    plus the adaptive batch size / concurrency learned per provider and model.
+    """
+    from parser.providers.adaptive import get_all_limits  # type: ignore
+    if AI_PROVIDER != 'pool':
+        return {"pool": False, "provider": AI_PROVIDER, "adaptive_limits": get_all_limits()}
+    from parser.providers.pool import get_pool  # type: ignore
+    pool = get_pool()
+    return {"pool": True, "providers": pool.check_health() if check else pool.status(), "adaptive_limits": get_all_limits()}
+
 @app.post("/clear-cache")
 async def clear_cache_endpoint(request: Request):
     """Clear cache files."""
@@ -81,9 +338,13 @@ async def clear_cache_endpoint(request: Request):
                 for file in os.listdir(VECTOR_DB_DIR):
                     file_path = os.path.join(VECTOR_DB_DIR, file)
                     try:
-                        os.remove(file_path)
+                        if os.path.isdir(file_path):
+                            shutil.rmtree(file_path)
+                        else:
+                            os.remove(file_path)
                     except Exception as e:
                         print(f"⚠️ Could not delete {file_path}: {e}")
+                clear_vector_cache()
                 print("🗑️ All vector cache cleared via API")
             
             return {"success": True, "message": "All cache cleared successfully"}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring through the provider batch-job APIs (for nightly runs).
+
+Job state lives under DATA_DIR/bulk_jobs/<job_id>/, so every step can be run
+from a separate invocation (e.g. submit from one cron job, ingest from the next).
+
+Usage:
+  python bulk_job.py run --dir ../../resumes --skills "Python,SQL" [--backend local]
+  python bulk_job.py create --dir ../../resumes --skills "Python,SQL"   # write the job file only
+  python bulk_job.py submit|status|wait|ingest|retry <job_id>
+  python bulk_job.py list
+  python bulk_job.py serve          # stand-in batch job server for offline testing
+"""
+
+import sys, json, time
+import argparse
+from parser.config import BULK_BACKEND, BULK_POLL_SECONDS, BULK_RESUMES_PER_REQUEST, BULK_STANDIN_PORT  # type: ignore
+from parser import bulk  # type: ignore
+
+
+def print_state(state: dict):
+    if not state:
+        return
+    results = state.get('results') or {}
+    print(f"  {state['id']}  {state['status']:<9} backend={state['backend']} resumes={state['resumes']} "
+          f"requests={state['batches']} candidates={results.get('candidates', 0)} "
+          f"failed={len(results.get('failed_batches') or [])} created={time.strftime('%Y-%m-%d %H:%M', time.localtime(state['created']))}")
+    if state.get('error'):
+        print(f"    error: {state['error']}")
+
+
+def create(args) -> dict:
+    skills = [s.strip() for s in args.skills.split(',') if s.strip()]
+    if args.corpus:
+        from parser.corpus import get_corpus_registry, load_corpus  # type: ignore
+        corpus = get_corpus_registry().get(args.corpus)
+        if not corpus:
+            raise ValueError(f"Corpus '{args.corpus}' is not registered")
+        near_duplicates = {}
+        resumes_data, _ = load_corpus(corpus, near_duplicates)
+        return bulk.create_job(resumes_data, skills, backend=args.backend, output_mode=args.output_mode,
+                               batch_size=args.batch_size, paths=corpus['paths'], near_duplicates=near_duplicates)
+    return bulk.create_job_for_paths(args.dir, skills, backend=args.backend, output_mode=args.output_mode,
+                                     batch_size=args.batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk scoring jobs via provider batch APIs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("create", "run"):
+        p = commands.add_parser(name, help="write the job file" if name == "create" else "create, submit, wait and ingest")
+        source = p.add_mutually_exclusive_group(required=True)
+        source.add_argument("--dir", action="append", help="resume directory (repeatable)")
+        source.add_argument("--corpus", help="registered corpus id")
+        p.add_argument("--skills", required=True, help="comma-separated skills")
+        p.add_argument("--backend", default=BULK_BACKEND, choices=bulk.BACKENDS, help=f"default: {BULK_BACKEND}")
+        p.add_argument("--output-mode", choices=("full", "compact"), default=None, help="default: OUTPUT_MODE")
+        p.add_argument("--batch-size", type=int, default=BULK_RESUMES_PER_REQUEST, help="resumes per request")
+        p.add_argument("--poll", type=float, default=BULK_POLL_SECONDS, help="seconds between status checks")
+        p.add_argument("--timeout", type=float, default=None, help="stop waiting after this many seconds")
+    for name, help_text in (("submit", "upload and start a created job"), ("status", "poll once; downloads finished results"),
+                            ("wait", "poll until done, then ingest"), ("ingest", "ingest downloaded results into the cache"),
+                            ("retry", "new job for the failed requests of a job"), ("show", "print a job's state")):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("job_id")
+        if name == "wait":
+            p.add_argument("--poll", type=float, default=BULK_POLL_SECONDS, help="seconds between status checks")
+            p.add_argument("--timeout", type=float, default=None, help="stop waiting after this many seconds")
+    commands.add_parser("list", help="list jobs")
+    serve = commands.add_parser("serve", help="run the stand-in batch job server")
+    serve.add_argument("--port", type=int, default=BULK_STANDIN_PORT)
+    args = parser.parse_args()
+
+    print("📦 Bulk Jobs")
+    print("=" * 50)
+    try:
+        if args.command == "list":
+            jobs = bulk.list_jobs()
+            if not jobs:
+                print("No bulk jobs yet.")
+            for state in jobs:
+                print_state(state)
+        elif args.command == "serve":
+            from parser.bulk_server import StandinJobServer  # type: ignore
+            server = StandinJobServer(args.port)
+            print(f"🧪 Stand-in batch job server on {server.endpoint} (Ctrl+C to stop)")
+            try:
+                server.server.serve_forever()
+            except KeyboardInterrupt:
+                server.stop()
+        elif args.command == "create":
+            print_state(create(args))
+        elif args.command == "run":
+            state = bulk.wait_for_job(create(args)['id'], args.poll, args.timeout)
+            print_state(state)
+            return 0 if state['status'] == bulk.INGESTED else 1
+        elif args.command == "show":
+            state = bulk.load_state(args.job_id)
+            if state is None:
+                print(f"❌ Unknown bulk job '{args.job_id}'")
+                return 1
+            print(json.dumps(state, indent=2))
+        else:
+            step = {"submit": bulk.submit_job, "status": bulk.poll_job, "ingest": bulk.ingest_job, "retry": bulk.retry_job,
+                    "wait": lambda job_id: bulk.wait_for_job(job_id, args.poll, args.timeout)}[args.command]
+            print_state(step(args.job_id))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare the legacy 512-word chunking with tokenizer-aware chunking.
+Reports chunks per resume, tokens lost to model truncation, encode time and
+retrieval recall@N, using "resume mentions the skill" as ground truth.
+
+Usage: python chunking_benchmark.py [--dir ../../resumes] [--skills "Python,SQL,..."] [--top-n 10]
+"""
+
+import re
+import sys
+import time
+import argparse
+import numpy as np
+from parser.config import get_embedding_model, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS  # type: ignore
+from parser.chunking import split_text_into_word_chunks, split_text_into_token_chunks  # type: ignore
+from parser.ingest import load_resumes  # type: ignore
+
+DEFAULT_SKILLS = "Python,Java,JavaScript,React,SQL,AWS,Docker,Kubernetes,Machine Learning,Azure,Salesforce,Excel"
+
+
+def chunk_corpus(resumes: dict, chunker) -> list:
+    """Return [(filename, chunk)] for every chunk of every resume."""
+    return [(filename, chunk) for filename, content in resumes.items() for chunk in chunker(content)]
+
+
+def truncated_fraction(chunks: list, tokenizer, max_tokens: int) -> float:
+    """Fraction of chunk tokens beyond the model's max sequence length (never embedded)."""
+    lengths = [len(ids) for ids in tokenizer([c for _, c in chunks], add_special_tokens=True, verbose=False)['input_ids']]
+    total = sum(lengths)
+    return sum(max(0, n - max_tokens) for n in lengths) / total if total else 0.0
+
+
+def recall_at_n(model, resumes: dict, chunks: list, embeddings: np.ndarray, skills: list, top_n: int) -> float:
+    """Mean recall@N over skills; a resume's score is its best chunk similarity."""
+    files = list(resumes)
+    file_index = {f: i for i, f in enumerate(files)}
+    owners = np.array([file_index[f] for f, _ in chunks])
+    queries = model.encode([f"Skills: {s}" for s in skills], convert_to_numpy=True, normalize_embeddings=True)
+    recalls = []
+    for skill, query in zip(skills, queries):
+        pattern = re.compile(rf"(?<!\w){re.escape(skill)}(?!\w)", re.IGNORECASE)
+        relevant = {f for f, content in resumes.items() if pattern.search(content)}
+        if not relevant:
+            continue
+        scores = np.full(len(files), -np.inf, dtype=np.float32)
+        np.maximum.at(scores, owners, embeddings @ query)
+        top = {files[i] for i in np.argsort(-scores)[:top_n]}
+        recalls.append(len(top & relevant) / min(top_n, len(relevant)))
+    return float(np.mean(recalls)) if recalls else 0.0
+
+
+def run_scheme(name: str, model, resumes: dict, chunker, skills: list, top_n: int, max_tokens: int):
+    chunks = chunk_corpus(resumes, chunker)
+    start = time.perf_counter()
+    embeddings = model.encode([c for _, c in chunks], convert_to_numpy=True, normalize_embeddings=True,
+                              show_progress_bar=False)
+    encode_time = time.perf_counter() - start
+    print(f"\n📐 {name}")
+    print(f"  chunks/resume   {len(chunks) / len(resumes):.2f} ({len(chunks)} chunks)")
+    print(f"  truncated       {truncated_fraction(chunks, model.tokenizer, max_tokens):.1%} of tokens")
+    print(f"  encode time     {encode_time:.2f}s ({len(chunks) / encode_time:,.0f} chunks/s)")
+    print(f"  recall@{top_n:<8} {recall_at_n(model, resumes, chunks, embeddings, skills, top_n):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunking scheme benchmark")
+    parser.add_argument("--dir", default="../../resumes", help="directory with resume files")
+    parser.add_argument("--skills", default=DEFAULT_SKILLS, help="comma-separated skill queries")
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    print("🧪 Chunking Benchmark")
+    print("=" * 50)
+    model = get_embedding_model()
+    if model is None or getattr(model, 'tokenizer', None) is None:
+        print("❌ Embedding model with a tokenizer is required (check ENABLE_VECTOR_SEARCH and LOCAL_MODEL_PATH).")
+        return 1
+    resumes = {f: c for f, c in load_resumes(args.dir).items() if c.strip()}
+    if not resumes:
+        print(f"❌ No readable resumes found in '{args.dir}'.")
+        return 1
+    skills = [s.strip() for s in args.skills.split(',') if s.strip()]
+    max_tokens = CHUNK_MAX_TOKENS or model.max_seq_length
+    print(f"📂 {len(resumes)} resumes, {len(skills)} skill queries, model max_seq_length={model.max_seq_length}")
+
+    run_scheme("Legacy: 512 words, 50-word overlap", model, resumes, split_text_into_word_chunks,
+               skills, args.top_n, model.max_seq_length)
+    run_scheme(f"Token-aware: {max_tokens} tokens, {CHUNK_OVERLAP_TOKENS}-token overlap", model, resumes,
+               lambda text: split_text_into_token_chunks(text, model.tokenizer, max_tokens, CHUNK_OVERLAP_TOKENS),
+               skills, args.top_n, model.max_seq_length)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
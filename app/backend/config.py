@@ -1,4 +1,4 @@
-import os
+import os, json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -23,18 +23,47 @@ def get_float_env(key: str, default: float = 0.0) -> float:
     except ValueError:
         return default
 
+def get_json_env(key: str, default=None):
+    """Parse a JSON environment variable (default if unset or invalid)."""
+    try:
+        return json.loads(os.getenv(key, "")) if os.getenv(key) else default
+    except ValueError:
+        print(f"⚠️ Warning: {key} is not valid JSON; using the default")
+        return default
+
+# Storage Configuration
+# Root for cache_dir, vector_db and ingest_db. Defaults to the backend folder so
+# caches don't depend on the directory the server was started from.
+DATA_DIR = os.path.abspath(os.getenv("DATA_DIR", os.path.dirname(os.path.abspath(__file__))))
+
 # AI Provider Configuration
 AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
 
 # Gemini settings
 GEMINI_KEY = os.getenv("GEMINI_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Explicit context cache for the static prompt instructions (implicit prefix caching works without it)
+GEMINI_CONTEXT_CACHE = get_bool_env("GEMINI_CONTEXT_CACHE", False)
+GEMINI_CONTEXT_CACHE_TTL_MINUTES = get_int_env("GEMINI_CONTEXT_CACHE_TTL_MINUTES", 60)
 
 # Azure OpenAI settings (only required if AI_PROVIDER == 'azure')
 AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY", "")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT", "")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
+AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21")
+
+# Provider pool (AI_PROVIDER=pool): batches are spread over several backends in proportion to their rate limits.
+# PROVIDER_POOL is comma-separated "type[:rpm[:concurrency]]" entries, e.g. "gemini:60,azure:300", or a JSON list
+# of members such as {"type": "azure", "deployment": "gpt-4o-eu", "endpoint": "...", "api_key_env": "AZURE_EU_KEY", "rpm": 300}.
+# Unset fields fall back to the GEMINI_* / AZURE_OPENAI_* settings above.
+PROVIDER_POOL = os.getenv("PROVIDER_POOL", "gemini,azure")
+POOL_CONFIG = {
+    "POOL_DEFAULT_RPM": get_int_env("POOL_DEFAULT_RPM", 60),                  # Requests per minute for members without one
+    "POOL_DEFAULT_CONCURRENCY": get_int_env("POOL_DEFAULT_CONCURRENCY", 2),   # Batches in flight per member
+    "POOL_FAILURE_THRESHOLD": get_int_env("POOL_FAILURE_THRESHOLD", 3),       # Consecutive failures that open a member's circuit
+    "POOL_COOLDOWN_SECONDS": get_int_env("POOL_COOLDOWN_SECONDS", 60),        # Time before an open circuit is probed again
+    "POOL_MAX_ATTEMPTS": get_int_env("POOL_MAX_ATTEMPTS", 3),                 # Members tried per batch before giving up
+}
 
 # Performance and Scalability Configuration
 PERFORMANCE_CONFIG = {
@@ -44,8 +73,132 @@ PERFORMANCE_CONFIG = {
     "SIMILARITY_THRESHOLD": get_float_env("SIMILARITY_THRESHOLD", 0.3),
     "BATCH_DELAY_SECONDS": get_int_env("BATCH_DELAY_SECONDS", 1),
     "ENABLE_MEMORY_OPTIMIZATION": get_bool_env("ENABLE_MEMORY_OPTIMIZATION", True),
+    "EMBED_BATCH_SIZE": get_int_env("EMBED_BATCH_SIZE", 64),             # Chunks per encode batch (length-sorted)
+    "EMBED_WORKERS": get_int_env("EMBED_WORKERS", 0),                    # Encoding processes for bulk builds (0 = half the cores)
+    "EMBED_MULTIPROCESS_MIN_CHUNKS": get_int_env("EMBED_MULTIPROCESS_MIN_CHUNKS", 5000),  # Below this, encode in-process
+    # JSON serializer for the KV store, API responses and result files: auto (orjson, then msgspec, then stdlib)
+    "JSON_BACKEND": os.getenv("JSON_BACKEND", "auto").lower(),
+}
+
+# Bulk jobs (bulk_job.py): nightly runs through the providers' asynchronous batch APIs at batch pricing.
+# BULK_BACKEND: 'azure', 'gemini' (needs the google-genai package) or 'local' (offline stand-in job server);
+# empty means AI_PROVIDER. Azure batch jobs need a Global Batch deployment and API version 2024-07-01-preview or later.
+BULK_CONFIG = {
+    "BULK_BACKEND": os.getenv("BULK_BACKEND", "").lower(),
+    "BULK_RESUMES_PER_REQUEST": get_int_env("BULK_RESUMES_PER_REQUEST", 15),
+    "BULK_POLL_SECONDS": get_int_env("BULK_POLL_SECONDS", 60),
+    "AZURE_OPENAI_BATCH_DEPLOYMENT": os.getenv("AZURE_OPENAI_BATCH_DEPLOYMENT", ""),         # Defaults to AZURE_OPENAI_DEPLOYMENT
+    "AZURE_OPENAI_BATCH_API_VERSION": os.getenv("AZURE_OPENAI_BATCH_API_VERSION", "2024-10-21"),
+    "BULK_STANDIN_PORT": get_int_env("BULK_STANDIN_PORT", 8765),
+    "BULK_STANDIN_DELAY_SECONDS": get_int_env("BULK_STANDIN_DELAY_SECONDS", 5),  # Simulated queue time of the stand-in
+}
+
+# Adaptive batching (AIMD): batch size and concurrency grow while batches finish within the target latency,
+# and are cut on 429s, timeouts and oversized-context errors. Learned limits are kept per provider/model.
+ADAPTIVE_CONFIG = {
+    "ADAPTIVE_BATCHING": get_bool_env("ADAPTIVE_BATCHING", False),
+    "ADAPTIVE_MIN_BATCH": get_int_env("ADAPTIVE_MIN_BATCH", 2),
+    "ADAPTIVE_MAX_BATCH": get_int_env("ADAPTIVE_MAX_BATCH", 50),
+    "ADAPTIVE_MAX_CONCURRENCY": get_int_env("ADAPTIVE_MAX_CONCURRENCY", 8),
+    "ADAPTIVE_TARGET_LATENCY_SECONDS": get_float_env("ADAPTIVE_TARGET_LATENCY_SECONDS", 60),
+    "ADAPTIVE_BACKOFF_FACTOR": get_float_env("ADAPTIVE_BACKOFF_FACTOR", 0.5),   # Multiplier applied on back-off
+    "ADAPTIVE_MAX_RETRIES": get_int_env("ADAPTIVE_MAX_RETRIES", 2),             # Re-queues of a throttled/oversized batch
+}
+
+# Token cost accounting: USD per 1M tokens as [input, cached input, output], matched on the longest model (or
+# Azure deployment) name prefix. MODEL_PRICES is JSON that extends or overrides these, e.g. '{"gpt-4o-eu": [2.5, 1.25, 10]}'.
+DEFAULT_MODEL_PRICES = {
+    "gemini-2.5-pro": [1.25, 0.31, 10.00],
+    "gemini-2.5-flash-lite": [0.10, 0.025, 0.40],
+    "gemini-2.5-flash": [0.30, 0.075, 2.50],
+    "gemini-2.0-flash": [0.10, 0.025, 0.40],
+    "gemini-1.5-flash": [0.075, 0.01875, 0.30],
+    "gpt-4o-mini": [0.15, 0.075, 0.60],
+    "gpt-4o": [2.50, 1.25, 10.00],
+    "gpt-4.1-nano": [0.10, 0.025, 0.40],
+    "gpt-4.1-mini": [0.40, 0.10, 1.60],
+    "gpt-4.1": [2.00, 0.50, 8.00],
+}
+COST_CONFIG = {
+    "MODEL_PRICES": {**DEFAULT_MODEL_PRICES, **get_json_env("MODEL_PRICES", {})},
+    "BATCH_API_PRICE_FACTOR": get_float_env("BATCH_API_PRICE_FACTOR", 0.5),   # Bulk job price relative to online calls
+}
+
+# Logging: leveled records go through a queue to a background writer thread, so hot loops never block on stdout.
+# LOG_FORMAT 'text' prints the message as before, 'json' one JSON object per line with level, trace id and fields.
+# Per-file lines are DEBUG; progress lines are throttled to one per percent step and per interval.
+LOGGING_CONFIG = {
+    "LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO").upper(),
+    "LOG_FORMAT": os.getenv("LOG_FORMAT", "text").lower(),
+    "PROGRESS_LOG_PERCENT_STEP": get_float_env("PROGRESS_LOG_PERCENT_STEP", 5),          # Minimum progress between lines
+    "PROGRESS_LOG_INTERVAL_SECONDS": get_float_env("PROGRESS_LOG_INTERVAL_SECONDS", 1),  # Minimum time between lines
+}
+
+# Prompt Configuration
+# PROMPT_MODE: 'full' sends each resume's entire text, 'relevant_chunks' sends only
+# the header chunk plus the chunks most similar to the skill query.
+PROMPT_CONFIG = {
+    "PROMPT_MODE": os.getenv("PROMPT_MODE", "full").lower(),
+    "PROMPT_TOP_K_CHUNKS": get_int_env("PROMPT_TOP_K_CHUNKS", 3),
+    "PROMPT_MAX_TOKENS_PER_RESUME": get_int_env("PROMPT_MAX_TOKENS_PER_RESUME", 1200),
+    "COMPRESSED_RESUMES_PER_BATCH": get_int_env("COMPRESSED_RESUMES_PER_BATCH", 40),
+    # OUTPUT_MODE: 'full' asks for the API's JSON shape; 'compact' enforces a response schema with
+    # short keys and shorter text fields, expanded back to the full shape after parsing
+    "OUTPUT_MODE": os.getenv("OUTPUT_MODE", "full").lower(),
+    "SUMMARY_MAX_WORDS": get_int_env("SUMMARY_MAX_WORDS", 200),
+    "SCORE_BREAKDOWN_MAX_WORDS": get_int_env("SCORE_BREAKDOWN_MAX_WORDS", 50),
+    "COMPACT_SUMMARY_MAX_WORDS": get_int_env("COMPACT_SUMMARY_MAX_WORDS", 60),
+    "COMPACT_SCORE_BREAKDOWN_MAX_WORDS": get_int_env("COMPACT_SCORE_BREAKDOWN_MAX_WORDS", 20),
+}
+
+# Ingestion Configuration
+INGEST_CONFIG = {
+    "ENABLE_RECURSIVE_SCAN": get_bool_env("ENABLE_RECURSIVE_SCAN", True),
+    "ENABLE_DIRECTORY_WATCHER": get_bool_env("ENABLE_DIRECTORY_WATCHER", False),
+    "WATCH_DIRS": [d.strip() for d in os.getenv("WATCH_DIRS", "").split(",") if d.strip()],
+    "WATCHER_POLL_SECONDS": get_int_env("WATCHER_POLL_SECONDS", 30),
+    # Archive uploads (POST /uploads): limits on the uncompressed members read from one archive
+    "UPLOAD_MAX_MB": get_int_env("UPLOAD_MAX_MB", 2048),            # Total size of all resume members
+    "UPLOAD_MAX_FILE_MB": get_int_env("UPLOAD_MAX_FILE_MB", 25),    # Larger members are skipped
+    "UPLOAD_MAX_FILES": get_int_env("UPLOAD_MAX_FILES", 50000),
+    "UPLOAD_INFLIGHT_MB": get_int_env("UPLOAD_INFLIGHT_MB", 128),   # Member bytes held in memory awaiting extraction
+    "UPLOAD_WARM_EMBEDDINGS": get_bool_env("UPLOAD_WARM_EMBEDDINGS", True),  # Embed uploaded resumes in the background
+    # Per-file extraction budgets (0 disables a limit)
+    "EXTRACT_MAX_PAGES": get_int_env("EXTRACT_MAX_PAGES", 40),          # PDF pages read per file
+    "EXTRACT_MAX_CHARS": get_int_env("EXTRACT_MAX_CHARS", 100000),      # Text kept per file
+    "EXTRACT_TIMEOUT_SECONDS": get_float_env("EXTRACT_TIMEOUT_SECONDS", 20),  # Stop reading a file after this long
+    "EXTRACT_PROBE_PAGES": get_int_env("EXTRACT_PROBE_PAGES", 2),        # PDFs with almost no text on these first pages
+    "EXTRACT_MIN_CHARS_PER_PAGE": get_int_env("EXTRACT_MIN_CHARS_PER_PAGE", 40),  # are skipped as image-only scans
+    # Near-duplicate versions of a resume (SimHash distance in bits, out of 64): only the newest is scored
+    "ENABLE_NEAR_DUPLICATES": get_bool_env("ENABLE_NEAR_DUPLICATES", True),
+    "NEAR_DUPLICATE_MAX_DISTANCE": get_int_env("NEAR_DUPLICATE_MAX_DISTANCE", 8),
+    # Clean extracted text once before it is stored: whitespace, repeated page headers/footers, hyphenation, glyphs
+    "ENABLE_TEXT_NORMALIZATION": get_bool_env("ENABLE_TEXT_NORMALIZATION", True),
+}
+
+# Cache Limits (0 disables a limit)
+CACHE_CONFIG = {
+    "CACHE_EVICTION_POLICY": os.getenv("CACHE_EVICTION_POLICY", "lru").lower(),  # lru or lfu
+    "GENAI_CACHE_MAX_MB": get_int_env("GENAI_CACHE_MAX_MB", 512),
+    "GENAI_CACHE_MAX_ENTRIES": get_int_env("GENAI_CACHE_MAX_ENTRIES", 50000),
+    "GENAI_CACHE_TTL_HOURS": get_float_env("GENAI_CACHE_TTL_HOURS", 720),
+    "VECTOR_CACHE_MAX_MB": get_int_env("VECTOR_CACHE_MAX_MB", 2048),
+    "VECTOR_CACHE_MAX_ENTRIES": get_int_env("VECTOR_CACHE_MAX_ENTRIES", 50),
+    "VECTOR_CACHE_TTL_HOURS": get_float_env("VECTOR_CACHE_TTL_HOURS", 0),
+    # Stored search results served page by page from GET /results/{id}
+    "RESULTS_MAX_MB": get_int_env("RESULTS_MAX_MB", 256),
+    "RESULTS_MAX_ENTRIES": get_int_env("RESULTS_MAX_ENTRIES", 1000),
+    "RESULTS_TTL_HOURS": get_float_env("RESULTS_TTL_HOURS", 168),
+    "RESULTS_PAGE_SIZE": get_int_env("RESULTS_PAGE_SIZE", 50),       # Default limit for result pages
 }
 
 # Vector Search Configuration
 ENABLE_VECTOR_SEARCH = get_bool_env("ENABLE_VECTOR_SEARCH", True)
+# Chunk size in model tokens (0 = the embedding model's max sequence length) and overlap between chunks
+CHUNK_MAX_TOKENS = get_int_env("CHUNK_MAX_TOKENS", 0)
+CHUNK_OVERLAP_TOKENS = get_int_env("CHUNK_OVERLAP_TOKENS", 32)
 LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "models/all-MiniLM-L6-v2")
+# Embedding backend: "torch" (SentenceTransformer) or "onnx" (int8 ONNX Runtime model, CPU-friendly)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "models/all-MiniLM-L6-v2-onnx")
+ONNX_THREADS = get_int_env("ONNX_THREADS", 0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming DOCX reader against python-docx (docx.Document + paragraphs,
+the previous read_docx) for speed, peak memory and text coverage. Peak memory is
+the Python heap (tracemalloc); python-docx's lxml tree lives in C memory and is
+not counted, so its real footprint is higher than shown.
+
+Without --dir a synthetic corpus is generated: every resume has body paragraphs,
+a skills table, a contact header and a text box, each carrying marker words, so
+coverage shows which parts each reader sees. With --dir, coverage is the share
+of all distinct words (found by either reader) that each reader returns.
+
+Usage: python docx_benchmark.py [--files 1000] [--dir path/to/docx/folder]
+python-docx is only needed for the comparison (pip install python-docx).
+"""
+
+import os
+import re
+import sys
+import time
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+from parser.file_readers import get_resume_content  # type: ignore
+
+try:
+    import docx  # type: ignore
+except ImportError:
+    docx = None
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>
+</Types>"""
+PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/header" Target="header1.xml"/>
+</Relationships>"""
+MARKERS = ('bodymarker', 'tablemarker', 'headermarker', 'textboxmarker')
+
+
+def _p(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def write_sample_docx(path: str, i: int):
+    """A resume with text in the body, a table, the header and a text box."""
+    body = ''.join(_p(f"bodymarker Built data pipelines and REST services at company {i % 50}, paragraph {n}.")
+                   for n in range(40))
+    rows = ''.join(f'<w:tr><w:tc>{_p("tablemarker Skill")}</w:tc><w:tc>{_p(skill)}</w:tc></w:tr>'
+                   for skill in ("Python", "Kubernetes", "PostgreSQL", "Terraform", "Kafka"))
+    textbox = ('<w:p><w:r><mc:AlternateContent><mc:Choice Requires="wps"><w:drawing><wps:txbx><w:txbxContent>'
+               f'{_p("textboxmarker Certified AWS Solutions Architect")}</w:txbxContent></wps:txbx></w:drawing></mc:Choice>'
+               f'<mc:Fallback><w:pict><v:textbox><w:txbxContent>{_p("textboxmarker Certified AWS Solutions Architect")}'
+               '</w:txbxContent></v:textbox></w:pict></mc:Fallback></mc:AlternateContent></w:r></w:p>')
+    document = (f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W_NS}" '
+                'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+                'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" xmlns:v="urn:schemas-microsoft-com:vml">'
+                f'<w:body>{_p(f"Candidate {i}")}{body}<w:tbl>{rows}</w:tbl>{textbox}<w:sectPr/></w:body></w:document>')
+    header = (f'<?xml version="1.0" encoding="UTF-8"?><w:hdr xmlns:w="{W_NS}">'
+              f'{_p(f"headermarker candidate{i}@example.com +1 555 01{i % 100:02d}")}</w:hdr>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', PACKAGE_RELS)
+        archive.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS)
+        archive.writestr('word/document.xml', document)
+        archive.writestr('word/header1.xml', header)
+
+
+def python_docx_text(path: str) -> str:
+    return "\n".join(para.text for para in docx.Document(path).paragraphs)
+
+
+def run(label: str, reader, paths: list) -> dict:
+    start = time.perf_counter()
+    texts = {path: reader(path) for path in paths}
+    seconds = time.perf_counter() - start
+    # Peak memory from a separate pass over a sample, since tracing slows every allocation
+    tracemalloc.start()
+    for path in paths[:50]:
+        reader(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    chars = sum(len(t) for t in texts.values())
+    print(f"  {label:<12} {seconds:7.2f}s  {seconds / len(paths) * 1e3:6.2f}ms/file  "
+          f"peak {peak / (1024 * 1024):6.1f} MB  {chars:>11,} chars")
+    return texts
+
+
+def words(text: str) -> set:
+    return set(re.findall(r"[\w@.+-]{2,}", text.lower()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming DOCX reader vs python-docx")
+    parser.add_argument("--files", type=int, default=1000, help="synthetic resumes to generate")
+    parser.add_argument("--dir", help="benchmark the .docx files in this folder instead")
+    args = parser.parse_args()
+
+    print("🧪 DOCX Extraction Benchmark")
+    print("=" * 50)
+    workdir = None
+    if args.dir:
+        paths = sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir) if f.lower().endswith('.docx'))
+    else:
+        workdir = tempfile.mkdtemp(prefix="docx_bench_")
+        paths = [os.path.join(workdir, f"resume_{i}.docx") for i in range(args.files)]
+        for i, path in enumerate(paths):
+            write_sample_docx(path, i)
+    if not paths:
+        print("❌ No .docx files found")
+        return 1
+    print(f"📄 {len(paths)} file(s){' in ' + args.dir if args.dir else ' (synthetic)'}\n")
+
+    results = {'streaming': run("streaming", get_resume_content, paths)}
+    if docx is not None:
+        results['python-docx'] = run("python-docx", python_docx_text, paths)
+    else:
+        print("  python-docx  not installed; skipping the comparison")
+
+    print("\n📊 Coverage")
+    if args.dir:
+        union = {p: set().union(*(words(texts[p]) for texts in results.values())) for p in paths}
+        total = max(1, sum(len(u) for u in union.values()))
+    for label, texts in results.items():
+        if args.dir:
+            covered = sum(len(words(texts[p])) for p in paths) / total
+            print(f"  {label:<12} {covered * 100:5.1f}% of distinct words found by either reader")
+        else:
+            shares = [sum(m in texts[p] for p in paths) / len(paths) * 100 for m in MARKERS]
+            print(f"  {label:<12} " + "  ".join(f"{m[:-6]} {share:5.1f}%" for m, share in zip(MARKERS, shares)))
+
+    if workdir:
+        for path in paths:
+            os.remove(path)
+        os.rmdir(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
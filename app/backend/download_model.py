@@ -2,16 +2,39 @@
 """
 Script to download the sentence transformer model locally for offline deployment.
 Run this script in an environment with internet access before deployment.
+
+    python download_model.py                 # download the model
+    python download_model.py --verify        # check the local model works
+    python download_model.py --export-onnx   # export + int8-quantize for EMBEDDING_BACKEND=onnx, then check parity
+    python download_model.py --parity        # compare the ONNX model against the torch model
 """
 
 import os
 import sys
+import time
+import shutil
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCAL_MODEL_PATH = os.path.join(BACKEND_DIR, os.getenv('LOCAL_MODEL_PATH', os.path.join('models', 'all-MiniLM-L6-v2')))
+ONNX_MODEL_PATH = os.path.join(BACKEND_DIR, os.getenv('ONNX_MODEL_PATH', os.path.join('models', 'all-MiniLM-L6-v2-onnx')))
+
+PARITY_SENTENCES = [
+    "This is a test sentence for model verification.",
+    "Senior Python developer with 8 years of experience building REST APIs using FastAPI and Django.",
+    "Skills: Java, Spring Boot, Kubernetes, Docker, AWS, PostgreSQL, Kafka",
+    "Led a team of five data scientists delivering machine learning models for demand forecasting.",
+    "Education: B.Tech in Computer Science, Indian Institute of Technology, 2015",
+    "Certified Salesforce administrator; managed CRM migration for 2,000 users.",
+    "Responsible for manual and automated testing with Selenium, JUnit and Jenkins pipelines.",
+    "Financial analyst proficient in Excel, VBA, Power BI and SQL reporting.",
+]
+
 def download_model():
     """Download the sentence transformer model to local directory."""
     model_name = 'all-MiniLM-L6-v2'
-    local_model_path = os.path.join(os.path.dirname(__file__), 'models', model_name)
+    local_model_path = LOCAL_MODEL_PATH
     
     print(f"📥 Downloading model '{model_name}' to {local_model_path}...")
     
@@ -51,8 +74,7 @@ def get_directory_size(path):
 
 def verify_model_exists():
     """Verify that the model exists locally."""
-    model_name = 'all-MiniLM-L6-v2'
-    local_model_path = os.path.join(os.path.dirname(__file__), 'models', model_name)
+    local_model_path = LOCAL_MODEL_PATH
     
     if os.path.exists(local_model_path):
         print(f"✅ Model exists at: {local_model_path}")
@@ -68,17 +90,109 @@ def verify_model_exists():
         print(f"❌ Model not found at: {local_model_path}")
         return False
 
+def export_onnx():
+    """Export the local model's transformer to ONNX and write a dynamically int8-quantized copy next to it."""
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from parser.onnx_embedder import ONNX_FP32_FILE, ONNX_INT8_FILE  # type: ignore
+
+    print(f"📦 Exporting {LOCAL_MODEL_PATH} to ONNX at {ONNX_MODEL_PATH}...")
+    try:
+        model = SentenceTransformer(LOCAL_MODEL_PATH, device='cpu')
+        transformer = model[0].auto_model.eval()
+
+        class _Encoder(torch.nn.Module):
+            """Fixed positional signature for export; only the token embeddings are needed."""
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, input_ids, attention_mask, token_type_ids=None):
+                return self.inner(input_ids=input_ids, attention_mask=attention_mask,
+                                  token_type_ids=token_type_ids).last_hidden_state
+
+        os.makedirs(ONNX_MODEL_PATH, exist_ok=True)
+        fp32_path = os.path.join(ONNX_MODEL_PATH, ONNX_FP32_FILE)
+        int8_path = os.path.join(ONNX_MODEL_PATH, ONNX_INT8_FILE)
+
+        sample = model.tokenizer(PARITY_SENTENCES[:2], padding=True, return_tensors='pt')
+        input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in sample]
+        dynamic_axes = {n: {0: 'batch', 1: 'sequence'} for n in input_names}
+        dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+        with torch.no_grad():
+            torch.onnx.export(_Encoder(transformer), tuple(sample[n] for n in input_names), fp32_path,
+                              input_names=input_names, output_names=['last_hidden_state'],
+                              dynamic_axes=dynamic_axes, opset_version=14, do_constant_folding=True, dynamo=False)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+        # The embedder needs the tokenizer and max_seq_length alongside the model files
+        model.tokenizer.save_pretrained(ONNX_MODEL_PATH)
+        for name in ('sentence_bert_config.json',):
+            if os.path.exists(os.path.join(LOCAL_MODEL_PATH, name)):
+                shutil.copy(os.path.join(LOCAL_MODEL_PATH, name), ONNX_MODEL_PATH)
+
+        print(f"✅ FP32 model: {os.path.getsize(fp32_path) / (1024 * 1024):.1f} MB")
+        print(f"✅ INT8 model: {os.path.getsize(int8_path) / (1024 * 1024):.1f} MB")
+        return True
+    except Exception as e:
+        print(f"❌ Error exporting ONNX model: {e}")
+        return False
+
+
+def check_onnx_parity(repeat: int = 20):
+    """Report cosine drift and CPU encode speed of the ONNX model against the torch model."""
+    from parser.onnx_embedder import OnnxEmbedder  # type: ignore
+
+    print("🧪 Checking ONNX parity against the torch model...")
+    try:
+        torch_model = SentenceTransformer(LOCAL_MODEL_PATH, device='cpu')
+        onnx_model = OnnxEmbedder(ONNX_MODEL_PATH)
+    except Exception as e:
+        print(f"❌ Could not load models: {e}")
+        return False
+
+    texts = PARITY_SENTENCES * 4
+    reference = torch_model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    candidate = onnx_model.encode(texts, normalize_embeddings=True)
+    cosine = np.sum(reference * candidate, axis=1)
+    print(f"📐 Model: {os.path.basename(onnx_model.model_file)}")
+    print(f"📐 Cosine similarity: mean {cosine.mean():.4f}, min {cosine.min():.4f} (drift {1 - cosine.mean():.4f})")
+
+    timings = {}
+    for name, model in (('torch', torch_model), ('onnx', onnx_model)):
+        model.encode(texts)  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.encode(texts)
+        timings[name] = (time.perf_counter() - start) / repeat
+        print(f"⏱️ {name:5} {len(texts) / timings[name]:8.1f} sentences/s")
+    print(f"🚀 ONNX speedup: {timings['torch'] / timings['onnx']:.2f}x")
+
+    if cosine.min() < 0.98:
+        print("⚠️ Warning: ONNX embeddings drift noticeably from the torch model")
+        return False
+    return True
+
+
 if __name__ == "__main__":
     print("🤖 Sentence Transformer Model Downloader")
     print("=" * 50)
     
     if len(sys.argv) > 1 and sys.argv[1] == "--verify":
         verify_model_exists()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--export-onnx":
+        if not (export_onnx() and check_onnx_parity()):
+            sys.exit(1)
+        print("\n💡 Set EMBEDDING_BACKEND=onnx to use the quantized model.")
+    elif len(sys.argv) > 1 and sys.argv[1] == "--parity":
+        if not check_onnx_parity():
+            sys.exit(1)
     else:
         if download_model():
             print("\n🎉 Model download completed successfully!")
             print("💡 You can now deploy the application without internet access.")
             print("💡 Run with --verify flag to check if model exists and works.")
+            print("💡 Run with --export-onnx to create the quantized ONNX model for CPU-only nodes.")
         else:
             print("\n❌ Model download failed.")
             sys.exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the SQLite KV store vs. the legacy one-JSON-file-per-key cache.
+Reports put/get latency percentiles at 100k entries (configurable).
+
+Usage: python kv_store_benchmark.py [--entries 100000] [--gets 10000] [--skip-legacy]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from parser.kv_store import KVStore  # type: ignore
+
+
+def sample_result(i: int) -> list:
+    """A cached GenAI result of typical size (one matched candidate)."""
+    return [{
+        "source_file": f"resume_{i}.pdf",
+        "name": f"Candidate {i}",
+        "contact_number": "+1 555 0100",
+        "last_3_companies": ["Contoso", "Fabrikam", "Northwind"],
+        "top_5_technical_skills": ["Python", "FastAPI", "SQL", "Docker", "AWS"],
+        "years_of_experience": i % 20,
+        "match_score": i % 100,
+        "score_breakdown": "Strong Python and API experience; cloud deployment exposure. " * 2,
+        "summary": "Backend engineer with experience building data pipelines and REST services. " * 8,
+    }]
+
+
+def percentiles(samples: list) -> str:
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1e6
+    return f"p50 {pick(0.50):7.1f}µs  p99 {pick(0.99):7.1f}µs  mean {sum(samples) / len(samples) * 1e6:7.1f}µs"
+
+
+def bench_kv(root: str, entries: int, gets: int):
+    store = KVStore(os.path.join(root, "bench.sqlite3"))
+
+    start = time.perf_counter()
+    batch = 1000
+    for i in range(0, entries, batch):
+        store.put_many('genai', ((f"key{j}", sample_result(j)) for j in range(i, min(i + batch, entries))))
+    bulk_time = time.perf_counter() - start
+    print(f"  bulk load     {entries:,} entries in {bulk_time:.2f}s ({entries / bulk_time:,.0f} puts/s)")
+
+    put_samples = []
+    for j in range(min(gets, entries)):
+        t = time.perf_counter()
+        store.put('genai', f"key{random.randrange(entries)}", sample_result(j))
+        put_samples.append(time.perf_counter() - t)
+    print(f"  put (single)  {percentiles(put_samples)}")
+
+    get_samples = []
+    for _ in range(gets):
+        t = time.perf_counter()
+        store.get('genai', f"key{random.randrange(entries)}")
+        get_samples.append(time.perf_counter() - t)
+    print(f"  get           {percentiles(get_samples)}")
+    print(f"  file size     {os.path.getsize(store.path) / (1024 * 1024):.1f} MB")
+
+
+def bench_legacy(root: str, entries: int, gets: int):
+    cache_dir = os.path.join(root, "cache_dir")
+    os.makedirs(cache_dir)
+
+    start = time.perf_counter()
+    for j in range(entries):
+        with open(os.path.join(cache_dir, f"key{j}.json"), 'w', encoding='utf-8') as f:
+            json.dump(sample_result(j), f, indent=2, ensure_ascii=False)
+    bulk_time = time.perf_counter() - start
+    print(f"  bulk load     {entries:,} files in {bulk_time:.2f}s ({entries / bulk_time:,.0f} puts/s)")
+
+    put_samples = []
+    for j in range(min(gets, entries)):
+        t = time.perf_counter()
+        with open(os.path.join(cache_dir, f"key{random.randrange(entries)}.json"), 'w', encoding='utf-8') as f:
+            json.dump(sample_result(j), f, indent=2, ensure_ascii=False)
+        put_samples.append(time.perf_counter() - t)
+    print(f"  put (single)  {percentiles(put_samples)}")
+
+    get_samples = []
+    for _ in range(gets):
+        t = time.perf_counter()
+        path = os.path.join(cache_dir, f"key{random.randrange(entries)}.json")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+        get_samples.append(time.perf_counter() - t)
+    print(f"  get           {percentiles(get_samples)}")
+    total = sum(e.stat().st_size for e in os.scandir(cache_dir))
+    print(f"  data size     {total / (1024 * 1024):.1f} MB in {entries:,} files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV store get/put latency benchmark")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--gets", type=int, default=10_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="only benchmark the SQLite store")
+    args = parser.parse_args()
+
+    print("🧪 KV Store Benchmark")
+    print("=" * 50)
+    root = tempfile.mkdtemp(prefix="kv_bench_")
+    try:
+        print(f"\n📦 SQLite KV store ({args.entries:,} entries)")
+        bench_kv(root, args.entries, args.gets)
+        if not args.skip_legacy:
+            print(f"\n📂 Legacy JSON files ({args.entries:,} entries)")
+            bench_legacy(root, args.entries, args.gets)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare the 'full' and schema-enforced 'compact' output modes against the
+configured AI provider. Both modes run uncached over the same resumes and
+batches; reports output tokens, tokens per candidate, average batch latency
+and incomplete (unparseable or cut-off) batches.
+
+Usage: python output_mode_benchmark.py [--dir ../../resumes] [--skills "Python,SQL"] [--runs 1]
+"""
+
+import sys
+import argparse
+from parser.config import AI_PROVIDER, MAX_RESUMES_PER_BATCH  # type: ignore
+from parser.batch import parse_resumes_batch  # type: ignore
+from parser.ingest import load_resumes  # type: ignore
+
+MODES = ('full', 'compact')
+
+
+def run_mode(mode: str, resumes: dict, skills: list, runs: int) -> dict:
+    totals = {"output_tokens": 0, "candidates": 0, "batch_seconds": 0.0, "batches": 0, "incomplete": 0}
+    for _ in range(runs):
+        candidates, cache_info = parse_resumes_batch(resumes, skills, force_analyze=True, output_mode=mode)
+        batches = cache_info.get('total_batches', 0)
+        totals["output_tokens"] += cache_info.get('output_tokens', 0)
+        totals["candidates"] += len(candidates)
+        totals["batch_seconds"] += (cache_info.get('avg_batch_seconds') or 0) * batches
+        totals["batches"] += batches
+        totals["incomplete"] += batches - cache_info.get('batches_processed', 0)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Output mode benchmark (full vs compact)")
+    parser.add_argument("--dir", default="../../resumes", help="directory with resume files")
+    parser.add_argument("--skills", default="Python,JavaScript,React,Node.js,SQL", help="comma-separated skills")
+    parser.add_argument("--runs", type=int, default=1, help="repetitions per mode")
+    args = parser.parse_args()
+
+    print("🧪 Output Mode Benchmark")
+    print("=" * 50)
+    resumes = {f: c for f, c in load_resumes(args.dir).items() if c.strip()}
+    if not resumes:
+        print(f"❌ No readable resumes found in '{args.dir}'.")
+        return 1
+    skills = [s.strip() for s in args.skills.split(',') if s.strip()]
+    print(f"📂 {len(resumes)} resumes, provider={AI_PROVIDER}, batch size={MAX_RESUMES_PER_BATCH}, runs={args.runs}")
+
+    results = {mode: run_mode(mode, resumes, skills, args.runs) for mode in MODES}
+
+    print("\n📊 Results")
+    print(f"  {'mode':<8} {'output tok':>10} {'tok/cand':>9} {'s/batch':>8} {'incomplete':>11}")
+    for mode, r in results.items():
+        per_candidate = r["output_tokens"] / r["candidates"] if r["candidates"] else 0
+        per_batch = r["batch_seconds"] / r["batches"] if r["batches"] else 0
+        print(f"  {mode:<8} {r['output_tokens']:>10} {per_candidate:>9.1f} {per_batch:>8.2f} "
+              f"{r['incomplete']:>5}/{r['batches']:<5}")
+    full, compact = results['full'], results['compact']
+    if full["output_tokens"]:
+        print(f"\n💡 Compact output used {1 - compact['output_tokens'] / full['output_tokens']:.0%} fewer output tokens")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
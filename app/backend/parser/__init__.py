@@ -1,7 +1,10 @@
 from .config import *  # re-export constants
 from .file_readers import get_resume_content, read_resumes_parallel
-from .vector_search import semantic_search_resumes, clear_vector_cache
-from .cache import generate_cache_key, get_cached_result, save_to_cache, clear_cache
+from .ingest import load_resumes, warm_directory, DirectoryWatcher
+from .corpus import get_corpus_registry, load_corpus_resumes
+from .vector_search import semantic_search_resumes, compress_resumes_for_prompt, clear_vector_cache
+from .cache import generate_cache_key, get_cached_result, save_to_cache, clear_cache, get_cached_profiles, save_profiles
+from .cache_manager import get_cache_manager, get_cache_stats
 from .prompt import construct_batch_prompt
 from .batch import parse_resumes_batch
 from .progress import ProgressTracker
@@ -0,0 +1,200 @@
+"""Archive uploads: ingest a ZIP or TAR of resumes without unpacking it to disk.
+
+Members are read one at a time from the uploaded archive (TARs as a forward-only
+stream) and hashed the same way as directory ingestion, so text already
+extracted from any folder or earlier upload is reused and identical members are
+extracted once. New members are extracted in memory by MAX_WORKERS threads
+(BytesIO readers for PDF and DOCX); the archive reader pauses while
+UPLOAD_INFLIGHT_MB of member bytes are waiting, so memory stays bounded however
+large the archive is. Texts go straight to the KV text store and the members
+are registered as an upload corpus that /parse-resume searches by corpusId.
+"""
+
+import hashlib, os, tarfile, threading, time, zipfile, zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import (MAX_WORKERS, UPLOAD_MAX_MB, UPLOAD_MAX_FILE_MB, UPLOAD_MAX_FILES, UPLOAD_INFLIGHT_MB)
+from .file_readers import get_content_from_bytes, RETRY_OUTCOMES
+from .ingest import SUPPORTED_EXTENSIONS, store_texts
+from .cache import get_store
+from .corpus import get_corpus_registry, load_corpus
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+_STORE_BATCH = 200   # extracted texts written to the store per transaction
+
+
+class _ByteBudget:
+    """Blocks the archive reader while too many member bytes are waiting for a worker."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int):
+        with self._cond:
+            # A member larger than the whole budget still goes through once nothing else is pending
+            self._cond.wait_for(lambda: self.used == 0 or self.used + size <= self.limit)
+            self.used += size
+
+    def release(self, size: int):
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+
+def member_key(name: str) -> Optional[str]:
+    """Normalized member path, or None for hidden/metadata entries and unsupported file types."""
+    parts = [p for p in name.replace('\\', '/').split('/') if p not in ('', '.')]
+    if not parts or any(p == '..' or p.startswith('.') or p == '__MACOSX' for p in parts):
+        return None
+    key = '/'.join(parts)
+    return key if key.lower().endswith(SUPPORTED_EXTENSIONS) else None
+
+
+def _zip_members(fileobj: BinaryIO) -> Iterator[Tuple[str, float, Callable[[], BinaryIO]]]:
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, time.mktime(info.date_time + (0, 0, -1)), lambda info=info: archive.open(info)
+
+
+def _tar_members(archive: tarfile.TarFile) -> Iterator[Tuple[str, float, Callable[[], BinaryIO]]]:
+    with archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, float(member.mtime), lambda member=member: archive.extractfile(member)
+
+
+def open_members(fileobj: BinaryIO) -> Iterator[Tuple[str, float, Callable[[], BinaryIO]]]:
+    """(name, mtime, opener) for each file in a ZIP or (optionally compressed) TAR; openers must be used in order."""
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        return _zip_members(fileobj)
+    fileobj.seek(0)
+    try:
+        return _tar_members(tarfile.open(fileobj=fileobj, mode='r|*'))
+    except tarfile.TarError:
+        raise ValueError("Not a ZIP or TAR archive")
+
+
+def _read_member(opener: Callable[[], BinaryIO], limit: int) -> Optional[bytes]:
+    """The member's bytes, or None if it is larger than limit (read at most limit + 1 bytes)."""
+    with opener() as stream:
+        data = stream.read(limit + 1)
+    return data if len(data) <= limit else None
+
+
+def ingest_archive(fileobj: BinaryIO, filename: str = '', name: str = None) -> Tuple[dict, dict]:
+    """
+    Extract the text of every supported member of an archive into the text store and
+    register the members as an upload corpus. Returns (corpus, stats); raises ValueError
+    if the archive is unreadable, over UPLOAD_MAX_MB/UPLOAD_MAX_FILES or has no resumes.
+    """
+    start = time.time()
+    max_file_bytes, max_total_bytes = UPLOAD_MAX_FILE_MB << 20, UPLOAD_MAX_MB << 20
+    budget = _ByteBudget(UPLOAD_INFLIGHT_MB << 20)
+    store = get_store()
+    files: Dict[str, str] = {}       # member key -> content hash
+    mtimes: Dict[str, float] = {}     # member key -> modification time (picks the newest near-duplicate version)
+    seen = set()
+    pending: List[Future] = []
+    new_texts: Dict[str, str] = {}
+    raw_chars: Dict[str, int] = {}   # content hash -> length before normalization
+    stats = {'files': 0, 'unique': 0, 'extracted': 0, 'reused': 0, 'skipped': 0, 'timed_out': 0, 'bytes': 0}
+
+    def extract(data: bytes, key: str, content_hash: str) -> Tuple[str, str, Optional[int], str]:
+        info = {}
+        try:
+            text = get_content_from_bytes(data, key, info) or ""
+            return content_hash, text, info.get('raw_chars'), info.get('outcome', 'ok')
+        finally:
+            budget.release(len(data))
+
+    def collect(wait: bool = False):
+        for future in [f for f in pending if wait or f.done()]:
+            pending.remove(future)
+            content_hash, text, raw_chars[content_hash], outcome = future.result()
+            stats['extracted'] += 1
+            if outcome in RETRY_OUTCOMES:
+                # Not stored: a load-dependent cut-off would stick to this content hash for good.
+                # The member is left out of the corpus until the archive is uploaded again.
+                stats['timed_out'] += 1
+                continue
+            new_texts[content_hash] = text   # empty text is stored too, so broken files aren't retried
+        if new_texts and (wait or len(new_texts) >= _STORE_BATCH):
+            store_texts(new_texts, raw_chars)
+            new_texts.clear()
+            raw_chars.clear()
+
+    logger.info(f"📦 Ingesting archive '{filename or 'upload'}' (max {MAX_WORKERS} workers)...",
+                extra={'archive': filename, 'workers': MAX_WORKERS})
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        try:
+            for member_name, mtime, opener in open_members(fileobj):
+                key = member_key(member_name)
+                if key is None:
+                    continue
+                if len(files) >= UPLOAD_MAX_FILES:
+                    raise ValueError(f"Archive has more than {UPLOAD_MAX_FILES} resume files (UPLOAD_MAX_FILES)")
+                try:
+                    data = _read_member(opener, max_file_bytes)
+                except (OSError, RuntimeError, zlib.error, zipfile.BadZipFile, tarfile.TarError) as e:
+                    logger.warning(f"⚠️ Could not read '{key}' from archive: {e}", extra={'file': key})
+                    stats['skipped'] += 1
+                    continue
+                if data is None:
+                    logger.warning(f"⚠️ Skipping '{key}': larger than {UPLOAD_MAX_FILE_MB} MB", extra={'file': key})
+                    stats['skipped'] += 1
+                    continue
+                stats['bytes'] += len(data)
+                if stats['bytes'] > max_total_bytes:
+                    raise ValueError(f"Archive resumes exceed {UPLOAD_MAX_MB} MB uncompressed (UPLOAD_MAX_MB)")
+
+                content_hash = hashlib.md5(data).hexdigest()
+                files[key], mtimes[key] = content_hash, mtime
+                if content_hash in seen:
+                    continue
+                seen.add(content_hash)
+                if store.size_of('text', content_hash) is not None:
+                    stats['reused'] += 1
+                    continue
+                budget.acquire(len(data))
+                pending.append(executor.submit(extract, data, key, content_hash))
+                collect()
+        except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+            raise ValueError(f"Could not read archive: {e}")
+        finally:
+            collect(wait=True)
+
+    stats['files'], stats['unique'] = len(files), len(seen)
+    if not files:
+        raise ValueError("No supported resumes (.txt, .pdf, .docx) found in the archive")
+    default_name = os.path.basename(filename or '')
+    for ext in ARCHIVE_EXTENSIONS:
+        if default_name.lower().endswith(ext):
+            default_name = default_name[:-len(ext)]
+            break
+    corpus = get_corpus_registry().register_upload(files, name or default_name, mtimes)
+    stats['seconds'] = round(time.time() - start, 2)
+    logger.info(f"✅ Archive ingested in {stats['seconds']:.2f}s: {stats['files']} resume(s), {stats['unique']} unique, "
+                f"{stats['extracted']} extracted, {stats['reused']} already known, {stats['skipped']} skipped, "
+                f"{stats['timed_out']} timed out "
+                f"→ corpus {corpus['id']}", extra={**stats, 'corpus_id': corpus['id']})
+    return corpus, stats
+
+
+def warm_upload(corpus_id: str) -> int:
+    """Pre-compute chunk embeddings for an upload corpus. Returns the number of resumes covered."""
+    from .vector_search import precompute_embeddings  # imported lazily, as in ingest.warm_directory
+    corpus = get_corpus_registry().get(corpus_id)
+    if not corpus:
+        return 0
+    resumes_data, _ = load_corpus(corpus)
+    return precompute_embeddings(resumes_data)
+
+__all__ = ['ARCHIVE_EXTENSIONS','member_key','open_members','ingest_archive','warm_upload']
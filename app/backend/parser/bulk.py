@@ -0,0 +1,476 @@
+"""Offline bulk scoring through the providers' asynchronous batch-job APIs.
+
+For nightly runs over a whole corpus: every prompt batch is written to one
+JSONL job file and submitted to the Gemini or Azure OpenAI batch endpoint
+(cheaper, no rate limits, results within 24h). When the job is done its
+results are ingested into the GenAI cache exactly as interactive calls would
+have stored them, so the next day's searches are served from cache.
+
+Each job keeps its state on disk under BULK_JOBS_DIR/<job_id>/, so any step
+can be resumed from another process after a crash or restart:
+
+    state.json       status, remote job ids, counts (created → submitted → completed → ingested, or failed)
+    batches.jsonl    the resumes sent in each request, by custom_id
+    requests.jsonl   the provider-format job file that was uploaded
+    results.jsonl    the downloaded results, one line per request
+    candidates.json  every candidate ingested from the job
+
+The 'local' backend submits to the stand-in server in parser/bulk_server.py,
+which speaks the Azure OpenAI batch protocol, so the flow can be tested offline.
+"""
+
+import os, json, socket, threading, time, uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .config import (
+    BULK_JOBS_DIR, BULK_BACKEND, BULK_RESUMES_PER_REQUEST, BULK_POLL_SECONDS, BULK_STANDIN_PORT,
+    AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_BATCH_DEPLOYMENT, AZURE_OPENAI_BATCH_API_VERSION,
+    GEMINI_KEY, GEMINI_MODEL, OUTPUT_MODE, PROMPT_MODE, BATCH_API_PRICE_FACTOR,
+)
+from .ingest import _atomic_write_json
+from .prompt import get_prompt_instructions, construct_batch_request
+from .schema import expand_candidate, normalize_candidate
+from .json_stream import JsonArrayStream
+from .serialization import dumps, loads
+from .cache import generate_cache_key, generate_profile_key, save_to_cache, save_profiles, save_profile_refs
+from .usage import estimate_cost, split_by_resume, save_result_usage, record_usage
+from .near_dup import annotate_near_duplicates
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+BACKENDS = ('azure', 'gemini', 'local')
+# Job states
+CREATED, SUBMITTED, COMPLETED, INGESTED, FAILED = 'created', 'submitted', 'completed', 'ingested', 'failed'
+
+
+def _job_dir(job_id: str) -> str:
+    return os.path.join(BULK_JOBS_DIR, os.path.basename(job_id))
+
+
+def _write_jsonl(path: str, rows: Iterator[dict]) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for row in rows:
+            f.write(dumps(row) + b'\n')
+    os.replace(tmp_path, path)
+
+
+def _read_jsonl(path: str) -> Iterator[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def load_state(job_id: str) -> Optional[dict]:
+    path = os.path.join(_job_dir(job_id), "state.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state: dict) -> None:
+    state['updated'] = time.time()
+    _atomic_write_json(os.path.join(_job_dir(state['id']), "state.json"), state)
+
+
+def list_jobs() -> List[dict]:
+    """State of every job, newest first."""
+    if not os.path.isdir(BULK_JOBS_DIR):
+        return []
+    states = [load_state(name) for name in os.listdir(BULK_JOBS_DIR) if not name.startswith('_')]
+    return sorted((s for s in states if s), key=lambda s: s.get('created', 0), reverse=True)
+
+
+# ---------------------------------------------------------------------------
+# Backends: build request lines, submit the job file, poll, download results.
+# Downloaded results are normalized to {"custom_id", "text", "usage", "error"}.
+# ---------------------------------------------------------------------------
+
+class AzureBatchBackend:
+    """Azure OpenAI Batch API (needs a Global Batch deployment, AZURE_OPENAI_BATCH_DEPLOYMENT)."""
+
+    def __init__(self, endpoint: str = AZURE_OPENAI_ENDPOINT, api_key: str = AZURE_OPENAI_API_KEY,
+                 deployment: str = AZURE_OPENAI_BATCH_DEPLOYMENT, api_version: str = AZURE_OPENAI_BATCH_API_VERSION):
+        self.endpoint, self.api_key, self.deployment, self.api_version = endpoint, api_key, deployment, api_version
+
+    def _client(self):
+        from .providers.batch_azure import _get_client
+        return _get_client(self.endpoint, self.api_key, self.api_version)
+
+    def request_line(self, custom_id: str, instructions: str, request: str, output_mode: str) -> dict:
+        from .providers.batch_azure import build_chat_request
+        return {"custom_id": custom_id, "method": "POST", "url": "/chat/completions",
+                "body": build_chat_request(instructions, request, output_mode, self.deployment, self.api_version)}
+
+    def submit(self, requests_path: str, job_id: str) -> dict:
+        client = self._client()
+        with open(requests_path, 'rb') as f:
+            input_file = client.files.create(file=(f"{job_id}.jsonl", f), purpose="batch")
+        batch = client.batches.create(input_file_id=input_file.id, endpoint="/chat/completions", completion_window="24h")
+        return {"input_file_id": input_file.id, "batch_id": batch.id}
+
+    def poll(self, remote: dict) -> Tuple[str, dict]:
+        batch = self._client().batches.retrieve(remote["batch_id"])
+        remote = {**remote, "remote_status": batch.status, "output_file_id": batch.output_file_id,
+                  "error_file_id": batch.error_file_id}
+        if batch.status in ('completed', 'expired'):   # an expired job still returns what it finished
+            return COMPLETED, remote
+        if batch.status in ('failed', 'cancelled', 'cancelling'):
+            errors = getattr(getattr(batch, 'errors', None), 'data', None) or []
+            remote["error"] = '; '.join(getattr(e, 'message', str(e)) for e in errors) or batch.status
+            return FAILED, remote
+        return SUBMITTED, remote
+
+    def download(self, remote: dict) -> Iterator[dict]:
+        client = self._client()
+        for file_id in (remote.get("output_file_id"), remote.get("error_file_id")):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                row = loads(line)
+                response = row.get("response") or {}
+                body = response.get("body") or {}
+                if row.get("error") or response.get("status_code", 200) >= 400 or not body.get("choices"):
+                    error = row.get("error") or body.get("error") or f"status {response.get('status_code')}"
+                    yield {"custom_id": row.get("custom_id"), "text": None, "usage": {}, "error": str(error)}
+                    continue
+                usage = body.get("usage") or {}
+                yield {"custom_id": row.get("custom_id"),
+                       "text": body["choices"][0].get("message", {}).get("content") or '',
+                       "usage": {"prompt_tokens": usage.get("prompt_tokens", 0),
+                                 "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+                                 "output_tokens": usage.get("completion_tokens", 0)},
+                       "error": None}
+
+
+class GeminiBatchBackend:
+    """Gemini Batch API (needs the google-genai package, which the streaming provider doesn't use)."""
+
+    def __init__(self, api_key: str = GEMINI_KEY, model_name: str = GEMINI_MODEL):
+        self.api_key, self.model_name = api_key, model_name
+
+    def _client(self):
+        try:
+            from google import genai as google_genai  # type: ignore
+        except ImportError:
+            raise RuntimeError("The Gemini batch backend needs the google-genai package: pip install google-genai")
+        return google_genai.Client(api_key=self.api_key)
+
+    def request_line(self, custom_id: str, instructions: str, request: str, output_mode: str) -> dict:
+        from .providers.batch_gemini import generation_config_dict
+        return {"key": custom_id,
+                "request": {"contents": [{"role": "user", "parts": [{"text": instructions + request}]}],
+                            "generation_config": generation_config_dict(output_mode)}}
+
+    def submit(self, requests_path: str, job_id: str) -> dict:
+        client = self._client()
+        uploaded = client.files.upload(file=requests_path, config={"display_name": job_id, "mime_type": "jsonl"})
+        model = self.model_name if self.model_name.startswith('models/') else f"models/{self.model_name}"
+        job = client.batches.create(model=model, src=uploaded.name, config={"display_name": job_id})
+        return {"input_file": uploaded.name, "batch_name": job.name}
+
+    def poll(self, remote: dict) -> Tuple[str, dict]:
+        job = self._client().batches.get(name=remote["batch_name"])
+        state = getattr(job.state, 'name', str(job.state))
+        dest = getattr(job, 'dest', None)
+        remote = {**remote, "remote_status": state, "result_file": getattr(dest, 'file_name', None)}
+        if state == 'JOB_STATE_SUCCEEDED':
+            return COMPLETED, remote
+        if state in ('JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'):
+            remote["error"] = str(getattr(job, 'error', None) or state)
+            return FAILED, remote
+        return SUBMITTED, remote
+
+    def download(self, remote: dict) -> Iterator[dict]:
+        content = self._client().files.download(file=remote["result_file"])
+        for line in content.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            row = loads(line)
+            response = row.get("response") or {}
+            if row.get("error") or not response.get("candidates"):
+                yield {"custom_id": row.get("key"), "text": None, "usage": {},
+                       "error": str(row.get("error") or response.get("promptFeedback") or "no candidates")}
+                continue
+            parts = (response["candidates"][0].get("content") or {}).get("parts") or []
+            usage = response.get("usageMetadata") or response.get("usage_metadata") or {}
+            yield {"custom_id": row.get("key"), "text": ''.join(p.get("text", '') for p in parts),
+                   "usage": {"prompt_tokens": usage.get("promptTokenCount", 0),
+                             "cached_tokens": usage.get("cachedContentTokenCount", 0),
+                             "output_tokens": usage.get("candidatesTokenCount", 0)},
+                   "error": None}
+
+
+_standin = None
+_standin_lock = threading.Lock()
+
+
+def _ensure_standin(port: int) -> str:
+    """Endpoint of the stand-in job server, started in this process unless one is already listening."""
+    global _standin
+    with _standin_lock:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+        except OSError:
+            from .bulk_server import StandinJobServer
+            _standin = StandinJobServer(port)
+            _standin.start()
+            logger.info(f"🧪 Started stand-in batch job server on {_standin.endpoint}")
+    return f"http://127.0.0.1:{port}/"
+
+
+def get_backend(name: str):
+    if name == 'gemini':
+        return GeminiBatchBackend()
+    if name == 'local':
+        return AzureBatchBackend(endpoint=_ensure_standin(BULK_STANDIN_PORT), api_key="local",
+                                 deployment=AZURE_OPENAI_BATCH_DEPLOYMENT or "standin")
+    if name == 'azure':
+        return AzureBatchBackend()
+    raise ValueError(f"Unknown bulk backend '{name}' (expected one of {', '.join(BACKENDS)})")
+
+
+# ---------------------------------------------------------------------------
+# Job lifecycle
+# ---------------------------------------------------------------------------
+
+def _select_resumes(resumes_data: dict, required_skills: List[str]) -> dict:
+    """The same resume texts an interactive search would send, so profile cache keys line up."""
+    from .vector_search import semantic_search_resumes, compress_resumes_for_prompt
+    filtered, _ = semantic_search_resumes(required_skills, resumes_data)
+    if PROMPT_MODE == 'relevant_chunks':
+        filtered = compress_resumes_for_prompt(required_skills, filtered, resumes_data)
+    return filtered
+
+
+def create_job(resumes_data: dict, required_skills: List[str], backend: str = BULK_BACKEND, output_mode: str = None,
+               batch_size: int = BULK_RESUMES_PER_REQUEST, paths: List[str] = None, parent: str = None,
+               select: bool = True, near_duplicates: Dict[str, List[str]] = None) -> dict:
+    """
+    Write the job file for every batch of resumes; nothing is sent yet. Returns the job state.
+    near_duplicates ({kept key: [older version keys]}, see corpus.load_corpus) is kept
+    in the state so ingest_job can annotate the candidates' near_duplicate_files.
+    """
+    output_mode = output_mode or OUTPUT_MODE
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown bulk backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if select:
+        resumes_data = _select_resumes(resumes_data, required_skills)
+    if not resumes_data:
+        raise ValueError("No resumes to submit")
+
+    job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(_job_dir(job_id), exist_ok=True)
+
+    items = list(resumes_data.items())
+    batches = [(f"{job_id}-{i // batch_size + 1:05d}", dict(items[i:i + batch_size]))
+               for i in range(0, len(items), max(1, batch_size))]
+    instructions = get_prompt_instructions(output_mode)
+    # Request lines only need the model settings, so no client (or stand-in server) is started here
+    builder = GeminiBatchBackend() if backend == 'gemini' else AzureBatchBackend(deployment=AZURE_OPENAI_BATCH_DEPLOYMENT or "standin")
+    _write_jsonl(os.path.join(_job_dir(job_id), "batches.jsonl"),
+                 ({"custom_id": cid, "resumes": batch} for cid, batch in batches))
+    _write_jsonl(os.path.join(_job_dir(job_id), "requests.jsonl"),
+                 (builder.request_line(cid, instructions, construct_batch_request(batch, required_skills), output_mode)
+                  for cid, batch in batches))
+
+    state = {
+        "id": job_id, "backend": backend, "status": CREATED, "created": time.time(), "updated": None,
+        "skills": required_skills, "output_mode": output_mode, "prompt_mode": PROMPT_MODE,
+        "model": GEMINI_MODEL if backend == 'gemini' else builder.deployment,
+        "paths": paths or [], "parent": parent, "resumes": len(resumes_data), "batches": len(batches),
+        "near_duplicates": {key: older for key, older in (near_duplicates or {}).items() if key in resumes_data},
+        "remote": {}, "error": None,
+        "results": {"completed_batches": 0, "failed_batches": [], "candidates": 0,
+                    "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0},
+    }
+    save_state(state)
+    logger.info(f"📦 Bulk job {job_id}: {len(resumes_data)} resumes in {len(batches)} request(s) for backend '{backend}'",
+                extra={'job_id': job_id, 'resumes': len(resumes_data), 'batches': len(batches), 'backend': backend})
+    return state
+
+
+def create_job_for_paths(paths: List[str], required_skills: List[str], **kwargs) -> dict:
+    """Job for a set of directories, loaded as the same corpus an interactive search would use."""
+    from .corpus import get_corpus_registry, load_corpus
+    corpus = get_corpus_registry().register(paths)
+    near_duplicates: Dict[str, List[str]] = {}
+    resumes_data, _ = load_corpus(corpus, near_duplicates)
+    return create_job(resumes_data, required_skills, paths=corpus['paths'], near_duplicates=near_duplicates, **kwargs)
+
+
+def submit_job(job_id: str) -> dict:
+    state = load_state(job_id)
+    if state is None:
+        raise ValueError(f"Unknown bulk job '{job_id}'")
+    if state['status'] != CREATED:
+        return state
+    try:
+        state['remote'] = get_backend(state['backend']).submit(os.path.join(_job_dir(job_id), "requests.jsonl"), job_id)
+        state['status'] = SUBMITTED
+        logger.info(f"📤 Bulk job {job_id} submitted: {state['remote']}")
+    except Exception as e:
+        # Stays 'created' so the submit can simply be retried
+        state['error'] = f"submit failed: {e}"
+        logger.error(f"❌ Bulk job {job_id} submit failed: {e}")
+    save_state(state)
+    return state
+
+
+def poll_job(job_id: str) -> dict:
+    """Check a submitted job; downloads the results once the provider has finished."""
+    state = load_state(job_id)
+    if state is None:
+        raise ValueError(f"Unknown bulk job '{job_id}'")
+    if state['status'] != SUBMITTED:
+        return state
+    backend = get_backend(state['backend'])
+    try:
+        status, state['remote'] = backend.poll(state['remote'])
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not poll bulk job {job_id}: {e}")
+        return state
+    if status == COMPLETED:
+        _write_jsonl(os.path.join(_job_dir(job_id), "results.jsonl"), backend.download(state['remote']))
+        logger.info(f"📥 Bulk job {job_id} finished; results downloaded")
+    elif status == FAILED:
+        state['error'] = state['remote'].get('error')
+        logger.error(f"❌ Bulk job {job_id} failed: {state['error']}")
+    state['status'] = status
+    save_state(state)
+    return state
+
+
+def ingest_job(job_id: str) -> dict:
+    """
+    Parse the downloaded results and store them like interactive calls would: one
+    profile per resume, plus the combined result when every request succeeded.
+    Resumes of failed or truncated requests are left uncached (see retry_job).
+    """
+    state = load_state(job_id)
+    if state is None:
+        raise ValueError(f"Unknown bulk job '{job_id}'")
+    if state['status'] != COMPLETED:
+        return state
+    job_dir = _job_dir(job_id)
+    skills = state['skills']
+    results = {row['custom_id']: row for row in _read_jsonl(os.path.join(job_dir, "results.jsonl"))}
+    totals = {"completed_batches": 0, "failed_batches": [], "candidates": 0,
+              "prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0, "estimated_cost_usd": 0.0}
+    all_resumes, all_candidates = {}, []
+
+    for entry in _read_jsonl(os.path.join(job_dir, "batches.jsonl")):
+        custom_id, batch = entry['custom_id'], entry['resumes']
+        all_resumes.update(batch)
+        row = results.get(custom_id)
+        if row is None or row.get('error'):
+            logger.warning(f"⚠️ Request {custom_id} failed: {row.get('error') if row else 'no result returned'}",
+                           extra={'job_id': job_id, 'custom_id': custom_id})
+            totals['failed_batches'].append(custom_id)
+            continue
+        usage = {key: (row.get('usage') or {}).get(key, 0) or 0 for key in ('prompt_tokens', 'cached_tokens', 'output_tokens')}
+        for key, value in usage.items():
+            totals[key] += value
+        # Batch jobs are billed at a discount to online calls
+        cost = estimate_cost(state.get('model'), usage['prompt_tokens'], usage['cached_tokens'], usage['output_tokens'],
+                             BATCH_API_PRICE_FACTOR) or 0.0
+        totals['estimated_cost_usd'] = round(totals['estimated_cost_usd'] + cost, 6)
+        stream = JsonArrayStream()
+        items = stream.feed(row.get('text') or '') + stream.close()
+        candidates = [normalize_candidate(expand_candidate(item)) for item in items]
+        candidates = [c for c in candidates if isinstance(c, dict) and c.get('source_file') in batch]
+        complete = stream.complete and not stream.skipped
+        # Non-matches are only recorded for complete responses, as in interactive runs
+        save_profiles(batch, skills, candidates, include_unmatched=complete,
+                      token_shares=split_by_resume(batch, usage['prompt_tokens'], usage['output_tokens'], cost))
+        all_candidates.extend(candidates)
+        if complete:
+            totals['completed_batches'] += 1
+        else:
+            logger.warning(f"⚠️ Request {custom_id} incomplete: kept {len(candidates)} candidate(s)",
+                           extra={'job_id': job_id, 'custom_id': custom_id})
+            totals['failed_batches'].append(custom_id)
+
+    totals['candidates'] = len(all_candidates)
+    if not totals['failed_batches']:
+        cache_key = generate_cache_key(all_resumes, skills)
+        save_to_cache(cache_key, all_candidates)
+        save_profile_refs(cache_key, [generate_profile_key(c, skills) for c in all_resumes.values()])
+        save_result_usage(cache_key, {'prompt_tokens': totals['prompt_tokens'], 'output_tokens': totals['output_tokens'],
+                                      'cost_usd': totals['estimated_cost_usd']})
+        state['cache_key'] = cache_key
+    # Cached entries stay unannotated, as in interactive runs; the job's own output lists the older versions
+    near_duplicates = state.get('near_duplicates') or {}
+    _atomic_write_json(os.path.join(job_dir, "candidates.json"),
+                       [annotate_near_duplicates(c, near_duplicates) for c in all_candidates])
+    state['results'] = totals
+    state['status'] = INGESTED
+    save_state(state)
+    from .corpus import corpus_id_for
+    record_usage({'prompt_tokens': totals['prompt_tokens'], 'cached_prompt_tokens': totals['cached_tokens'],
+                  'output_tokens': totals['output_tokens'], 'estimated_cost_usd': totals['estimated_cost_usd'],
+                  'tokens_by_model': {state.get('model') or state['backend']: {
+                      'prompt_tokens': totals['prompt_tokens'], 'cached_prompt_tokens': totals['cached_tokens'],
+                      'output_tokens': totals['output_tokens'], 'cost_usd': totals['estimated_cost_usd']}}},
+                 corpus_id_for(state['paths']) if state.get('paths') else None)
+    logger.info(f"✅ Bulk job {job_id} ingested: {totals['candidates']} candidate(s), "
+                f"{totals['completed_batches']}/{state['batches']} request(s) complete; "
+                f"tokens {totals['prompt_tokens']} prompt ({totals['cached_tokens']} cached), {totals['output_tokens']} output, "
+                f"~${totals['estimated_cost_usd']:.4f}",
+                extra={'job_id': job_id, 'candidates': totals['candidates'], 'failed_batches': len(totals['failed_batches'])})
+    return state
+
+
+def advance_job(job_id: str) -> dict:
+    """Run whichever step comes next for the job (submit, poll/download or ingest)."""
+    state = load_state(job_id)
+    if state is None:
+        raise ValueError(f"Unknown bulk job '{job_id}'")
+    step = {CREATED: submit_job, SUBMITTED: poll_job, COMPLETED: ingest_job}.get(state['status'])
+    return step(job_id) if step else state
+
+
+def wait_for_job(job_id: str, poll_seconds: float = BULK_POLL_SECONDS, timeout: float = None) -> dict:
+    """Advance the job until it is ingested or failed (or the timeout passes)."""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        before = load_state(job_id)
+        state = advance_job(job_id)
+        if state['status'] in (INGESTED, FAILED):
+            return state
+        if state['status'] == CREATED and before['status'] == CREATED and state.get('error'):
+            return state   # submit keeps failing; don't spin on it
+        if deadline and time.time() >= deadline:
+            logger.info(f"⏳ Bulk job {job_id} still {state['status']}; resume later with the same job id")
+            return state
+        if state['status'] == SUBMITTED:
+            time.sleep(poll_seconds)
+
+
+def retry_job(job_id: str, backend: str = None) -> Optional[dict]:
+    """New job for the resumes of an ingested job's failed requests."""
+    state = load_state(job_id)
+    if state is None:
+        raise ValueError(f"Unknown bulk job '{job_id}'")
+    failed = set(state['results'].get('failed_batches') or [])
+    if state['status'] != INGESTED or not failed:
+        logger.info(f"ℹ️ Bulk job {job_id} has no failed requests to retry")
+        return None
+    resumes = {}
+    for entry in _read_jsonl(os.path.join(_job_dir(job_id), "batches.jsonl")):
+        if entry['custom_id'] in failed:
+            resumes.update(entry['resumes'])
+    # The texts were already selected (and compressed) when the original job was created
+    return create_job(resumes, state['skills'], backend=backend or state['backend'], output_mode=state['output_mode'],
+                      paths=state.get('paths'), parent=job_id, select=False,
+                      near_duplicates=state.get('near_duplicates'))
+
+__all__ = ['BACKENDS','AzureBatchBackend','GeminiBatchBackend','get_backend','load_state','list_jobs','create_job',
+           'create_job_for_paths','submit_job','poll_job','ingest_job','advance_job','wait_for_job','retry_job']
@@ -0,0 +1,213 @@
+"""Local stand-in for the Azure OpenAI batch-job API.
+
+Implements just enough of the files and batches endpoints for the openai
+client (upload, create, retrieve, download, plus /models for health checks)
+so bulk jobs can be run end to end offline. Jobs "complete" after
+BULK_STANDIN_DELAY_SECONDS; each request is answered by a keyword matcher
+that scores resumes on the required skills, returning the same JSON shape as
+the real model. Files and jobs live on disk, so a restarted server keeps
+serving earlier jobs.
+"""
+
+import os, json, math, re, threading, time, uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse
+
+from .config import BULK_JOBS_DIR, BULK_STANDIN_DELAY_SECONDS
+from .schema import CANDIDATE_FIELDS, COMPACT_RESULTS_KEY
+
+STANDIN_DIR = os.path.join(BULK_JOBS_DIR, "_standin")
+
+_RESUME_BLOCK = re.compile(r'--- START OF RESUME: (.+?) ---\n(.*?)\n--- END OF RESUME: \1 ---', re.DOTALL)
+_SKILLS_LINE = re.compile(r'The required technical skills we are looking for are: (.+?)\.\s*$', re.MULTILINE)
+_PHONE = re.compile(r'\+?\d[\d\s().-]{7,}\d')
+
+
+def answer_prompt(prompt: str) -> str:
+    """Keyword-match each resume in a batch prompt against the skills; returns the model's JSON text."""
+    skills = [s.strip() for s in (_SKILLS_LINE.search(prompt).group(1).split(',') if _SKILLS_LINE.search(prompt) else []) if s.strip()]
+    compact = f'"{COMPACT_RESULTS_KEY}"' in prompt[:prompt.find('--- BATCH OF RESUMES START ---')]
+    candidates = []
+    for filename, text in _RESUME_BLOCK.findall(prompt):
+        found = [s for s in skills if re.search(rf'(?<!\w){re.escape(s)}(?!\w)', text, re.IGNORECASE)]
+        if not skills or len(found) < math.ceil(len(skills) / 2):
+            continue
+        lines = [l.strip() for l in text.splitlines() if l.strip()]
+        phone = _PHONE.search(text)
+        candidate = {
+            "source_file": filename,
+            "name": lines[0][:80] if lines else None,
+            "contact_number": phone.group().strip() if phone else None,
+            "last_3_companies": [],
+            "top_5_technical_skills": found[:5],
+            "years_of_experience": None,
+            "match_score": round(100 * len(found) / len(skills)),
+            "score_breakdown": f"Mentions {len(found)} of {len(skills)} required skills: {', '.join(found)}.",
+            "summary": ' '.join(lines[:3])[:300],
+        }
+        if compact:
+            candidate = {short: candidate[key] for key, short, _, _, _ in CANDIDATE_FIELDS}
+        candidates.append(candidate)
+    return json.dumps({COMPACT_RESULTS_KEY: candidates} if compact else candidates)
+
+
+class _Store:
+    """Files and batch records on disk."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, "files"), exist_ok=True)
+        os.makedirs(os.path.join(root, "batches"), exist_ok=True)
+
+    def _path(self, kind: str, object_id: str) -> str:
+        return os.path.join(self.root, kind, os.path.basename(object_id))
+
+    def put_file(self, data: bytes, filename: str, purpose: str) -> dict:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with open(self._path("files", file_id), 'wb') as f:
+            f.write(data)
+        record = {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                  "filename": filename, "purpose": purpose, "status": "processed"}
+        self.save("batches", file_id + ".meta", record)
+        return record
+
+    def read_file(self, file_id: str) -> Optional[bytes]:
+        path = self._path("files", file_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def save(self, kind: str, object_id: str, record: dict):
+        with open(self._path(kind, object_id + ".json"), 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+
+    def load(self, kind: str, object_id: str) -> Optional[dict]:
+        path = self._path(kind, object_id + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def run_batch(self, batch: dict) -> dict:
+        """Answer every request of a batch whose queue time has passed."""
+        if batch["status"] != "in_progress" or time.time() < batch["created_at"] + batch["_delay"]:
+            return batch
+        raw = self.read_file(batch["input_file_id"]) or b''
+        output, completed, failed = [], 0, 0
+        for line in raw.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                prompt = request["body"]["messages"][-1]["content"]
+                content = answer_prompt(prompt)
+                body = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+                        "model": request["body"].get("model"),
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                                  "total_tokens": (len(prompt) + len(content)) // 4}}
+                output.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id"),
+                               "response": {"status_code": 200, "body": body}, "error": None})
+                completed += 1
+            except Exception as e:
+                output.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id"),
+                               "response": None, "error": {"code": "invalid_request", "message": str(e)}})
+                failed += 1
+        data = ''.join(json.dumps(o) + '\n' for o in output).encode('utf-8')
+        batch.update(status="completed", completed_at=int(time.time()),
+                     output_file_id=self.put_file(data, "output.jsonl", "batch_output")["id"],
+                     request_counts={"total": completed + failed, "completed": completed, "failed": failed})
+        self.save("batches", batch["id"], batch)
+        return batch
+
+
+class _Handler(BaseHTTPRequestHandler):
+    store: _Store = None
+    delay: float = BULK_STANDIN_DELAY_SECONDS
+
+    def log_message(self, format, *args):  # keep the job output readable
+        pass
+
+    def _send(self, status: int, payload=None, raw: bytes = None):
+        body = raw if raw is not None else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream' if raw is not None else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send(404, {"error": {"code": "not_found", "message": self.path}})
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if parts[:2] == ['openai', 'models']:
+            return self._send(200, {"object": "list", "data": []})
+        if parts[:2] == ['openai', 'batches'] and len(parts) == 3:
+            with self.store.lock:
+                batch = self.store.load("batches", parts[2])
+                if batch is None:
+                    return self._not_found()
+                batch = self.store.run_batch(batch)
+            return self._send(200, {k: v for k, v in batch.items() if not k.startswith('_')})
+        if parts[:2] == ['openai', 'files'] and len(parts) == 4 and parts[3] == 'content':
+            data = self.store.read_file(parts[2])
+            return self._send(200, raw=data) if data is not None else self._not_found()
+        self._not_found()
+
+    def do_POST(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if parts == ['openai', 'files']:
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('utf-8') + body)
+            fields = {part.get_param('name', header='content-disposition'): part for part in message.iter_parts()}
+            upload = fields.get('file')
+            if upload is None:
+                return self._send(400, {"error": {"code": "invalid_request", "message": "file is required"}})
+            purpose = fields['purpose'].get_content().strip() if 'purpose' in fields else 'batch'
+            with self.store.lock:
+                record = self.store.put_file(upload.get_payload(decode=True), upload.get_filename() or 'input.jsonl', purpose)
+            return self._send(200, record)
+        if parts == ['openai', 'batches']:
+            request = json.loads(body or b'{}')
+            if self.store.read_file(request.get("input_file_id", "")) is None:
+                return self._send(400, {"error": {"code": "invalid_request", "message": "unknown input_file_id"}})
+            batch = {"id": f"batch_{uuid.uuid4()}", "object": "batch", "endpoint": request.get("endpoint"),
+                     "input_file_id": request["input_file_id"], "completion_window": request.get("completion_window", "24h"),
+                     "status": "in_progress", "created_at": int(time.time()), "output_file_id": None,
+                     "error_file_id": None, "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                     "_delay": self.delay}
+            with self.store.lock:
+                self.store.save("batches", batch["id"], batch)
+            return self._send(200, {k: v for k, v in batch.items() if not k.startswith('_')})
+        self._not_found()
+
+
+class StandinJobServer:
+    """Threaded HTTP server speaking the Azure OpenAI batch API subset; start() returns its endpoint URL."""
+
+    def __init__(self, port: int, root: str = STANDIN_DIR, delay: float = BULK_STANDIN_DELAY_SECONDS):
+        handler = type('StandinHandler', (_Handler,), {'store': _Store(root), 'delay': delay})
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.endpoint
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+__all__ = ['StandinJobServer','answer_prompt']
@@ -1,7 +1,35 @@
-import os, json, hashlib
-from typing import List
-from .config import CACHE_DIR
+import os, hashlib, threading
+from typing import Dict, List, Optional, Tuple
+from .config import CACHE_DIR, INGEST_DIR
 from .config import get_embedding_model
+from .cache_manager import get_cache_manager
+from .kv_store import KVStore, migrate_legacy_files
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# GenAI results, per-resume profiles and extracted text live in one SQLite file
+STORE_PATH = os.path.join(CACHE_DIR, "kv_store.sqlite3")
+# Legacy file-per-key locations, imported into the store on first use
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+LEGACY_TEXT_DIR = os.path.join(INGEST_DIR, "text")
+
+_store: Optional[KVStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> KVStore:
+    """Shared KV store; legacy JSON/text cache files are migrated the first time it's opened."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = KVStore(STORE_PATH)
+                if store.get_meta('legacy_files_migrated') is None:
+                    migrate_legacy_files(store, CACHE_DIR, PROFILE_DIR, LEGACY_TEXT_DIR)
+                    store.set_meta('legacy_files_migrated', '1')
+                _store = store
+    return _store
 
 
 def generate_cache_key(resumes_data: dict, required_skills: List[str]) -> str:
@@ -20,44 +48,145 @@ def generate_cache_key(resumes_data: dict, required_skills: List[str]) -> str:
 
 
 def get_cached_result(cache_key: str):
-    """Retrieve cached result if it exists."""
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    if os.path.exists(cache_file):
+    """Retrieve cached result if it exists and hasn't expired."""
+    manager = get_cache_manager('genai')
+    if manager.lookup(cache_key):
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                result = json.load(f)
-            print(f"📂 Cache file found: {cache_key[:12]}...json")
-            return result
+            result = get_store().get('genai', cache_key)
+            if result is not None:
+                logger.debug(f"📂 Cache entry found: {cache_key[:12]}...")
+                manager.record_hit(cache_key)
+                return result
         except Exception as e:
-            print(f"⚠️ Warning: Could not read cache file: {e}")
+            logger.warning(f"⚠️ Warning: Could not read cache entry: {e}")
+    manager.discard(cache_key)
+    manager.record_miss()
     return None
 
 
 def save_to_cache(cache_key: str, result):
     """Save result to cache."""
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
     try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        print(f"💾 Cache file created: {cache_key[:12]}...json")
+        size = get_store().put('genai', cache_key, result)
+        logger.debug(f"💾 Cache entry created: {cache_key[:12]}...")
+        get_cache_manager('genai').record_put(cache_key, size)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not save to cache: {e}")
+
+
+def generate_profile_key(content: str, required_skills: List[str]) -> str:
+    """Cache key for one resume's LLM profile; independent of filename and directory."""
+    content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+    skills_str = ','.join(sorted(s.strip().lower() for s in required_skills))
+    return hashlib.md5(f"{content_hash}|skills:{skills_str}".encode('utf-8')).hexdigest()
+
+
+def get_cached_profiles(resumes_data: dict, required_skills: List[str],
+                        saved: Optional[dict] = None) -> Tuple[List[dict], Dict[str, str]]:
+    """
+    Look up per-resume profiles. Returns (matched_candidates, uncached_resumes);
+    cached non-matches are dropped from both. If saved is given, the tokens and cost
+    recorded with each hit profile are added to it.
+    """
+    manager = get_cache_manager('profiles')
+    keys = {filename: generate_profile_key(content, required_skills) for filename, content in resumes_data.items()}
+    fresh = [k for k in keys.values() if manager.lookup(k)]
+    try:
+        profiles = get_store().get_many('profiles', fresh) if fresh else {}
     except Exception as e:
-        print(f"⚠️ Warning: Could not save to cache: {e}")
+        logger.warning(f"⚠️ Warning: Could not read profile cache: {e}")
+        profiles = {}
+
+    matched, uncached = [], {}
+    for filename, content in resumes_data.items():
+        profile_key = keys[filename]
+        profile = profiles.get(profile_key)
+        if profile is None:
+            manager.discard(profile_key)
+            manager.record_miss()
+            uncached[filename] = content
+            continue
+        manager.record_hit(profile_key)
+        if saved is not None and profile.get('tokens'):
+            for field, value in profile['tokens'].items():
+                saved[field] = round(saved.get(field, 0) + (value or 0), 6)
+        if profile.get('matched'):
+            matched.append({**profile['candidate'], 'source_file': filename})
+    return matched, uncached
+
+
+def save_profiles(resumes_data: dict, required_skills: List[str], candidates: List[dict],
+                  include_unmatched: bool=True, token_shares: Optional[Dict[str, dict]]=None) -> List[str]:
+    """
+    Store one profile per resume. Resumes without a candidate are recorded as
+    non-matches only when include_unmatched is set (i.e. every batch succeeded).
+    token_shares holds each resume's estimated share of the tokens it took to score.
+    Returns the profile keys written.
+    """
+    by_file = {c.get('source_file'): c for c in candidates if isinstance(c, dict)}
+    items = []
+    for filename, content in resumes_data.items():
+        candidate = by_file.get(filename)
+        if candidate is None and not include_unmatched:
+            continue
+        profile = {'matched': candidate is not None,
+                   'candidate': {k: v for k, v in (candidate or {}).items() if k != 'source_file'}}
+        if token_shares and filename in token_shares:
+            profile['tokens'] = token_shares[filename]
+        items.append((generate_profile_key(content, required_skills), profile))
+    if not items:
+        return []
+    try:
+        sizes = get_store().put_many('profiles', items)
+        manager = get_cache_manager('profiles')
+        for (profile_key, _), size in zip(items, sizes):
+            manager.record_put(profile_key, size)
+        return [k for k, _ in items]
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not save profiles: {e}")
+        return []
+
+
+def save_profile_refs(cache_key: str, profile_keys: List[str]):
+    """Remember which profiles make up a cached result so clearing it also clears them."""
+    try:
+        store = get_store()
+        refs_size = store.put('profile_refs', cache_key, profile_keys)
+        # Refs are removed together with their result, so they count towards its size
+        get_cache_manager('genai').resize(cache_key, (store.size_of('genai', cache_key) or 0) + refs_size)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not save profile refs: {e}")
+
+
+def remove_cached_result(cache_key: str):
+    """Delete a cached result, its profile refs and its token usage (used by eviction)."""
+    store = get_store()
+    store.delete('genai', cache_key)
+    store.delete('profile_refs', cache_key)
+    store.delete('usage', cache_key)
 
 
 def clear_cache(cache_key: str=None):
-    """Clear cache files. If cache_key is provided, clear specific cache, otherwise clear all."""
+    """Clear cache entries. If cache_key is provided, clear specific cache, otherwise clear all."""
     try:
+        store = get_store()
         if cache_key:
-            cf = os.path.join(CACHE_DIR, f"{cache_key}.json")
-            if os.path.exists(cf):
-                os.remove(cf)
-                print(f"🗑️ Cleared specific cache: {cache_key[:12]}...json")
+            if store.size_of('genai', cache_key) is not None:
+                logger.info(f"🗑️ Cleared specific cache: {cache_key[:12]}...")
+            profile_keys = store.get('profile_refs', cache_key) or []
+            remove_cached_result(cache_key)
+            get_cache_manager('genai').discard(cache_key)
+            for profile_key in profile_keys:
+                store.delete('profiles', profile_key)
+                get_cache_manager('profiles').discard(profile_key)
         else:
-            for file in os.listdir(CACHE_DIR):
-                if file.endswith('.json'):
-                    os.remove(os.path.join(CACHE_DIR, file))
-            print("🗑️ Cleared all cache files")
+            for namespace in ('genai', 'profile_refs', 'profiles', 'usage'):
+                store.clear(namespace)
+            get_cache_manager('genai').reset()
+            get_cache_manager('profiles').reset()
+            logger.info("🗑️ Cleared all cache entries")
     except Exception as e:
-        print(f"⚠️ Warning: Could not clear cache: {e}")
+        logger.warning(f"⚠️ Warning: Could not clear cache: {e}")
 
-__all__ = ['generate_cache_key','get_cached_result','save_to_cache','clear_cache']
+__all__ = ['generate_cache_key','get_cached_result','save_to_cache','clear_cache','get_store',
+           'generate_profile_key','get_cached_profiles','save_profiles','save_profile_refs']
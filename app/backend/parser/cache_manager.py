@@ -0,0 +1,257 @@
+"""Bounded cache bookkeeping with LRU/LFU eviction, TTL and hit/miss counters.
+
+Each cache layer (GenAI results, per-resume profiles, vector indexes, chunk
+embeddings) gets one CacheManager. The manager only tracks metadata; the
+layer supplies a remove callback that deletes the entry from the KV store or
+from disk. The entry table is built once on first use (a KV store query or a
+directory scan), so lookups never list a cache directory again.
+"""
+
+import os, time, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from .config import (VECTOR_DB_DIR, CACHE_EVICTION_POLICY,
+                     GENAI_CACHE_MAX_MB, GENAI_CACHE_MAX_ENTRIES, GENAI_CACHE_TTL_HOURS,
+                     VECTOR_CACHE_MAX_MB, VECTOR_CACHE_MAX_ENTRIES, VECTOR_CACHE_TTL_HOURS,
+                     RESULTS_MAX_MB, RESULTS_MAX_ENTRIES, RESULTS_TTL_HOURS)
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+class CacheManager:
+    """Tracks entries of one cache layer and keeps it within its size, count and age limits."""
+
+    def __init__(self, name: str, remove_fn: Callable[[str], None], max_bytes: int = 0,
+                 max_entries: int = 0, ttl_seconds: float = 0, policy: str = 'lru'):
+        self.name = name
+        self.remove_fn = remove_fn
+        self.max_bytes = max_bytes          # 0 = unlimited
+        self.max_entries = max_entries      # 0 = unlimited
+        self.ttl_seconds = ttl_seconds      # 0 = never expires
+        self.policy = policy if policy in ('lru', 'lfu') else 'lru'
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()  # LRU order: oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        self._last_ttl_sweep = 0.0
+
+    def load(self, entries: Iterable[Tuple[str, int, float]]):
+        """Seed the table with existing (key, size, mtime) entries, oldest first."""
+        with self._lock:
+            for key, size, mtime in sorted(entries, key=lambda e: e[2]):
+                self._entries[key] = {'size': size, 'created': mtime, 'last_access': mtime, 'hits': 0}
+                self._total_bytes += size
+        self._evict()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def lookup(self, key: str) -> bool:
+        """
+        Check whether key is present and fresh. Expired entries are removed.
+        Callers record the outcome with record_hit/record_miss once they've read the value.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            if not (self.ttl_seconds and time.time() - entry['created'] > self.ttl_seconds):
+                return True
+            self._drop(key)
+            self._counters['expirations'] += 1
+        self._safe_remove(key)
+        return False
+
+    def record_hit(self, key: str):
+        with self._lock:
+            self._counters['hits'] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['last_access'] = time.time()
+                entry['hits'] += 1
+                self._entries.move_to_end(key)
+
+    def record_miss(self):
+        with self._lock:
+            self._counters['misses'] += 1
+
+    def record_put(self, key: str, size: int):
+        """Register a newly written entry, then evict until the layer is within its limits."""
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {'size': size, 'created': now, 'last_access': now, 'hits': 0}
+            self._total_bytes += size
+        self._evict(protect=key)
+
+    def resize(self, key: str, size: int):
+        """Update the size of an existing entry without touching its age or hit count."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            self._total_bytes += size - entry['size']
+            entry['size'] = size
+        self._evict(protect=key)
+
+    def discard(self, key: str):
+        """Forget an entry the caller has already deleted."""
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def reset(self):
+        """Forget all entries (after the layer was wiped); counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'policy': self.policy,
+                **self._counters,
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else None,
+            }
+
+    # Internals
+
+    def _drop(self, key: str):
+        self._total_bytes -= self._entries.pop(key)['size']
+
+    def _over_limit(self) -> bool:
+        return bool((self.max_entries and len(self._entries) > self.max_entries) or
+                    (self.max_bytes and self._total_bytes > self.max_bytes))
+
+    def _pick_victim(self, protect: Optional[str]) -> Optional[str]:
+        candidates = (k for k in self._entries if k != protect)
+        if self.policy == 'lfu':
+            return min(candidates, key=lambda k: (self._entries[k]['hits'], self._entries[k]['last_access']), default=None)
+        return next(candidates, None)  # OrderedDict is kept in LRU order
+
+    def _evict(self, protect: Optional[str] = None):
+        victims = []
+        with self._lock:
+            now = time.time()
+            # Expired entries are also caught lazily by lookup(), so a full sweep at most once a minute is enough
+            if self.ttl_seconds and now - self._last_ttl_sweep > 60:
+                self._last_ttl_sweep = now
+                for key in [k for k, e in self._entries.items() if now - e['created'] > self.ttl_seconds and k != protect]:
+                    self._drop(key)
+                    victims.append(key)
+                    self._counters['expirations'] += 1
+            while self._over_limit():
+                key = self._pick_victim(protect)
+                if key is None:
+                    break
+                self._drop(key)
+                victims.append(key)
+                self._counters['evictions'] += 1
+        for key in victims:
+            self._safe_remove(key)
+        if victims:
+            logger.info(f"🧹 {self.name} cache: removed {len(victims)} entr{'y' if len(victims) == 1 else 'ies'} (limits/TTL)")
+
+    def _safe_remove(self, key: str):
+        try:
+            self.remove_fn(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Warning: Could not remove {self.name} cache entry {key[:12]}: {e}")
+
+
+# File layouts of the individual cache layers
+
+def _remove_files(*paths: str):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _scan_tree(root: str, suffix: str) -> Iterable[Tuple[str, int, float]]:
+    """Yield (stem, size, mtime) for files with suffix under root (one level of shard dirs)."""
+    if not os.path.isdir(root):
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(suffix):
+                    st = entry.stat()
+                    yield entry.name[:-len(suffix)], st.st_size, st.st_mtime
+
+
+def _vector_entries() -> Iterable[Tuple[str, int, float]]:
+    with os.scandir(VECTOR_DB_DIR) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith('.index'):
+                key = entry.name[:-len('.index')]
+                st = entry.stat()
+                meta = os.path.join(VECTOR_DB_DIR, f"{key}_metadata.pkl")
+                size = st.st_size + (os.path.getsize(meta) if os.path.exists(meta) else 0)
+                yield key, size, st.st_mtime
+
+
+def _build_managers() -> Dict[str, CacheManager]:
+    from .cache import get_store, remove_cached_result
+    from .vector_search import EMBEDDING_CACHE_DIR
+    from .results import remove_result
+
+    mb = 1024 * 1024
+    genai_limits = dict(max_bytes=GENAI_CACHE_MAX_MB * mb, ttl_seconds=GENAI_CACHE_TTL_HOURS * 3600,
+                        policy=CACHE_EVICTION_POLICY)
+    vector_limits = dict(max_bytes=VECTOR_CACHE_MAX_MB * mb, ttl_seconds=VECTOR_CACHE_TTL_HOURS * 3600,
+                         policy=CACHE_EVICTION_POLICY)
+
+    managers = {
+        'genai': CacheManager('genai', remove_cached_result, max_entries=GENAI_CACHE_MAX_ENTRIES, **genai_limits),
+        'profiles': CacheManager('profiles', lambda k: get_store().delete('profiles', k),
+                                 max_entries=GENAI_CACHE_MAX_ENTRIES, **genai_limits),
+        'vector': CacheManager('vector', lambda k: _remove_files(os.path.join(VECTOR_DB_DIR, f"{k}.index"),
+                                                                 os.path.join(VECTOR_DB_DIR, f"{k}_metadata.pkl")),
+                               max_entries=VECTOR_CACHE_MAX_ENTRIES, **vector_limits),
+        # Embeddings are small and one per unique resume, so only the byte limit applies
+        'embeddings': CacheManager('embeddings', lambda k: _remove_files(
+                                       os.path.join(EMBEDDING_CACHE_DIR, k[:2], f"{k}.npy")), **vector_limits),
+        # Stored search results expire by age; the oldest go first when over the limits
+        'results': CacheManager('results', remove_result, max_bytes=RESULTS_MAX_MB * mb, max_entries=RESULTS_MAX_ENTRIES,
+                                ttl_seconds=RESULTS_TTL_HOURS * 3600, policy='lru'),
+    }
+    store = get_store()
+    refs_sizes = {key: size for key, size, _ in store.entries('profile_refs')}
+    managers['genai'].load((key, size + refs_sizes.get(key, 0), created) for key, size, created in store.entries('genai'))
+    managers['profiles'].load(store.entries('profiles'))
+    managers['vector'].load(_vector_entries())
+    managers['embeddings'].load(_scan_tree(EMBEDDING_CACHE_DIR, '.npy'))
+    managers['results'].load(store.entries('results'))
+    return managers
+
+
+_managers: Optional[Dict[str, CacheManager]] = None
+_managers_lock = threading.Lock()
+
+
+def get_cache_manager(name: str) -> CacheManager:
+    """Return the manager for 'genai', 'profiles', 'vector', 'embeddings' or 'results' (built on first use)."""
+    global _managers
+    if _managers is None:
+        with _managers_lock:
+            if _managers is None:
+                _managers = _build_managers()
+    return _managers[name]
+
+
+def get_cache_stats() -> Dict[str, dict]:
+    return {name: get_cache_manager(name).stats() for name in ('genai', 'profiles', 'vector', 'embeddings', 'results')}
+
+__all__ = ['CacheManager','get_cache_manager','get_cache_stats']
@@ -0,0 +1,114 @@
+"""Text chunking for the vector index.
+
+Chunks are sized with the embedding model's own tokenizer so that each one
+fits its maximum sequence length (256 word-pieces for all-MiniLM-L6-v2);
+anything beyond that limit is truncated by the model and never reaches the
+index. Chunks break on line/sentence boundaries and start a new chunk at
+section headings, with a configurable token overlap.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Tokens reserved for [CLS] and [SEP]
+_SPECIAL_TOKENS = 2
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?;])\s+')
+_SECTION_WORDS = ('experience', 'employment', 'education', 'skills', 'projects', 'certifications',
+                  'summary', 'profile', 'objective', 'achievements', 'publications', 'languages',
+                  'awards', 'training', 'responsibilities', 'technical')
+
+
+def split_text_into_word_chunks(text: str, chunk_size: int = 512, overlap: int = 50) -> List[str]:
+    """Legacy scheme: fixed windows of chunk_size words with a word overlap."""
+    words = text.split()
+    chunks = []
+
+    for i in range(0, len(words), chunk_size - overlap):
+        chunk = ' '.join(words[i:i+chunk_size])
+        if chunk.strip():
+            chunks.append(chunk)
+
+    return chunks if chunks else [text]
+
+
+def _is_section_heading(line: str) -> bool:
+    stripped = line.strip().rstrip(':').strip()
+    if not stripped or len(stripped) > 40 or len(stripped.split()) > 4:
+        return False
+    lowered = stripped.lower()
+    return line.strip().endswith(':') or stripped.isupper() or any(w in lowered for w in _SECTION_WORDS)
+
+
+def _segments(text: str) -> List[Tuple[str, bool]]:
+    """Split text into (segment, starts_section) pieces on line and sentence boundaries."""
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        heading = _is_section_heading(line)
+        for i, sentence in enumerate(_SENTENCE_SPLIT.split(line)):
+            if sentence:
+                segments.append((sentence, heading and i == 0))
+    return segments
+
+
+def split_text_into_token_chunks(text: str, tokenizer, max_tokens: int, overlap_tokens: int = 32) -> List[str]:
+    """
+    Pack line/sentence segments into chunks of at most max_tokens model tokens
+    (special tokens excluded). A segment longer than a whole chunk is cut at
+    token boundaries. Consecutive chunks share up to overlap_tokens of trailing
+    segments, and a section heading starts a new chunk once the current one is
+    at least half full.
+    """
+    budget = max(8, max_tokens - _SPECIAL_TOKENS)
+    overlap_tokens = min(overlap_tokens, budget // 2)
+    segments = _segments(text)
+    if not segments:
+        return [text] if text.strip() else []
+
+    encoded = tokenizer([s for s, _ in segments], add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+
+    # Expand over-long segments into token-bounded pieces
+    pieces: List[Tuple[str, int, bool]] = []
+    for (segment, heading), ids, offsets in zip(segments, encoded['input_ids'], encoded['offset_mapping']):
+        if len(ids) <= budget:
+            pieces.append((segment, len(ids), heading))
+            continue
+        for start in range(0, len(ids), budget):
+            window = offsets[start:start+budget]
+            pieces.append((segment[window[0][0]:window[-1][1]], len(window), heading and start == 0))
+
+    chunks: List[str] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+    has_new_content = False  # a chunk made only of carried-over overlap is never emitted
+
+    for piece, n, heading in pieces:
+        if has_new_content and (current_tokens + n > budget or (heading and current_tokens >= budget // 2)):
+            chunks.append(' '.join(p for p, _ in current))
+            # Carry trailing pieces forward as overlap, as long as the next piece still fits
+            carried, carried_tokens = [], 0
+            for prev_piece, prev_n in reversed(current):
+                if carried_tokens + prev_n > overlap_tokens or carried_tokens + prev_n + n > budget:
+                    break
+                carried.insert(0, (prev_piece, prev_n))
+                carried_tokens += prev_n
+            current, current_tokens, has_new_content = carried, carried_tokens, False
+        current.append((piece, n))
+        current_tokens += n
+        has_new_content = True
+
+    if has_new_content:
+        chunks.append(' '.join(p for p, _ in current))
+    return chunks
+
+
+def chunking_signature(tokenizer, max_tokens: Optional[int], overlap_tokens: int) -> str:
+    """Identifies the chunking scheme, so cached embeddings/indexes are rebuilt when it changes."""
+    if tokenizer is None or not max_tokens:
+        return "words:512:50"
+    return f"tokens:{max_tokens}:{overlap_tokens}"
+
+__all__ = ['split_text_into_word_chunks','split_text_into_token_chunks','chunking_signature']
@@ -1,28 +1,46 @@
 import os
 import config as app_config
-from sentence_transformers import SentenceTransformer
 import faiss  # type: ignore
 
-# Directories
-CACHE_DIR = "cache_dir"
-VECTOR_DB_DIR = "vector_db"
+# Directories (anchored to DATA_DIR rather than the current working directory)
+DATA_DIR = getattr(app_config, 'DATA_DIR', os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+CACHE_DIR = os.path.join(DATA_DIR, "cache_dir")
+VECTOR_DB_DIR = os.path.join(DATA_DIR, "vector_db")
+INGEST_DIR = os.path.join(DATA_DIR, "ingest_db")
+BULK_JOBS_DIR = os.path.join(DATA_DIR, "bulk_jobs")
 
 AI_PROVIDER = getattr(app_config, 'AI_PROVIDER', 'gemini').lower()
 
 # Gemini specific (only loaded if provider is gemini)
 GEMINI_KEY = getattr(app_config, 'GEMINI_KEY', None)
 GEMINI_MODEL = getattr(app_config, 'GEMINI_MODEL', None)
+GEMINI_CONTEXT_CACHE = getattr(app_config, 'GEMINI_CONTEXT_CACHE', False)
+GEMINI_CONTEXT_CACHE_TTL_MINUTES = getattr(app_config, 'GEMINI_CONTEXT_CACHE_TTL_MINUTES', 60)
 
 # Azure OpenAI specific
 AZURE_OPENAI_API_KEY = getattr(app_config, 'AZURE_OPENAI_API_KEY', os.getenv('AZURE_OPENAI_API_KEY'))
 AZURE_OPENAI_ENDPOINT = getattr(app_config, 'AZURE_OPENAI_ENDPOINT', os.getenv('AZURE_OPENAI_ENDPOINT'))
 AZURE_OPENAI_DEPLOYMENT = getattr(app_config, 'AZURE_OPENAI_DEPLOYMENT', os.getenv('AZURE_OPENAI_DEPLOYMENT'))
-AZURE_OPENAI_API_VERSION = getattr(app_config, 'AZURE_OPENAI_API_VERSION', os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview'))
+AZURE_OPENAI_API_VERSION = getattr(app_config, 'AZURE_OPENAI_API_VERSION', os.getenv('AZURE_OPENAI_API_VERSION', '2024-10-21'))
+PROVIDER_POOL = getattr(app_config, 'PROVIDER_POOL', 'gemini,azure')
+POOL_CONFIG = getattr(app_config, 'POOL_CONFIG', {})
+ADAPTIVE_CONFIG = getattr(app_config, 'ADAPTIVE_CONFIG', {})
+BULK_CONFIG = getattr(app_config, 'BULK_CONFIG', {})
+COST_CONFIG = getattr(app_config, 'COST_CONFIG', {})
 PERF_CONFIG = getattr(app_config, 'PERFORMANCE_CONFIG', {})
+PROMPT_CONFIG = getattr(app_config, 'PROMPT_CONFIG', {})
+INGEST_CONFIG = getattr(app_config, 'INGEST_CONFIG', {})
+CACHE_CONFIG = getattr(app_config, 'CACHE_CONFIG', {})
+LOGGING_CONFIG = getattr(app_config, 'LOGGING_CONFIG', {})
 
 # Feature flags & performance tuning
 ENABLE_VECTOR_SEARCH = getattr(app_config, 'ENABLE_VECTOR_SEARCH', True)
 LOCAL_MODEL_PATH = getattr(app_config, 'LOCAL_MODEL_PATH', 'models/all-MiniLM-L6-v2')
+EMBEDDING_BACKEND = getattr(app_config, 'EMBEDDING_BACKEND', 'torch')
+ONNX_MODEL_PATH = getattr(app_config, 'ONNX_MODEL_PATH', 'models/all-MiniLM-L6-v2-onnx')
+ONNX_THREADS = getattr(app_config, 'ONNX_THREADS', 0)
+CHUNK_MAX_TOKENS = getattr(app_config, 'CHUNK_MAX_TOKENS', 0)
+CHUNK_OVERLAP_TOKENS = getattr(app_config, 'CHUNK_OVERLAP_TOKENS', 32)
 SIMILARITY_THRESHOLD = PERF_CONFIG.get('SIMILARITY_THRESHOLD', 0.3)
 MAX_VECTOR_RESULTS = None
 BATCH_SIZE = 20
@@ -31,42 +49,151 @@ ENABLE_PARALLEL_READING = PERF_CONFIG.get('ENABLE_PARALLEL_READING', True)
 MAX_WORKERS = PERF_CONFIG.get('MAX_WORKERS', 4)
 BATCH_DELAY_SECONDS = PERF_CONFIG.get('BATCH_DELAY_SECONDS', 1)
 ENABLE_MEMORY_OPTIMIZATION = PERF_CONFIG.get('ENABLE_MEMORY_OPTIMIZATION', True)
+EMBED_BATCH_SIZE = PERF_CONFIG.get('EMBED_BATCH_SIZE', 64)
+EMBED_WORKERS = PERF_CONFIG.get('EMBED_WORKERS', 0)
+EMBED_MULTIPROCESS_MIN_CHUNKS = PERF_CONFIG.get('EMBED_MULTIPROCESS_MIN_CHUNKS', 5000)
+JSON_BACKEND = PERF_CONFIG.get('JSON_BACKEND', 'auto')
 
-for dir_path in [CACHE_DIR, VECTOR_DB_DIR]:
+# Provider pool
+POOL_DEFAULT_RPM = POOL_CONFIG.get('POOL_DEFAULT_RPM', 60)
+POOL_DEFAULT_CONCURRENCY = POOL_CONFIG.get('POOL_DEFAULT_CONCURRENCY', 2)
+POOL_FAILURE_THRESHOLD = POOL_CONFIG.get('POOL_FAILURE_THRESHOLD', 3)
+POOL_COOLDOWN_SECONDS = POOL_CONFIG.get('POOL_COOLDOWN_SECONDS', 60)
+POOL_MAX_ATTEMPTS = POOL_CONFIG.get('POOL_MAX_ATTEMPTS', 3)
+
+# Bulk jobs (asynchronous provider batch APIs)
+BULK_BACKEND = BULK_CONFIG.get('BULK_BACKEND', '') or (AI_PROVIDER if AI_PROVIDER in ('gemini', 'azure') else 'azure')
+BULK_RESUMES_PER_REQUEST = BULK_CONFIG.get('BULK_RESUMES_PER_REQUEST', 15)
+BULK_POLL_SECONDS = BULK_CONFIG.get('BULK_POLL_SECONDS', 60)
+AZURE_OPENAI_BATCH_DEPLOYMENT = BULK_CONFIG.get('AZURE_OPENAI_BATCH_DEPLOYMENT', '') or AZURE_OPENAI_DEPLOYMENT
+AZURE_OPENAI_BATCH_API_VERSION = BULK_CONFIG.get('AZURE_OPENAI_BATCH_API_VERSION', '2024-10-21')
+BULK_STANDIN_PORT = BULK_CONFIG.get('BULK_STANDIN_PORT', 8765)
+BULK_STANDIN_DELAY_SECONDS = BULK_CONFIG.get('BULK_STANDIN_DELAY_SECONDS', 5)
+
+# Token cost accounting (USD per 1M tokens: [input, cached input, output])
+MODEL_PRICES = COST_CONFIG.get('MODEL_PRICES', {})
+BATCH_API_PRICE_FACTOR = COST_CONFIG.get('BATCH_API_PRICE_FACTOR', 0.5)
+
+# Logging
+LOG_LEVEL = LOGGING_CONFIG.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = LOGGING_CONFIG.get('LOG_FORMAT', 'text')
+PROGRESS_LOG_PERCENT_STEP = LOGGING_CONFIG.get('PROGRESS_LOG_PERCENT_STEP', 5)
+PROGRESS_LOG_INTERVAL_SECONDS = LOGGING_CONFIG.get('PROGRESS_LOG_INTERVAL_SECONDS', 1)
+
+# Adaptive batch size / concurrency (AIMD)
+ADAPTIVE_BATCHING = ADAPTIVE_CONFIG.get('ADAPTIVE_BATCHING', False)
+ADAPTIVE_MIN_BATCH = ADAPTIVE_CONFIG.get('ADAPTIVE_MIN_BATCH', 2)
+ADAPTIVE_MAX_BATCH = ADAPTIVE_CONFIG.get('ADAPTIVE_MAX_BATCH', 50)
+ADAPTIVE_MAX_CONCURRENCY = ADAPTIVE_CONFIG.get('ADAPTIVE_MAX_CONCURRENCY', 8)
+ADAPTIVE_TARGET_LATENCY_SECONDS = ADAPTIVE_CONFIG.get('ADAPTIVE_TARGET_LATENCY_SECONDS', 60)
+ADAPTIVE_BACKOFF_FACTOR = ADAPTIVE_CONFIG.get('ADAPTIVE_BACKOFF_FACTOR', 0.5)
+ADAPTIVE_MAX_RETRIES = ADAPTIVE_CONFIG.get('ADAPTIVE_MAX_RETRIES', 2)
+
+# Prompt compression: 'full' or 'relevant_chunks'
+PROMPT_MODE = PROMPT_CONFIG.get('PROMPT_MODE', 'full')
+PROMPT_TOP_K_CHUNKS = PROMPT_CONFIG.get('PROMPT_TOP_K_CHUNKS', 3)
+PROMPT_MAX_TOKENS_PER_RESUME = PROMPT_CONFIG.get('PROMPT_MAX_TOKENS_PER_RESUME', 1200)
+# Output: 'full' or 'compact' (schema-enforced short keys)
+OUTPUT_MODE = PROMPT_CONFIG.get('OUTPUT_MODE', 'full')
+SUMMARY_MAX_WORDS = PROMPT_CONFIG.get('SUMMARY_MAX_WORDS', 200)
+SCORE_BREAKDOWN_MAX_WORDS = PROMPT_CONFIG.get('SCORE_BREAKDOWN_MAX_WORDS', 50)
+COMPACT_SUMMARY_MAX_WORDS = PROMPT_CONFIG.get('COMPACT_SUMMARY_MAX_WORDS', 60)
+COMPACT_SCORE_BREAKDOWN_MAX_WORDS = PROMPT_CONFIG.get('COMPACT_SCORE_BREAKDOWN_MAX_WORDS', 20)
+# Compressed resumes are much shorter, so more of them fit in a single API call
+if PROMPT_MODE == 'relevant_chunks':
+    MAX_RESUMES_PER_BATCH = PROMPT_CONFIG.get('COMPRESSED_RESUMES_PER_BATCH', MAX_RESUMES_PER_BATCH)
+
+# Directory ingestion and background warm-up
+ENABLE_RECURSIVE_SCAN = INGEST_CONFIG.get('ENABLE_RECURSIVE_SCAN', True)
+ENABLE_DIRECTORY_WATCHER = INGEST_CONFIG.get('ENABLE_DIRECTORY_WATCHER', False)
+WATCH_DIRS = INGEST_CONFIG.get('WATCH_DIRS', [])
+WATCHER_POLL_SECONDS = INGEST_CONFIG.get('WATCHER_POLL_SECONDS', 30)
+UPLOAD_MAX_MB = INGEST_CONFIG.get('UPLOAD_MAX_MB', 2048)
+UPLOAD_MAX_FILE_MB = INGEST_CONFIG.get('UPLOAD_MAX_FILE_MB', 25)
+UPLOAD_MAX_FILES = INGEST_CONFIG.get('UPLOAD_MAX_FILES', 50000)
+UPLOAD_INFLIGHT_MB = INGEST_CONFIG.get('UPLOAD_INFLIGHT_MB', 128)
+UPLOAD_WARM_EMBEDDINGS = INGEST_CONFIG.get('UPLOAD_WARM_EMBEDDINGS', True)
+EXTRACT_MAX_PAGES = INGEST_CONFIG.get('EXTRACT_MAX_PAGES', 40)
+EXTRACT_MAX_CHARS = INGEST_CONFIG.get('EXTRACT_MAX_CHARS', 100000)
+EXTRACT_TIMEOUT_SECONDS = INGEST_CONFIG.get('EXTRACT_TIMEOUT_SECONDS', 20)
+EXTRACT_PROBE_PAGES = INGEST_CONFIG.get('EXTRACT_PROBE_PAGES', 2)
+EXTRACT_MIN_CHARS_PER_PAGE = INGEST_CONFIG.get('EXTRACT_MIN_CHARS_PER_PAGE', 40)
+ENABLE_NEAR_DUPLICATES = INGEST_CONFIG.get('ENABLE_NEAR_DUPLICATES', True)
+NEAR_DUPLICATE_MAX_DISTANCE = INGEST_CONFIG.get('NEAR_DUPLICATE_MAX_DISTANCE', 8)
+ENABLE_TEXT_NORMALIZATION = INGEST_CONFIG.get('ENABLE_TEXT_NORMALIZATION', True)
+
+# Cache size limits and eviction (0 disables a limit)
+CACHE_EVICTION_POLICY = CACHE_CONFIG.get('CACHE_EVICTION_POLICY', 'lru')
+GENAI_CACHE_MAX_MB = CACHE_CONFIG.get('GENAI_CACHE_MAX_MB', 512)
+GENAI_CACHE_MAX_ENTRIES = CACHE_CONFIG.get('GENAI_CACHE_MAX_ENTRIES', 50000)
+GENAI_CACHE_TTL_HOURS = CACHE_CONFIG.get('GENAI_CACHE_TTL_HOURS', 720)
+VECTOR_CACHE_MAX_MB = CACHE_CONFIG.get('VECTOR_CACHE_MAX_MB', 2048)
+VECTOR_CACHE_MAX_ENTRIES = CACHE_CONFIG.get('VECTOR_CACHE_MAX_ENTRIES', 50)
+VECTOR_CACHE_TTL_HOURS = CACHE_CONFIG.get('VECTOR_CACHE_TTL_HOURS', 0)
+RESULTS_MAX_MB = CACHE_CONFIG.get('RESULTS_MAX_MB', 256)
+RESULTS_MAX_ENTRIES = CACHE_CONFIG.get('RESULTS_MAX_ENTRIES', 1000)
+RESULTS_TTL_HOURS = CACHE_CONFIG.get('RESULTS_TTL_HOURS', 168)
+RESULTS_PAGE_SIZE = CACHE_CONFIG.get('RESULTS_PAGE_SIZE', 50)
+
+for dir_path in [CACHE_DIR, VECTOR_DB_DIR, INGEST_DIR]:
     os.makedirs(dir_path, exist_ok=True)
 
 # Lazy loaded globals
 _embedding_model = None
 
 
+def _load_onnx_model():
+    from .onnx_embedder import OnnxEmbedder
+    onnx_model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', ONNX_MODEL_PATH))
+    model = OnnxEmbedder(onnx_model_path, threads=ONNX_THREADS)
+    print(f"🔧 ONNX embedding model loaded from: {model.model_file}")
+    return model
+
+
+def _load_torch_model():
+    from sentence_transformers import SentenceTransformer  # imports torch, so only when this backend is used
+    # Try to load from configurable local model directory first (for offline deployment)
+    local_model_path = os.path.join(os.path.dirname(__file__), '..', LOCAL_MODEL_PATH)
+    local_model_path = os.path.abspath(local_model_path)
+
+    if os.path.exists(local_model_path):
+        model = SentenceTransformer(local_model_path)
+        print(f"🔧 Sentence transformer model loaded from local path: {local_model_path}")
+    else:
+        print(f"⚠️ Local model not found at: {local_model_path}")
+        print("🔧 Attempting to download from Hugging Face (requires internet)...")
+        # Fallback to downloading from Hugging Face (requires internet)
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+        print("✅ Sentence transformer model downloaded from Hugging Face")
+    return model
+
+
 def get_embedding_model():
-    """Initialize the sentence transformer model for embeddings using local model."""
+    """Initialize the embedding model (SentenceTransformer or ONNX Runtime, per EMBEDDING_BACKEND) from a local path."""
     global _embedding_model
     if _embedding_model is not None:
         return _embedding_model
     if not ENABLE_VECTOR_SEARCH:
         return None
+    if EMBEDDING_BACKEND == 'onnx':
+        try:
+            _embedding_model = _load_onnx_model()
+            return _embedding_model
+        except Exception as e:
+            print(f"⚠️ Warning: Could not load ONNX embedding model: {e}")
+            print("🔧 Falling back to the sentence transformer model")
     try:
-        # Try to load from configurable local model directory first (for offline deployment)
-        local_model_path = os.path.join(os.path.dirname(__file__), '..', LOCAL_MODEL_PATH)
-        local_model_path = os.path.abspath(local_model_path)
-        
-        if os.path.exists(local_model_path):
-            _embedding_model = SentenceTransformer(local_model_path)
-            print(f"🔧 Sentence transformer model loaded from local path: {local_model_path}")
-        else:
-            print(f"⚠️ Local model not found at: {local_model_path}")
-            print("🔧 Attempting to download from Hugging Face (requires internet)...")
-            # Fallback to downloading from Hugging Face (requires internet)
-            _embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("✅ Sentence transformer model downloaded from Hugging Face")
+        _embedding_model = _load_torch_model()
     except Exception as e:
         print(f"⚠️ Warning: Could not load sentence transformer model: {e}")
         print("Vector search will be disabled")
         _embedding_model = None
     return _embedding_model
 
-if AI_PROVIDER == 'gemini':
+from .serialization import set_backend as _set_json_backend
+_set_json_backend(JSON_BACKEND)
+
+if AI_PROVIDER == 'gemini' or (AI_PROVIDER == 'pool' and 'gemini' in PROVIDER_POOL.lower()):
     try:
         import google.generativeai as genai  # local import to isolate provider dependency
         if not GEMINI_KEY:
@@ -83,13 +210,28 @@ elif AI_PROVIDER == 'azure':
     }.items() if not v]
     if missing:
         print(f"⚠️ Azure OpenAI config missing: {', '.join(missing)}")
-else:
+elif AI_PROVIDER != 'pool':
     print(f"⚠️ Unknown AI_PROVIDER '{AI_PROVIDER}'. Defaulting to gemini dispatch error mode.")
 
 __all__ = [
-    'CACHE_DIR','VECTOR_DB_DIR','AI_PROVIDER','GEMINI_KEY','GEMINI_MODEL',
+    'DATA_DIR','CACHE_DIR','VECTOR_DB_DIR','INGEST_DIR','BULK_JOBS_DIR','AI_PROVIDER','GEMINI_KEY','GEMINI_MODEL','GEMINI_CONTEXT_CACHE','GEMINI_CONTEXT_CACHE_TTL_MINUTES',
     'AZURE_OPENAI_API_KEY','AZURE_OPENAI_ENDPOINT','AZURE_OPENAI_DEPLOYMENT','AZURE_OPENAI_API_VERSION','PERF_CONFIG',
-    'ENABLE_VECTOR_SEARCH','LOCAL_MODEL_PATH','SIMILARITY_THRESHOLD','MAX_VECTOR_RESULTS','BATCH_SIZE',
+    'BULK_BACKEND','BULK_RESUMES_PER_REQUEST','BULK_POLL_SECONDS','AZURE_OPENAI_BATCH_DEPLOYMENT','AZURE_OPENAI_BATCH_API_VERSION',
+    'BULK_STANDIN_PORT','BULK_STANDIN_DELAY_SECONDS','MODEL_PRICES','BATCH_API_PRICE_FACTOR',
+    'LOG_LEVEL','LOG_FORMAT','PROGRESS_LOG_PERCENT_STEP','PROGRESS_LOG_INTERVAL_SECONDS',
+    'ADAPTIVE_BATCHING','ADAPTIVE_MIN_BATCH','ADAPTIVE_MAX_BATCH','ADAPTIVE_MAX_CONCURRENCY','ADAPTIVE_TARGET_LATENCY_SECONDS',
+    'ADAPTIVE_BACKOFF_FACTOR','ADAPTIVE_MAX_RETRIES',
+    'PROVIDER_POOL','POOL_DEFAULT_RPM','POOL_DEFAULT_CONCURRENCY','POOL_FAILURE_THRESHOLD','POOL_COOLDOWN_SECONDS','POOL_MAX_ATTEMPTS',
+    'ENABLE_VECTOR_SEARCH','LOCAL_MODEL_PATH','EMBEDDING_BACKEND','ONNX_MODEL_PATH','ONNX_THREADS','CHUNK_MAX_TOKENS','CHUNK_OVERLAP_TOKENS','SIMILARITY_THRESHOLD','MAX_VECTOR_RESULTS','BATCH_SIZE',
     'MAX_RESUMES_PER_BATCH','ENABLE_PARALLEL_READING','MAX_WORKERS','BATCH_DELAY_SECONDS',
-    'ENABLE_MEMORY_OPTIMIZATION','get_embedding_model'
+    'ENABLE_MEMORY_OPTIMIZATION','EMBED_BATCH_SIZE','EMBED_WORKERS','EMBED_MULTIPROCESS_MIN_CHUNKS','JSON_BACKEND','PROMPT_MODE','PROMPT_TOP_K_CHUNKS','PROMPT_MAX_TOKENS_PER_RESUME',
+    'OUTPUT_MODE','SUMMARY_MAX_WORDS','SCORE_BREAKDOWN_MAX_WORDS','COMPACT_SUMMARY_MAX_WORDS','COMPACT_SCORE_BREAKDOWN_MAX_WORDS',
+    'ENABLE_RECURSIVE_SCAN','ENABLE_DIRECTORY_WATCHER','WATCH_DIRS','WATCHER_POLL_SECONDS','UPLOAD_MAX_MB','UPLOAD_MAX_FILE_MB',
+    'UPLOAD_MAX_FILES','UPLOAD_INFLIGHT_MB','UPLOAD_WARM_EMBEDDINGS','EXTRACT_MAX_PAGES','EXTRACT_MAX_CHARS','EXTRACT_TIMEOUT_SECONDS',
+    'EXTRACT_PROBE_PAGES','EXTRACT_MIN_CHARS_PER_PAGE','ENABLE_NEAR_DUPLICATES','NEAR_DUPLICATE_MAX_DISTANCE',
+    'ENABLE_TEXT_NORMALIZATION',
+    'CACHE_EVICTION_POLICY','GENAI_CACHE_MAX_MB','GENAI_CACHE_MAX_ENTRIES','GENAI_CACHE_TTL_HOURS',
+    'VECTOR_CACHE_MAX_MB','VECTOR_CACHE_MAX_ENTRIES','VECTOR_CACHE_TTL_HOURS',
+    'RESULTS_MAX_MB','RESULTS_MAX_ENTRIES','RESULTS_TTL_HOURS','RESULTS_PAGE_SIZE',
+    'get_embedding_model'
 ]
@@ -0,0 +1,239 @@
+"""Corpus registry.
+
+A corpus is a named set of resume directories with a stable ID derived from
+its normalized paths. Resumes are deduplicated by content hash across all
+directories of a corpus; since extracted text, embeddings and LLM profiles are
+all keyed by content, identical files in different teams' folders are only
+processed and stored once.
+
+An uploaded archive (see archive.py) is registered as an upload corpus: it has
+no directories, and its member list ({path: content hash} and member mtimes) is
+kept in its own file under ingest_db/uploads, since the members' text is already
+in the store.
+
+load_corpus() also drops older near-duplicate versions of a resume (see
+near_dup.py) when ENABLE_NEAR_DUPLICATES is set, and reports how much text
+normalization removed from the corpus's resumes.
+"""
+
+import os, json, hashlib, threading, time
+from typing import Dict, List, Optional, Tuple
+from .config import INGEST_DIR, ENABLE_NEAR_DUPLICATES
+from .ingest import refresh_manifest, load_texts, load_stored_texts, text_reduction, _atomic_write_json
+from .near_dup import collapse_near_duplicates
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+REGISTRY_PATH = os.path.join(INGEST_DIR, "corpora.json")
+UPLOADS_DIR = os.path.join(INGEST_DIR, "uploads")
+os.makedirs(UPLOADS_DIR, exist_ok=True)
+
+
+def _normalize_paths(paths: List[str]) -> List[str]:
+    return sorted({os.path.normcase(os.path.abspath(p.strip())) for p in paths if p and p.strip()})
+
+
+def corpus_id_for(paths: List[str]) -> str:
+    """Stable corpus ID: the same set of directories always maps to the same ID."""
+    combined = '|'.join(_normalize_paths(paths))
+    return hashlib.md5(combined.encode('utf-8')).hexdigest()[:16]
+
+
+def _upload_path(corpus_id: str) -> str:
+    return os.path.join(UPLOADS_DIR, f"{corpus_id}.json")
+
+
+class CorpusRegistry:
+    """JSON-backed registry of corpora (id -> name, paths, created)."""
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._corpora: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._corpora = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Warning: Could not load corpus registry: {e}")
+
+    def register(self, paths: List[str], name: str = None) -> dict:
+        """Register (or look up) the corpus for these directories and return its record."""
+        normalized = _normalize_paths(paths)
+        if not normalized:
+            raise ValueError("A corpus needs at least one directory.")
+        corpus_id = corpus_id_for(normalized)
+        with self._lock:
+            corpus = self._corpora.get(corpus_id)
+            if corpus is None or (name and corpus.get('name') != name):
+                corpus = corpus or {'id': corpus_id, 'paths': normalized, 'created': time.time()}
+                corpus['name'] = name or corpus.get('name') or os.path.basename(normalized[0])
+                self._corpora[corpus_id] = corpus
+                self._save()
+        return dict(corpus)
+
+    def register_upload(self, files: Dict[str, str], name: str, mtimes: Dict[str, float] = None) -> dict:
+        """Register (or look up) the corpus for an uploaded archive's members ({path: content hash})."""
+        if not files:
+            raise ValueError("An upload corpus needs at least one file.")
+        combined = '|'.join(f"{path}:{content_hash}" for path, content_hash in sorted(files.items()))
+        corpus_id = hashlib.md5(combined.encode('utf-8')).hexdigest()[:16]
+        _atomic_write_json(_upload_path(corpus_id), {'files': files, 'mtimes': mtimes or {}})
+        with self._lock:
+            corpus = self._corpora.get(corpus_id) or {'id': corpus_id, 'paths': [], 'upload': True, 'created': time.time()}
+            corpus['name'] = name or corpus.get('name') or corpus_id
+            corpus['files'] = len(files)
+            self._corpora[corpus_id] = corpus
+            self._save()
+        return dict(corpus)
+
+    def get(self, corpus_id: str) -> Optional[dict]:
+        with self._lock:
+            corpus = self._corpora.get(corpus_id)
+            return dict(corpus) if corpus else None
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            return [dict(c) for c in self._corpora.values()]
+
+    def remove(self, corpus_id: str) -> bool:
+        with self._lock:
+            corpus = self._corpora.pop(corpus_id, None)
+            if corpus is None:
+                return False
+            self._save()
+        if corpus.get('upload') and os.path.exists(_upload_path(corpus_id)):
+            os.remove(_upload_path(corpus_id))
+        return True
+
+    def _save(self):
+        try:
+            _atomic_write_json(self.path, self._corpora)
+        except Exception as e:
+            logger.warning(f"⚠️ Warning: Could not save corpus registry: {e}")
+
+
+_registry: Optional[CorpusRegistry] = None
+
+
+def get_corpus_registry() -> CorpusRegistry:
+    global _registry
+    if _registry is None:
+        _registry = CorpusRegistry()
+    return _registry
+
+
+def _key_prefixes(paths: List[str]) -> Dict[str, str]:
+    """Result keys are relative paths; with several directories, prefix them with a unique folder name."""
+    if len(paths) == 1:
+        return {paths[0]: ''}
+    prefixes, used = {}, set()
+    for i, path in enumerate(paths):
+        prefix = os.path.basename(path.rstrip(os.sep)) or f"dir{i}"
+        if prefix in used:
+            prefix = f"{prefix}-{i}"
+        used.add(prefix)
+        prefixes[path] = prefix + '/'
+    return prefixes
+
+
+def load_corpus_resumes(paths: List[str], versions: Optional[Dict[str, dict]] = None
+                        ) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Load the unique resumes of a set of directories.
+
+    Returns (resumes_data, duplicates): resumes_data has one entry per distinct
+    content hash, and duplicates maps each kept key to the other paths that
+    have identical content. Pass versions to receive {key: {'hash', 'mtime'}}
+    for the kept resumes.
+    """
+    resumes_data: Dict[str, str] = {}
+    duplicates: Dict[str, List[str]] = {}
+    kept_by_hash: Dict[str, str] = {}
+
+    paths = [p for p in _normalize_paths(paths) if os.path.isdir(p)]
+    prefixes = _key_prefixes(paths)
+    for resume_dir in paths:
+        entries, _, _ = refresh_manifest(resume_dir)
+        unique_entries = {}
+        for rel_path, entry in sorted(entries.items()):
+            key = prefixes[resume_dir] + rel_path
+            kept = kept_by_hash.get(entry['hash'])
+            if kept is not None:
+                duplicates.setdefault(kept, []).append(key)
+                continue
+            kept_by_hash[entry['hash']] = key
+            unique_entries[rel_path] = entry
+            if versions is not None:
+                versions[key] = {'hash': entry['hash'], 'mtime': entry.get('mtime')}
+
+        for rel_path, text in load_texts(resume_dir, unique_entries).items():
+            resumes_data[prefixes[resume_dir] + rel_path] = text
+
+    total = len(resumes_data) + sum(len(v) for v in duplicates.values())
+    if duplicates:
+        logger.info(f"🧬 Deduplicated {total} file(s) → {len(resumes_data)} unique resume(s) by content hash",
+                    extra={'files': total, 'unique': len(resumes_data)})
+    return resumes_data, duplicates
+
+
+def load_upload_resumes(corpus_id: str, versions: Optional[Dict[str, dict]] = None
+                        ) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """Same as load_corpus_resumes, for an upload corpus: texts come straight from the store by content hash."""
+    try:
+        with open(_upload_path(corpus_id), 'r', encoding='utf-8') as f:
+            upload = json.load(f)
+        files: Dict[str, str] = upload['files']
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"⚠️ Warning: Could not load upload '{corpus_id}': {e}", extra={'corpus_id': corpus_id})
+        return {}, {}
+    duplicates: Dict[str, List[str]] = {}
+    kept_by_hash: Dict[str, str] = {}
+    for key, content_hash in sorted(files.items()):
+        kept = kept_by_hash.setdefault(content_hash, key)
+        if kept != key:
+            duplicates.setdefault(kept, []).append(key)
+    texts = load_stored_texts(list(kept_by_hash))
+    resumes_data = {key: texts[content_hash] for content_hash, key in sorted(kept_by_hash.items(), key=lambda kv: kv[1])
+                    if texts.get(content_hash)}
+    if versions is not None:
+        mtimes = upload.get('mtimes') or {}
+        for content_hash, key in kept_by_hash.items():
+            versions[key] = {'hash': content_hash, 'mtime': mtimes.get(key)}
+    if duplicates:
+        logger.info(f"🧬 Deduplicated {len(files)} file(s) → {len(kept_by_hash)} unique resume(s) by content hash",
+                    extra={'files': len(files), 'unique': len(kept_by_hash)})
+    return resumes_data, duplicates
+
+
+def load_corpus(corpus: dict, near_duplicates: Optional[Dict[str, List[str]]] = None,
+                text_stats: Optional[dict] = None) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Load a registered corpus: its directories, or an uploaded archive's members.
+    With ENABLE_NEAR_DUPLICATES, older near-duplicate versions are left out of
+    resumes_data; pass near_duplicates to receive {kept_key: [older version keys]}.
+    Pass text_stats to receive the characters and tokens normalization removed
+    from the loaded resumes (see ingest.text_reduction).
+    """
+    versions: Dict[str, dict] = {}
+    if corpus.get('upload'):
+        resumes_data, duplicates = load_upload_resumes(corpus['id'], versions)
+    else:
+        resumes_data, duplicates = load_corpus_resumes(corpus['paths'], versions)
+    if ENABLE_NEAR_DUPLICATES and len(resumes_data) > 1:
+        collapsed = collapse_near_duplicates(resumes_data, versions)
+        for older in collapsed.values():
+            # Exact copies of a left-out version go with it
+            older.extend(copy for key in list(older) for copy in duplicates.pop(key, []))
+        if near_duplicates is not None:
+            near_duplicates.update(collapsed)
+    if text_stats is not None:
+        text_stats.update(text_reduction([versions[key]['hash'] for key in resumes_data if key in versions]))
+        if text_stats['chars_saved']:
+            logger.info(f"🧹 Normalized text: {text_stats['raw_chars']:,} → {text_stats['chars']:,} chars "
+                        f"({text_stats['rate']:.1%} smaller, ~{text_stats['tokens_saved']:,} tokens saved)",
+                        extra={'corpus_id': corpus.get('id'), **text_stats})
+    return resumes_data, duplicates
+
+__all__ = ['corpus_id_for','CorpusRegistry','get_corpus_registry','load_corpus_resumes','load_upload_resumes','load_corpus']
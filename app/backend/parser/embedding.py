@@ -0,0 +1,107 @@
+"""Bulk chunk encoding for index builds.
+
+Chunks are sorted by token length and encoded in batches of similar length,
+so little compute goes to padding. Large jobs are sharded across a process
+pool, with each worker loading its own copy of the embedding model and getting
+an even share of the CPU threads. Results are written straight into one
+preallocated float32 array in the caller's order.
+"""
+
+import os, time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+import numpy as np
+from .config import EMBED_BATCH_SIZE, EMBED_WORKERS, EMBED_MULTIPROCESS_MIN_CHUNKS, get_embedding_model
+from .onnx_embedder import OnnxEmbedder
+from .progress import ProgressTracker
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Batches per task sent to a worker; small enough to balance load across workers
+_BATCHES_PER_TASK = 4
+
+_worker_model = None
+
+
+def _token_lengths(embed_model, texts: List[str]) -> np.ndarray:
+    tokenizer = getattr(embed_model, 'tokenizer', None)
+    if tokenizer is not None:
+        try:
+            return np.fromiter((len(ids) for ids in tokenizer(texts, add_special_tokens=True, verbose=False)['input_ids']),
+                               dtype=np.int64, count=len(texts))
+        except Exception:
+            pass
+    return np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+
+
+def _length_sorted_batches(embed_model, texts: List[str], batch_size: int) -> List[np.ndarray]:
+    """Index arrays of batches, longest chunks first, so each batch pads to a similar length."""
+    order = np.argsort(-_token_lengths(embed_model, texts), kind='stable')
+    return [order[i:i+batch_size] for i in range(0, len(order), batch_size)]
+
+
+def _default_workers() -> int:
+    return EMBED_WORKERS if EMBED_WORKERS > 0 else max(1, (os.cpu_count() or 1) // 2)
+
+
+def _init_worker(threads: int):
+    global _worker_model
+    from . import config as parser_config
+    parser_config.ONNX_THREADS = threads  # read when the ONNX session is created
+    _worker_model = get_embedding_model()
+    if _worker_model is not None and not isinstance(_worker_model, OnnxEmbedder):
+        import torch
+        torch.set_num_threads(threads)
+
+
+def _encode_task(batches: List[List[str]]) -> List[np.ndarray]:
+    return [np.asarray(_worker_model.encode(batch, batch_size=len(batch), show_progress_bar=False), dtype=np.float32)
+            for batch in batches]
+
+
+def encode_texts(texts: List[str], batch_size: Optional[int] = None, workers: Optional[int] = None) -> np.ndarray:
+    """
+    Encode texts into a (len(texts), dim) float32 array (not normalized).
+    Uses a process pool when there are at least EMBED_MULTIPROCESS_MIN_CHUNKS texts
+    and more than one worker is configured.
+    """
+    embed_model = get_embedding_model()
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    workers = workers or _default_workers()
+    if len(texts) < EMBED_MULTIPROCESS_MIN_CHUNKS:
+        workers = 1
+
+    start = time.time()
+    batches = _length_sorted_batches(embed_model, texts, batch_size)
+    out = np.empty((len(texts), embed_model.get_sentence_embedding_dimension()), dtype=np.float32)
+    progress = ProgressTracker(len(texts), "Encoding chunks") if len(texts) >= EMBED_MULTIPROCESS_MIN_CHUNKS else None
+
+    if workers <= 1:
+        for idx in batches:
+            out[idx] = embed_model.encode([texts[i] for i in idx], batch_size=len(idx), show_progress_bar=False)
+    else:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        tasks = [batches[i:i+_BATCHES_PER_TASK] for i in range(0, len(batches), _BATCHES_PER_TASK)]
+        # spawn: torch and tokenizers thread pools don't survive fork
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = {pool.submit(_encode_task, [[texts[i] for i in idx] for idx in task]): task for task in tasks}
+            for future in as_completed(futures):
+                for idx, embeddings in zip(futures[future], future.result()):
+                    out[idx] = embeddings
+                if progress:
+                    progress.update(sum(len(idx) for idx in futures[future]))
+
+    elapsed = time.time() - start
+    if progress:
+        progress.complete()
+    # Bulk encodes (with a progress tracker) are worth a line; per-query encodes only at debug
+    (logger.info if progress else logger.debug)(
+        f"⚡ Encoded {len(texts)} chunks in {elapsed:.2f}s ({len(texts) / max(elapsed, 1e-9):,.0f} chunks/s, "
+        f"{workers} process{'es' if workers > 1 else ''})",
+        extra={'chunks': len(texts), 'seconds': round(elapsed, 3), 'workers': workers})
+    return out
+
+__all__ = ['encode_texts']
@@ -1,109 +1,402 @@
-import os
-from typing import Dict, List, Optional
+"""Text extraction for PDF, DOCX and TXT resumes, from disk or from bytes in memory.
+
+Every file is read under the same budgets: at most EXTRACT_MAX_PAGES PDF pages
+and EXTRACT_MAX_CHARS characters, and reading stops between pages once
+EXTRACT_TIMEOUT_SECONDS have passed (the text read so far is kept). A PDF whose
+first EXTRACT_PROBE_PAGES pages have almost no text is an image-only scan and
+is skipped without reading the rest.
+
+DOCX files are read by stream-parsing the XML parts inside the zip (body,
+headers, footers, footnotes) with iterparse; no object model is built, and
+text in tables and text boxes is included. Each file's time and outcome go to
+metrics.record_extract, which keeps the slowest files for GET /extract-report.
+
+With ENABLE_TEXT_NORMALIZATION, extracted text is cleaned once, before it is
+stored (normalize_text): running page headers/footers and page numbers are
+dropped, words hyphenated across lines are rejoined, bullet and icon glyphs are
+removed and whitespace is collapsed. Everything downstream (chunks,
+embeddings, prompts) sees the smaller text.
+"""
+
+import io, os, re, time, unicodedata, zipfile
+from collections import Counter
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
 import pypdf
-import docx
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from .config import ENABLE_PARALLEL_READING, MAX_WORKERS
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from .config import (ENABLE_PARALLEL_READING, MAX_WORKERS, EXTRACT_MAX_PAGES, EXTRACT_MAX_CHARS,
+                     EXTRACT_TIMEOUT_SECONDS, EXTRACT_PROBE_PAGES, EXTRACT_MIN_CHARS_PER_PAGE,
+                     ENABLE_TEXT_NORMALIZATION)
 from .progress import ProgressTracker
+from .metrics import record_extract
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _deadline() -> Optional[float]:
+    return time.time() + EXTRACT_TIMEOUT_SECONDS if EXTRACT_TIMEOUT_SECONDS else None
+
+
+def _cap(text: str, info: dict) -> str:
+    if EXTRACT_MAX_CHARS and len(text) > EXTRACT_MAX_CHARS:
+        info['outcome'] = 'truncated'
+        return text[:EXTRACT_MAX_CHARS]
+    return text
+
+
+def _pdf_text(stream: BinaryIO, info: dict) -> str:
+    reader = pypdf.PdfReader(stream)
+    total = info['pages'] = len(reader.pages)
+    probe = min(EXTRACT_PROBE_PAGES, total) if EXTRACT_MIN_CHARS_PER_PAGE else 0
+    deadline = _deadline()
+    parts, chars = [], 0
+    for i, page in enumerate(reader.pages):
+        if EXTRACT_MAX_PAGES and i >= EXTRACT_MAX_PAGES:
+            info['outcome'] = 'truncated'
+            break
+        if deadline and time.time() > deadline:
+            info['outcome'] = 'timeout'
+            break
+        text = page.extract_text() or ""
+        parts.append(text + "\f")   # page break, so normalize_text can find running headers/footers
+        chars += len(text.strip())
+        if i + 1 == probe and chars < EXTRACT_MIN_CHARS_PER_PAGE * probe:
+            info['outcome'] = 'image_only'
+            return ""
+        if EXTRACT_MAX_CHARS and chars >= EXTRACT_MAX_CHARS:
+            if i + 1 < total:
+                info['outcome'] = 'truncated'
+            break
+    info['pages_read'] = len(parts)
+    return _cap("".join(parts), info)
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+# Body first, then headers, footers and notes (a resume's contact line often sits in the header)
+_DOCX_PARTS = re.compile(r'word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+
+
+def _docx_part_order(name: str) -> tuple:
+    return (not name.endswith('document.xml'), name)
+
+
+def _docx_runs(part: BinaryIO) -> Iterator[str]:
+    """Text pieces of one WordprocessingML part, with newlines at paragraph ends."""
+    fallback_depth = 0   # text boxes appear twice: as DrawingML (Choice) and as a VML Fallback copy
+    for event, elem in ET.iterparse(part, events=('start', 'end')):
+        tag = elem.tag
+        if tag == _MC_FALLBACK:
+            fallback_depth += 1 if event == 'start' else -1
+            continue
+        if event == 'start' or fallback_depth:
+            continue
+        if tag == _W + 't':
+            if elem.text:
+                yield elem.text
+        elif tag == _W + 'tab':
+            yield '\t'
+        elif tag in (_W + 'br', _W + 'cr'):
+            yield '\n'
+        elif tag == _W + 'p':
+            yield '\n'
+            elem.clear()
+
+
+def _docx_text(source: Union[str, BinaryIO], info: dict) -> str:
+    deadline = _deadline()
+    parts, chars = [], 0
+    with zipfile.ZipFile(source) as archive:
+        names = sorted((n for n in archive.namelist() if _DOCX_PARTS.match(n)), key=_docx_part_order)
+        if 'word/document.xml' not in names:
+            raise ValueError("not a Word document (no word/document.xml)")
+        for name in names:
+            with archive.open(name) as part:
+                for piece in _docx_runs(part):
+                    parts.append(piece)
+                    chars += len(piece)
+                    if EXTRACT_MAX_CHARS and chars >= EXTRACT_MAX_CHARS:
+                        info['outcome'] = 'truncated'
+                        return _cap("".join(parts), info)
+                    if deadline and piece == '\n' and time.time() > deadline:
+                        info['outcome'] = 'timeout'
+                        return "".join(parts)
+    return _cap("".join(parts), info)
+
+
+# Outcomes that depend on machine load rather than on the file: their text is used
+# for the current request but not stored, so the next load extracts the file again
+RETRY_OUTCOMES = ('timeout', 'abandoned')
+
+
+# Text normalization
+
+_EDGE_LINES = 2   # lines at the top and bottom of each page checked for running headers/footers
+_BULLETS = '•●○◦▪▫■□◆◇►▶▸➢➤✓✔✗❖∙·'
+_LEADING_BULLET = re.compile(rf'^(?:[{_BULLETS}]\s*|[-*>–—]\s+)+')
+_INNER_BULLET = re.compile(rf'\s*[{_BULLETS}]+\s*')
+# Soft hyphens, zero-width and control characters (form feeds are kept), replacement
+# characters, icon fonts (private use area), dingbats and emoji
+_GLYPHS = re.compile('[\u00ad\u200b-\u200f\u2060-\u2064\ufeff\ufffd\x00-\x08\x0b\x0e-\x1f\x7f'
+                     '\ue000-\uf8ff\u2600-\u27bf\U0001f300-\U0001faff]')
+_SPACES = re.compile(r'[^\S\n]+')
+_PAGE_NUMBER = re.compile(r'^(?:page\s*)?\d{1,3}(?:\s*(?:/|of)\s*\d{1,3})?$', re.IGNORECASE)
+_PAGE_REF = re.compile(r'\bpage\s*\d+(?:\s*(?:/|of)\s*\d+)?')
+_HYPHEN_BREAK = re.compile(r'(?<=[a-z])-[^\S\n\f]*\n[^\S\n\f]*(?=[a-z])')
+_BLANK_RUNS = re.compile(r'\n{3,}')
+
+
+def _clean_line(line: str) -> str:
+    line = _SPACES.sub(' ', line).strip()
+    line = _LEADING_BULLET.sub('', line)
+    return _INNER_BULLET.sub(', ', line).strip(', ')
+
+
+def _line_key(line: str) -> str:
+    """Lines compare case-insensitively, with "Page 2 of 3" matching "Page 3 of 3"."""
+    return _PAGE_REF.sub('page #', line.lower())
 
 
-def read_pdf(file_path: str) -> str:
-    """Extracts text from a PDF file."""
+def normalize_text(text: str) -> str:
+    """
+    Clean extracted text for embedding and prompting. Pages are separated by form
+    feeds; a line at the top or bottom of a page that recurs there on at least half
+    of the pages is a running header/footer and only its first occurrence is kept
+    (the resume's name often sits there). Page numbers are dropped, words split by
+    a line-end hyphen are rejoined and blank-line runs become one blank line.
+    """
+    if not text:
+        return text
+    text = _HYPHEN_BREAK.sub('', _GLYPHS.sub('', unicodedata.normalize('NFKC', text)))
+    pages = [[_clean_line(line) for line in page.splitlines()] for page in text.split('\f')]
+    pages = [lines for lines in pages if any(lines)]
+    if len(pages) > 1:
+        edges = []
+        for lines in pages:
+            content = [i for i, line in enumerate(lines) if line]
+            edges.append(sorted(set(content[:_EDGE_LINES] + content[-_EDGE_LINES:])))
+        counts = Counter(key for lines, idx in zip(pages, edges) for key in {_line_key(lines[i]) for i in idx})
+        min_pages = max(2, (len(pages) + 1) // 2)
+        seen = set()
+        for lines, idx in zip(pages, edges):
+            for i in idx:
+                key = _line_key(lines[i])
+                if _PAGE_NUMBER.match(lines[i]) or (key in seen and counts[key] >= min_pages):
+                    lines[i] = ''
+                seen.add(key)
+    return _BLANK_RUNS.sub('\n\n', '\n'.join('\n'.join(lines) for lines in pages)).strip()
+
+
+def _normalize(text: str, info: dict) -> str:
+    """Apply normalize_text if enabled, recording the extracted length as info['raw_chars']."""
+    if not ENABLE_TEXT_NORMALIZATION or not text:
+        return text.replace('\f', '\n') if text else text
+    info['raw_chars'] = len(text)
+    return normalize_text(text)
+
+
+def read_pdf(file_path: str, info: dict = None) -> str:
+    """Extracts text from a PDF file. info, if given, receives the outcome and page counts."""
+    info = {} if info is None else info
     try:
         with open(file_path, 'rb') as file:
-            reader = pypdf.PdfReader(file)
-            text = "".join((page.extract_text() or "") + "\n" for page in reader.pages)
-            return text
+            return _pdf_text(file, info)
     except Exception as e:
-        print(f"📄❌ Error reading PDF file '{os.path.basename(file_path)}': {e}")
+        info['outcome'] = 'error'
+        logger.warning(f"📄❌ Error reading PDF file '{os.path.basename(file_path)}': {e}", extra={'file': os.path.basename(file_path)})
         return ""
 
 
-def read_docx(file_path: str) -> str:
+def read_docx(file_path: str, info: dict = None) -> str:
     """Extracts text from a DOCX file."""
+    info = {} if info is None else info
     try:
-        doc = docx.Document(file_path)
-        return "\n".join(para.text for para in doc.paragraphs)
+        return _docx_text(file_path, info)
     except Exception as e:
-        print(f"📄❌ Error reading DOCX file '{os.path.basename(file_path)}': {e}")
+        info['outcome'] = 'error'
+        logger.warning(f"📄❌ Error reading DOCX file '{os.path.basename(file_path)}': {e}", extra={'file': os.path.basename(file_path)})
         return ""
 
 
-def read_txt(file_path: str) -> str:
+def read_txt(file_path: str, info: dict = None) -> str:
     """Reads a plain text file."""
+    info = {} if info is None else info
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+            return _cap(f.read(EXTRACT_MAX_CHARS + 1) if EXTRACT_MAX_CHARS else f.read(), info)
     except Exception as e:
-        print(f"📄❌ Error reading TXT file '{os.path.basename(file_path)}': {e}")
+        info['outcome'] = 'error'
+        logger.warning(f"📄❌ Error reading TXT file '{os.path.basename(file_path)}': {e}", extra={'file': os.path.basename(file_path)})
         return ""
 
 
-def get_resume_content(file_path: str) -> str:
+_READERS = {'.txt': read_txt, '.pdf': read_pdf, '.docx': read_docx}
+
+
+def _finish_extract(filename: str, ext: str, info: dict, seconds: float):
+    """Log a budget outcome and record the file's extraction time."""
+    outcome = info.get('outcome', 'ok')
+    name = os.path.basename(filename)
+    if outcome == 'image_only':
+        logger.warning(f"🖼️ Skipping '{name}': image-only PDF (no text layer on the first {min(EXTRACT_PROBE_PAGES, info.get('pages') or 0)} page(s))",
+                       extra={'file': filename, 'pages': info.get('pages')})
+    elif outcome == 'timeout':
+        logger.warning(f"⏱️ Stopped reading '{name}' after {seconds:.1f}s (EXTRACT_TIMEOUT_SECONDS); keeping the text read so far",
+                       extra={'file': filename, 'seconds': round(seconds, 2), 'pages_read': info.get('pages_read')})
+    elif outcome == 'truncated':
+        logger.debug(f"  ✂️ Truncated '{name}' to the extraction budget", extra={'file': filename, 'pages': info.get('pages')})
+    record_extract(ext[1:], seconds, filename, outcome, info.get('pages'))
+
+
+def get_resume_content(file_path: str, info: dict = None) -> str:
     """
     Reads the content of a resume file by dispatching to the correct reader
-    based on the file extension.
+    based on the file extension. info, if given, receives the outcome and, when
+    the text was normalized, its extracted length as raw_chars.
     """
     filename = os.path.basename(file_path)
     _, ext = os.path.splitext(filename)
     ext = ext.lower()
-    if ext == '.txt': return read_txt(file_path)
-    if ext == '.pdf': return read_pdf(file_path)
-    if ext == '.docx': return read_docx(file_path)
+    reader = _READERS.get(ext)
+    if reader:
+        info = {} if info is None else info
+        info['outcome'] = 'ok'
+        start = time.time()
+        try:
+            return _normalize(reader(file_path, info), info)
+        finally:
+            _finish_extract(file_path, ext, info, time.time() - start)
     if ext == '.doc':
-        print(f"⚠️ Warning: .doc not supported. Convert '{filename}' to .docx or .pdf.")
+        logger.warning(f"⚠️ Warning: .doc not supported. Convert '{filename}' to .docx or .pdf.", extra={'file': filename})
         return ""
-    print(f"⚠️ Warning: Unsupported file type '{ext}' for '{filename}'. Skipping.")
+    logger.warning(f"⚠️ Warning: Unsupported file type '{ext}' for '{filename}'. Skipping.", extra={'file': filename})
     return ""
 
 
-def _read_resume_file_safe(file_info: tuple) -> tuple:
+_BYTES_READERS = {
+    '.txt': lambda data, info: _cap(data.decode('utf-8'), info),
+    '.pdf': lambda data, info: _pdf_text(io.BytesIO(data), info),
+    '.docx': lambda data, info: _docx_text(io.BytesIO(data), info),
+}
+
+
+def get_content_from_bytes(data: bytes, filename: str, info: dict = None) -> str:
+    """
+    Extract text from a file's bytes already in memory (e.g. an archive member),
+    with the same readers, budgets, normalization and failure handling as get_resume_content.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    reader = _BYTES_READERS.get(ext)
+    if ext == '.doc':
+        logger.warning(f"⚠️ Warning: .doc not supported. Convert '{filename}' to .docx or .pdf.", extra={'file': filename})
+        return ""
+    if not reader:
+        logger.warning(f"⚠️ Warning: Unsupported file type '{ext}' for '{filename}'. Skipping.", extra={'file': filename})
+        return ""
+    info = {} if info is None else info
+    info['outcome'] = 'ok'
+    start = time.time()
+    try:
+        return _normalize(reader(data, info), info)
+    except Exception as e:
+        info['outcome'] = 'error'
+        logger.warning(f"📄❌ Error reading {ext[1:].upper()} file '{os.path.basename(filename)}': {e}", extra={'file': filename})
+        return ""
+    finally:
+        _finish_extract(filename, ext, info, time.time() - start)
+
+
+def _read_resume_file_safe(file_info: tuple, info: dict = None) -> tuple:
     """Safely read a single resume file with error handling."""
     file_path, filename = file_info
     try:
-        content = get_resume_content(file_path)
+        content = get_resume_content(file_path, info)
         if content and content.strip():
             return filename, content
-        print(f"  ⚠️ Empty content from '{filename}'. Skipping.")
+        logger.debug(f"  ⚠️ Empty content from '{filename}'. Skipping.", extra={'file': filename})
         return filename, None
     except Exception as e:
-        print(f"  ❌ Error reading '{filename}': {e}")
+        logger.warning(f"  ❌ Error reading '{filename}': {e}", extra={'file': filename})
         return filename, None
 
 
-def read_resumes_parallel(resume_files: List[str], resume_dir: str, progress_tracker: Optional[ProgressTracker] = None) -> Dict[str, str]:
-    """Read multiple resume files in parallel for better performance."""
+def read_resumes_parallel(resume_files: List[str], resume_dir: str, progress_tracker: Optional[ProgressTracker] = None,
+                          raw_chars: Optional[Dict[str, int]] = None,
+                          outcomes: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Read multiple resume files in parallel for better performance.
+    Pass raw_chars to receive {filename: length before normalization} for normalized texts,
+    and outcomes to receive {filename: extraction outcome} (see RETRY_OUTCOMES).
+    """
     resumes_data: Dict[str, str] = {}
-    
+    infos: Dict[str, dict] = {filename: {} for filename in resume_files}
+    outcomes = {} if outcomes is None else outcomes
+
+    def note_raw_chars(filename: str):
+        if raw_chars is not None and 'raw_chars' in infos[filename]:
+            raw_chars[filename] = infos[filename]['raw_chars']
+
     if not ENABLE_PARALLEL_READING or len(resume_files) < 4:
         # Sequential reading for small datasets
         for filename in resume_files:
             file_path = os.path.join(resume_dir, filename)
-            content = get_resume_content(file_path)
+            content = get_resume_content(file_path, infos[filename])
+            outcomes[filename] = infos[filename].get('outcome', 'ok')
             if content and content.strip():
                 resumes_data[filename] = content
-                print(f"  ✅ Successfully read '{filename}'")
+                note_raw_chars(filename)
+                logger.debug(f"  ✅ Successfully read '{filename}'", extra={'file': filename, 'chars': len(content)})
                 if progress_tracker: 
                     progress_tracker.update()
             else:
-                print(f"  ❌ Could not read content from '{filename}'. Skipping.")
+                logger.debug(f"  ❌ Could not read content from '{filename}'. Skipping.", extra={'file': filename})
         return resumes_data
 
     # Parallel reading for larger datasets
-    print(f"📚 Reading {len(resume_files)} files in parallel (max {MAX_WORKERS} workers)...")
+    logger.info(f"📚 Reading {len(resume_files)} files in parallel (max {MAX_WORKERS} workers)...",
+                extra={'files': len(resume_files), 'workers': MAX_WORKERS})
 
     file_infos = [(os.path.join(resume_dir, f), f) for f in resume_files]
+    started: Dict[str, float] = {}
 
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = {executor.submit(_read_resume_file_safe, fi): fi[1] for fi in file_infos}
+    def read(file_info: tuple) -> tuple:
+        started[file_info[1]] = time.time()
+        return _read_resume_file_safe(file_info, infos[file_info[1]])
 
-        for future in as_completed(futures):
-            filename, content = future.result()
-            if content:
-                resumes_data[filename] = content
-                print(f"  ✅ Successfully read '{filename}'")
-            if progress_tracker: progress_tracker.update()
+    # Budgets are checked between pages; a document still running at twice the timeout
+    # (e.g. stuck inside one page) is abandoned so the rest of the pool keeps going.
+    hard_limit = EXTRACT_TIMEOUT_SECONDS * 2 if EXTRACT_TIMEOUT_SECONDS else None
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    futures = {executor.submit(read, fi): fi[1] for fi in file_infos}
+    pending, abandoned = set(futures), 0
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=hard_limit / 4 if hard_limit else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                filename, content = future.result()
+                outcomes[filename] = infos[filename].get('outcome', 'ok')
+                if content:
+                    resumes_data[filename] = content
+                    note_raw_chars(filename)
+                    logger.debug(f"  ✅ Successfully read '{filename}'", extra={'file': filename, 'chars': len(content)})
+                if progress_tracker: progress_tracker.update()
+            if not hard_limit:
+                continue
+            now = time.time()
+            for future in [f for f in pending if f.running() and now - started.get(futures[f], now) > hard_limit]:
+                filename = futures[future]
+                pending.discard(future)
+                outcomes[filename] = 'abandoned'   # not infos: the worker may still write to it
+                abandoned += 1
+                logger.warning(f"⏱️ Abandoned '{filename}' after {now - started[filename]:.0f}s; its worker finishes in the background",
+                               extra={'file': filename, 'seconds': round(now - started[filename], 1)})
+                record_extract(os.path.splitext(filename)[1].lower()[1:], now - started[filename],
+                               os.path.join(resume_dir, filename), 'abandoned')
+                if progress_tracker: progress_tracker.update()
+    finally:
+        executor.shutdown(wait=not abandoned)
 
     return resumes_data
 
-__all__ = ['get_resume_content','read_resumes_parallel']
+__all__ = ['RETRY_OUTCOMES','normalize_text','get_resume_content','get_content_from_bytes','read_resumes_parallel']
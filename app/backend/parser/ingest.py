@@ -0,0 +1,299 @@
+"""Directory ingestion with change detection.
+
+Resume directories are scanned recursively with os.scandir and tracked in a
+persistent manifest of (path, size, mtime, hash). Extracted text is stored by
+content hash in the KV store, so unchanged files are never re-read and
+identical files are only extracted once. Each stored text is also fingerprinted
+for near-duplicate detection (see near_dup.py), and its length before and after
+normalization is kept in the 'text_stats' namespace; texts stored before
+normalization existed are normalized the first time they are loaded. An optional
+polling watcher keeps text and embeddings warm as new files land.
+"""
+
+import os, json, hashlib, tempfile, threading
+from typing import Dict, List, Optional, Tuple
+from .config import INGEST_DIR, ENABLE_RECURSIVE_SCAN, WATCHER_POLL_SECONDS, ENABLE_TEXT_NORMALIZATION
+from .file_readers import read_resumes_parallel, normalize_text, RETRY_OUTCOMES
+from .cache import get_store
+from .near_dup import NAMESPACE as FINGERPRINT_NAMESPACE, fingerprint_texts
+from .progress import ProgressTracker
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.docx', '.doc')
+TEXT_STATS_NAMESPACE = 'text_stats'
+MANIFEST_DIR = os.path.join(INGEST_DIR, "manifests")
+os.makedirs(MANIFEST_DIR, exist_ok=True)
+
+# One lock per resume directory so API requests and the watcher don't race on a manifest
+_dir_locks: Dict[str, threading.Lock] = {}
+_dir_locks_guard = threading.Lock()
+
+
+def _get_dir_lock(resume_dir: str) -> threading.Lock:
+    with _dir_locks_guard:
+        return _dir_locks.setdefault(resume_dir, threading.Lock())
+
+
+def _atomic_write_json(path: str, data) -> None:
+    """Write JSON to a temp file in the same directory, then rename over the target."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """MD5 of the raw file bytes, read in blocks."""
+    h = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_resume_files(resume_dir: str, recursive: bool = None) -> Dict[str, Tuple[int, float]]:
+    """
+    Return {relative_path: (size, mtime)} for every supported resume under resume_dir.
+    Uses os.scandir so the stat data comes from the directory listing itself.
+    """
+    if recursive is None:
+        recursive = ENABLE_RECURSIVE_SCAN
+    found: Dict[str, Tuple[int, float]] = {}
+    stack = [resume_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        st = entry.stat()
+                        rel_path = os.path.relpath(entry.path, resume_dir).replace(os.sep, '/')
+                        found[rel_path] = (st.st_size, st.st_mtime)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not scan '{current}': {e}")
+    return found
+
+
+# Text store (content-addressed, 'text' namespace of the KV store)
+
+def get_stored_text(content_hash: str) -> Optional[str]:
+    """Return extracted text for a content hash, '' if known-unreadable, None if never extracted."""
+    try:
+        return get_store().get('text', content_hash)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read stored text {content_hash[:12]}: {e}")
+        return None
+
+
+def store_texts(texts: Dict[str, str], raw_chars: Optional[Dict[str, int]] = None) -> None:
+    """
+    Store {content_hash: text} in a single transaction, plus each text's near-duplicate
+    fingerprint and stats. raw_chars gives the length before normalization, by content hash.
+    """
+    raw_chars = raw_chars or {}
+    stats = {content_hash: {'raw_chars': raw_chars.get(content_hash) or len(text), 'chars': len(text),
+                            'normalized': ENABLE_TEXT_NORMALIZATION}
+             for content_hash, text in texts.items()}
+    try:
+        get_store().put_many('text', texts.items())
+        get_store().put_many(FINGERPRINT_NAMESPACE, fingerprint_texts(texts).items())
+        get_store().put_many(TEXT_STATS_NAMESPACE, stats.items())
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not store extracted text: {e}")
+
+
+def load_stored_texts(hashes: List[str]) -> Dict[str, str]:
+    """
+    Stored texts by content hash (hashes never extracted are omitted). With
+    ENABLE_TEXT_NORMALIZATION, texts stored before normalization are normalized
+    now and written back, so it happens once per text.
+    """
+    store = get_store()
+    texts = store.get_many('text', hashes)
+    if ENABLE_TEXT_NORMALIZATION:
+        stats = store.get_many(TEXT_STATS_NAMESPACE, [h for h, text in texts.items() if text])
+        stale = {h: text for h, text in texts.items() if text and not (stats.get(h) or {}).get('normalized')}
+        if stale:
+            # Page breaks weren't kept in these texts, so running headers/footers can't be found
+            normalized = {h: normalize_text(text) for h, text in stale.items()}
+            store_texts(normalized, {h: len(text) for h, text in stale.items()})
+            texts.update(normalized)
+            logger.info(f"🧹 Normalized {len(stale)} previously stored text(s)")
+    return texts
+
+
+def text_reduction(hashes: List[str]) -> dict:
+    """Characters, and estimated tokens (~4 characters each), removed by normalization from these texts."""
+    try:
+        stats = get_store().get_many(TEXT_STATS_NAMESPACE, list(set(hashes)))
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read text stats: {e}")
+        stats = {}
+    raw = sum(s.get('raw_chars', 0) for s in stats.values())
+    chars = sum(s.get('chars', 0) for s in stats.values())
+    tokens_saved = sum(s.get('raw_chars', 0) // 4 - s.get('chars', 0) // 4 for s in stats.values())
+    return {'raw_chars': raw, 'chars': chars, 'chars_saved': raw - chars, 'tokens_saved': tokens_saved,
+            'rate': round((raw - chars) / raw, 4) if raw else 0.0}
+
+
+class Manifest:
+    """Persistent record of (path, size, mtime, hash) for one resume directory."""
+
+    def __init__(self, resume_dir: str):
+        self.resume_dir = os.path.abspath(resume_dir)
+        dir_key = hashlib.md5(self.resume_dir.encode('utf-8')).hexdigest()
+        self.path = os.path.join(MANIFEST_DIR, f"{dir_key}.json")
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except Exception as e:
+                logger.warning(f"⚠️ Warning: Could not load manifest, rescanning: {e}")
+
+    def refresh(self) -> Tuple[List[str], List[str]]:
+        """Rescan the directory; returns (changed_paths, removed_paths). Only changed files are hashed."""
+        scanned = scan_resume_files(self.resume_dir)
+        changed = []
+        for rel_path, (size, mtime) in scanned.items():
+            prev = self.entries.get(rel_path)
+            if prev and prev['size'] == size and prev['mtime'] == mtime:
+                continue
+            try:
+                content_hash = hash_file(os.path.join(self.resume_dir, rel_path))
+            except OSError as e:
+                logger.warning(f"⚠️ Could not hash '{rel_path}': {e}")
+                continue
+            self.entries[rel_path] = {'size': size, 'mtime': mtime, 'hash': content_hash}
+            changed.append(rel_path)
+        removed = [p for p in self.entries if p not in scanned]
+        for rel_path in removed:
+            del self.entries[rel_path]
+        return changed, removed
+
+    def save(self) -> None:
+        try:
+            _atomic_write_json(self.path, {'resume_dir': self.resume_dir, 'entries': self.entries})
+        except Exception as e:
+            logger.warning(f"⚠️ Warning: Could not save manifest: {e}")
+
+
+def refresh_manifest(resume_dir: str) -> Tuple[Dict[str, dict], List[str], List[str]]:
+    """Bring a directory's manifest up to date; returns (entries, changed_paths, removed_paths)."""
+    resume_dir = os.path.abspath(resume_dir)
+    with _get_dir_lock(resume_dir):
+        manifest = Manifest(resume_dir)
+        changed, removed = manifest.refresh()
+        if changed or removed:
+            logger.info(f"🗂️ Manifest: {len(manifest.entries)} file(s), {len(changed)} new/changed, {len(removed)} removed")
+            manifest.save()
+        return dict(manifest.entries), changed, removed
+
+
+def load_texts(resume_dir: str, entries: Dict[str, dict]) -> Dict[str, str]:
+    """
+    Return {relative_path: text} for manifest entries. Only content hashes with
+    no stored text are extracted, and identical files are extracted once.
+    """
+    hashes = list({entry['hash'] for entry in entries.values()})
+    try:
+        texts: Dict[str, Optional[str]] = load_stored_texts(hashes)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read stored text: {e}")
+        texts = {}
+    to_extract: Dict[str, str] = {}  # content hash -> one representative path
+    for rel_path, entry in entries.items():
+        if texts.get(entry['hash']) is None:
+            to_extract.setdefault(entry['hash'], rel_path)
+
+    if to_extract:
+        logger.info(f"📂 Found {len(entries)} resume(s), {len(to_extract)} need text extraction. Reading content...")
+        file_progress = ProgressTracker(len(to_extract), "Reading files")
+        raw_chars: Dict[str, int] = {}
+        outcomes: Dict[str, str] = {}
+        extracted = read_resumes_parallel(list(to_extract.values()), resume_dir, file_progress, raw_chars, outcomes)
+        file_progress.complete()
+        new_texts = {content_hash: extracted.get(rel_path) or "" for content_hash, rel_path in to_extract.items()}
+        texts.update(new_texts)
+        # Empty text is stored too, so broken files aren't retried; timed-out files are retried next load
+        retry = {content_hash for content_hash, rel_path in to_extract.items() if outcomes.get(rel_path) in RETRY_OUTCOMES}
+        if retry:
+            logger.info(f"⏱️ {len(retry)} file(s) hit the extraction time budget; their text is not stored and will be re-read")
+        store_texts({h: text for h, text in new_texts.items() if h not in retry},
+                    {content_hash: raw_chars.get(rel_path) for content_hash, rel_path in to_extract.items()})
+    else:
+        logger.info(f"📂 Found {len(entries)} resume(s). All text already extracted.")
+
+    return {rel_path: texts[entry['hash']] for rel_path, entry in sorted(entries.items())
+            if texts.get(entry['hash'])}
+
+
+def load_resumes(resume_dir: str) -> Dict[str, str]:
+    """Return {relative_path: text} for every readable resume under resume_dir."""
+    resume_dir = os.path.abspath(resume_dir)
+    entries, _, _ = refresh_manifest(resume_dir)
+    if not entries:
+        logger.error(f"❌ No supported resumes (.txt, .pdf, .docx) found in '{resume_dir}'.")
+        return {}
+    return load_texts(resume_dir, entries)
+
+
+def warm_directory(resume_dir: str, only_if_changed: bool = False) -> bool:
+    """Pre-extract text and pre-compute chunk embeddings for a directory. Returns True if work was done."""
+    from .vector_search import precompute_embeddings  # imported lazily to keep ingest import-light
+    resume_dir = os.path.abspath(resume_dir)
+    entries, changed, removed = refresh_manifest(resume_dir)
+    if not entries or (only_if_changed and not changed):
+        return False
+    resumes_data = load_texts(resume_dir, entries)
+    if resumes_data:
+        precompute_embeddings(resumes_data)
+    return True
+
+
+class DirectoryWatcher(threading.Thread):
+    """
+    Background thread that polls directories and warms new/changed files.
+    Polling relies on the manifest's size/mtime comparison, so an idle pass is
+    only a directory scan.
+    """
+
+    def __init__(self, dirs: List[str], interval: int = None):
+        super().__init__(name="resume-dir-watcher", daemon=True)
+        self.dirs = [os.path.abspath(d) for d in dirs]
+        self.interval = interval or WATCHER_POLL_SECONDS
+        self._stop_event = threading.Event()
+
+    def run(self):
+        logger.info(f"👀 Watching {len(self.dirs)} director(ies) every {self.interval}s")
+        warmed = set()
+        while not self._stop_event.is_set():
+            for resume_dir in self.dirs:
+                if not os.path.isdir(resume_dir):
+                    continue
+                try:
+                    # First pass warms everything; later passes only act on new/changed files
+                    if warm_directory(resume_dir, only_if_changed=resume_dir in warmed):
+                        logger.info(f"🔥 Warmed '{resume_dir}'")
+                    warmed.add(resume_dir)
+                except Exception as e:
+                    logger.warning(f"⚠️ Watcher failed to warm '{resume_dir}': {e}")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+__all__ = ['SUPPORTED_EXTENSIONS','scan_resume_files','hash_file','get_stored_text','store_texts','load_stored_texts','text_reduction',
+           'Manifest','refresh_manifest','load_texts','load_resumes','warm_directory','DirectoryWatcher']
@@ -0,0 +1,121 @@
+"""Incremental parser for a streamed JSON array of candidate objects.
+
+LLM responses are fed in as they arrive; every object in the result array is
+returned as soon as its closing brace is seen. A malformed object is skipped
+rather than failing the whole response, and objects completed before a
+response is cut off are kept.
+"""
+
+import json, re
+from typing import List, Optional
+
+from .schema import COMPACT_RESULTS_KEY
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+_FENCE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+# Keys whose array value is the result array when the response is a wrapping object
+_WRAPPER_KEYS = (COMPACT_RESULTS_KEY, 'candidates')
+
+
+class JsonArrayStream:
+    """
+    Feed text chunks with feed(); returns newly completed array items (dicts).
+    Accepts a bare array or an object wrapping the array under one of _WRAPPER_KEYS
+    ({"candidates": [...]}), with or without a markdown code fence around it. Any
+    other array (e.g. a list field of a single bare candidate object) is not the
+    result array, so a response cut off inside it is never reported complete.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.complete = False       # the result array was closed
+        self.items_found = 0
+        self.skipped = 0            # malformed items
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._key_start: Optional[int] = None
+        self._last_key: Optional[str] = None   # last string closed at the top level of a wrapping object
+
+    def feed(self, chunk: str) -> List[dict]:
+        if not chunk or self.complete:
+            self.text += chunk or ''
+            return []
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._last_key = text[self._key_start + 1:i]
+                        self._key_start = None
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._array_depth is None:
+                    self._key_start = i
+            elif ch == '[' or ch == '{':
+                self._depth += 1
+                if ch == '[' and self._array_depth is None and (
+                        self._depth == 1 or (self._depth == 2 and self._last_key in _WRAPPER_KEYS)):
+                    self._array_depth = self._depth
+                elif ch == '{' and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._item_start = i
+            elif ch == ']' or ch == '}':
+                if ch == '}' and self._item_start is not None and self._depth == self._array_depth + 1:
+                    item = self._parse_item(text[self._item_start:i+1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+                elif ch == ']' and self._depth == self._array_depth:
+                    self.complete = True
+                    self._pos = i + 1
+                    return items
+                self._depth -= 1
+        self._pos = len(text)
+        return items
+
+    def _parse_item(self, raw: str) -> Optional[dict]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            self.skipped += 1
+            logger.warning(f"⚠️ Skipping malformed candidate object in response: {e}")
+            return None
+        self.items_found += 1
+        return item
+
+    def close(self) -> List[dict]:
+        """
+        Call at end of stream. If no items were streamed (e.g. the response was a
+        single bare object), falls back to parsing the whole text; returns any extra items.
+        """
+        if self.items_found:
+            return []
+        try:
+            parsed = json.loads(_FENCE.sub('', self.text))
+        except json.JSONDecodeError:
+            return []
+        if isinstance(parsed, dict):
+            lists = [v for v in parsed.values() if isinstance(v, list) and v and all(isinstance(x, dict) for x in v)]
+            parsed = lists[0] if lists else ([parsed] if 'source_file' in parsed else [])
+        if not isinstance(parsed, list):
+            return []
+        self.complete = True
+        items = [x for x in parsed if isinstance(x, dict)]
+        self.items_found += len(items)
+        return items
+
+__all__ = ['JsonArrayStream']
@@ -0,0 +1,184 @@
+"""Embedded key-value store backed by SQLite.
+
+Replaces one-JSON-file-per-key caches with a single database file:
+- writes are atomic (each put is a transaction) and WAL mode lets readers
+  proceed while a writer commits, so workers never see half-written values
+- values are stored as compact binary blobs (separator-free JSON through
+  the fast serializer in serialization.py, or raw UTF-8; zlib-compressed
+  above a small threshold)
+- entries are grouped by namespace ('genai', 'profiles', 'text', ...)
+"""
+
+import os, json, sqlite3, threading, time, zlib
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from .serialization import dumps, loads
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Values larger than this are zlib-compressed
+COMPRESS_THRESHOLD = 512
+
+# One-byte type tags at the start of every stored blob
+_TAG_JSON, _TAG_JSON_Z, _TAG_TEXT, _TAG_TEXT_Z = b'j', b'J', b't', b'T'
+
+
+def encode_value(value: Any) -> bytes:
+    """Serialize a value to a tagged, optionally compressed blob."""
+    if isinstance(value, str):
+        raw, tag, ztag = value.encode('utf-8'), _TAG_TEXT, _TAG_TEXT_Z
+    else:
+        raw, tag, ztag = dumps(value), _TAG_JSON, _TAG_JSON_Z
+    if len(raw) > COMPRESS_THRESHOLD:
+        return ztag + zlib.compress(raw, 6)
+    return tag + raw
+
+
+def decode_value(blob: bytes) -> Any:
+    tag, body = blob[:1], blob[1:]
+    if tag in (_TAG_JSON_Z, _TAG_TEXT_Z):
+        body = zlib.decompress(body)
+    # JSON is parsed straight from the bytes; only text values are decoded
+    return body.decode('utf-8') if tag in (_TAG_TEXT, _TAG_TEXT_Z) else loads(body)
+
+
+class KVStore:
+    """Namespaced key-value store in a single SQLite file, safe for use from multiple threads and processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS kv (
+                                namespace TEXT NOT NULL,
+                                key TEXT NOT NULL,
+                                value BLOB NOT NULL,
+                                size INTEGER NOT NULL,
+                                created REAL NOT NULL,
+                                PRIMARY KEY (namespace, key)
+                            )""")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared across threads, so each thread gets its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT value FROM kv WHERE namespace=? AND key=?", (namespace, key)).fetchone()
+        return decode_value(row[0]) if row else None
+
+    def get_many(self, namespace: str, keys: List[str]) -> dict:
+        """Fetch several keys in one query; missing keys are omitted."""
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            chunk = keys[i:i+500]
+            placeholders = ','.join('?' * len(chunk))
+            for key, value in conn.execute(f"SELECT key, value FROM kv WHERE namespace=? AND key IN ({placeholders})",
+                                           (namespace, *chunk)):
+                found[key] = decode_value(value)
+        return found
+
+    def put(self, namespace: str, key: str, value: Any) -> int:
+        """Store a value atomically; returns its stored size in bytes."""
+        return self.put_many(namespace, [(key, value)])[0]
+
+    def put_many(self, namespace: str, items: Iterable[Tuple[str, Any]]) -> List[int]:
+        """Store several values in a single transaction; returns the stored size of each."""
+        now = time.time()
+        rows = [(namespace, key, blob, len(blob), now) for key, blob in ((k, encode_value(v)) for k, v in items)]
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO kv (namespace, key, value, size, created) VALUES (?,?,?,?,?)", rows)
+        return [r[3] for r in rows]
+
+    def size_of(self, namespace: str, key: str) -> Optional[int]:
+        row = self._conn().execute("SELECT size FROM kv WHERE namespace=? AND key=?", (namespace, key)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, namespace: str, key: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE namespace=? AND key=?", (namespace, key))
+
+    def clear(self, namespace: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE namespace=?", (namespace,))
+
+    def entries(self, namespace: str) -> Iterator[Tuple[str, int, float]]:
+        """Yield (key, size, created) for every entry in a namespace."""
+        yield from self._conn().execute("SELECT key, size, created FROM kv WHERE namespace=?", (namespace,))
+
+    def count(self, namespace: str) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM kv WHERE namespace=?", (namespace,)).fetchone()[0]
+
+    def get_meta(self, name: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE name=?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?,?)", (name, value))
+
+
+# Migration from the legacy file-per-key layout
+
+def _iter_files(root: str, suffix: str) -> Iterator[Tuple[str, str]]:
+    """Yield (stem, path) for files with suffix under root, including shard subdirectories."""
+    if not os.path.isdir(root):
+        return
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(suffix):
+                yield filename[:-len(suffix)], os.path.join(dirpath, filename)
+
+
+def migrate_legacy_files(store: KVStore, cache_dir: str, profile_dir: str, text_dir: str) -> int:
+    """
+    Import legacy cache files into the store, then delete them. Safe to re-run;
+    each source is imported in one transaction and only removed after commit.
+    Returns the number of entries imported.
+    """
+    def read_json(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def read_text(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    sources = [
+        ('genai', [(k, p) for k, p in _iter_files(cache_dir, '.json') if os.path.dirname(p) == cache_dir], read_json),
+        ('profile_refs', [(k, p) for k, p in _iter_files(cache_dir, '.profiles') if os.path.dirname(p) == cache_dir], read_json),
+        ('profiles', list(_iter_files(profile_dir, '.json')), read_json),
+        ('text', list(_iter_files(text_dir, '.txt')), read_text),
+    ]
+    imported = 0
+    for namespace, files, reader in sources:
+        items, done = [], []
+        for key, path in files:
+            try:
+                items.append((key, reader(path)))
+                done.append(path)
+            except Exception as e:
+                logger.warning(f"⚠️ Skipping unreadable cache file '{path}': {e}")
+        if not items:
+            continue
+        store.put_many(namespace, items)
+        for path in done:
+            os.remove(path)
+        imported += len(items)
+        logger.info(f"📦 Migrated {len(items)} '{namespace}' entr{'y' if len(items) == 1 else 'ies'} into {os.path.basename(store.path)}")
+    return imported
+
+__all__ = ['KVStore','encode_value','decode_value','migrate_legacy_files']
@@ -0,0 +1,112 @@
+"""Leveled, structured logging for the parse pipeline.
+
+Records from every parser module go to the "parser" logger, whose only handler
+puts them on an in-memory queue; a QueueListener thread formats and writes them
+to stdout. Worker threads in hot loops therefore never wait on the console or a
+log shipper. The 'text' format prints the message alone, as the console output
+always looked; with LOG_FORMAT=json each line is a JSON object carrying the
+level, logger, current trace id (see metrics.py) and the fields passed as
+extra={...}.
+
+Use get_logger(__name__) in place of print for anything emitted per file, per
+chunk or per candidate, and log those lines at DEBUG.
+"""
+
+import atexit, datetime, json, logging, queue, sys, threading
+from logging.handlers import QueueHandler, QueueListener
+
+from .config import LOG_LEVEL, LOG_FORMAT
+from .metrics import current_trace_id
+
+ROOT_LOGGER = 'parser'
+# LogRecord attributes that aren't user fields
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'trace_id'}
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED and not key.startswith('_')}
+
+
+class TextFormatter(logging.Formatter):
+    """Console output: the message only (emoji prefixes included); fields are for the JSON format."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return record.getMessage()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, trace_id and the extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'trace_id', None):
+            entry['trace_id'] = record.trace_id
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _TraceFilter(logging.Filter):
+    # Runs in the calling thread (not the writer thread), where the trace context is still visible
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Install the queue handler and start the writer thread (idempotent unless level/fmt change)."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None and level is None and fmt is None:
+            return
+        if _listener is not None:
+            _listener.stop()
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == 'json' else TextFormatter())
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler = QueueHandler(log_queue)
+        handler.addFilter(_TraceFilter())
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.handlers = [handler]
+        logger.setLevel(getattr(logging, (level or LOG_LEVEL).upper(), logging.INFO))
+        logger.propagate = False
+        _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+
+
+def flush_logging():
+    """Write out everything still queued (at exit, or before a CLI prints its own output)."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def _shutdown():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_shutdown)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the queued "parser" root, e.g. get_logger(__name__) -> parser.file_readers."""
+    configure_logging()
+    if name != ROOT_LOGGER and not name.startswith(ROOT_LOGGER + '.'):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+__all__ = ['configure_logging','flush_logging','get_logger','TextFormatter','JsonFormatter']
@@ -0,0 +1,314 @@
+"""Prometheus metrics and per-request trace spans for the parse pipeline.
+
+Every phase (file read, text extraction per format, chunking, embedding, FAISS
+search, prompt build, provider calls) is timed into a histogram; cache hit
+ratios per layer, in-flight batches and token counts are exported as well.
+GET /metrics on the API server returns them in the Prometheus text format,
+through prometheus_client when it is installed (a small built-in registry
+renders the same format otherwise).
+
+A request runs inside trace(): spans opened with span() are recorded with
+their ids and parent ids, and the trace id is sent along with provider calls
+(Azure OpenAI x-ms-client-request-id header). Worker threads only see the
+trace if the task is wrapped with propagate().
+
+Each file extraction is also counted by outcome (ok, truncated, timeout,
+image_only, error, abandoned), and the slowest recent files are kept for
+GET /extract-report.
+"""
+
+import contextvars, heapq, logging, threading, time, uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# log.py imports this module, so use the stdlib logger: parser.metrics sits under log.py's queued "parser" logger
+logger = logging.getLogger(__name__)
+
+PREFIX = "resume_parser"
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+PROVIDER_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+RECENT_TRACES = 100     # finished traces kept for GET /traces/{trace_id}
+SLOW_FILES = 50         # slowest extractions kept for GET /extract-report
+
+
+class _Child:
+    def __init__(self, metric: "_Metric"):
+        self._metric = metric
+        self.value = 0.0
+        self.counts = [0] * len(metric.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def inc(self, amount: float = 1.0):
+        with self._metric.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._metric.lock:
+            self.value = value
+
+    def observe(self, value: float):
+        with self._metric.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self._metric.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+
+class _Metric:
+    """Just enough of a prometheus_client metric (labels/inc/dec/set/observe) to render the text format."""
+
+    def __init__(self, kind: str, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=()):
+        self.kind, self.name, self.documentation, self.labelnames = kind, name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets) + ((float('inf'),) if kind == 'histogram' else ())
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], _Child] = {}
+
+    def labels(self, **labels) -> _Child:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self.lock:
+            if key not in self.children:
+                self.children[key] = _Child(self)
+            return self.children[key]
+
+    def render(self) -> List[str]:
+        name = self.name + ('_total' if self.kind == 'counter' else '')
+        lines = [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+        with self.lock:
+            for key, child in sorted(self.children.items()):
+                labels = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+                if self.kind != 'histogram':
+                    lines.append(f"{name}{_labels(labels)} {child.value}")
+                    continue
+                for bound, count in zip(self.buckets, child.counts):
+                    le = 'le="+Inf"' if bound == float('inf') else f'le="{float(bound)!r}"'
+                    lines.append(f"{name}_bucket{_labels(labels + [le])} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {child.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {child.count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: List[str]) -> str:
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+try:
+    import prometheus_client  # type: ignore
+    _registry = prometheus_client.CollectorRegistry()
+
+    def _make(kind: str, name: str, documentation: str, labelnames=(), buckets=()):
+        cls = {'counter': prometheus_client.Counter, 'gauge': prometheus_client.Gauge,
+               'histogram': prometheus_client.Histogram}[kind]
+        options = {'buckets': buckets} if kind == 'histogram' else {}
+        return cls(name, documentation, labelnames, registry=_registry, **options)
+except ImportError:
+    prometheus_client = None
+    _registry: List[_Metric] = []
+
+    def _make(kind: str, name: str, documentation: str, labelnames=(), buckets=()):
+        metric = _Metric(kind, name, documentation, labelnames, buckets)
+        _registry.append(metric)
+        return metric
+
+
+PHASE_SECONDS = _make('histogram', f'{PREFIX}_phase_seconds', 'Time spent per pipeline phase', ('phase',), PHASE_BUCKETS)
+EXTRACT_SECONDS = _make('histogram', f'{PREFIX}_extract_seconds', 'Text extraction time per file, by format', ('format',), PHASE_BUCKETS)
+EXTRACT_FILES = _make('counter', f'{PREFIX}_extract_files', 'Files extracted, by format and outcome', ('format', 'outcome'))
+PROVIDER_CALL_SECONDS = _make('histogram', f'{PREFIX}_provider_call_seconds', 'LLM provider batch call time',
+                              ('provider', 'outcome'), PROVIDER_BUCKETS)
+BATCHES_IN_FLIGHT = _make('gauge', f'{PREFIX}_batches_in_flight', 'LLM batches currently being processed', ('provider',))
+TOKENS = _make('counter', f'{PREFIX}_tokens', 'LLM tokens by kind (prompt, cached_prompt, output)', ('provider', 'kind'))
+REQUESTS = _make('counter', f'{PREFIX}_requests', 'Parse requests by outcome', ('outcome',))
+CACHE_HITS = _make('gauge', f'{PREFIX}_cache_hits', 'Cache hits since start, per cache layer', ('layer',))
+CACHE_MISSES = _make('gauge', f'{PREFIX}_cache_misses', 'Cache misses since start, per cache layer', ('layer',))
+CACHE_HIT_RATIO = _make('gauge', f'{PREFIX}_cache_hit_ratio', 'Cache hit ratio since start, per cache layer', ('layer',))
+CACHE_ENTRIES = _make('gauge', f'{PREFIX}_cache_entries', 'Entries per cache layer', ('layer',))
+CACHE_BYTES = _make('gauge', f'{PREFIX}_cache_bytes', 'Bytes per cache layer', ('layer',))
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------------
+
+class Trace:
+    """Spans of one request; spans may be added from worker threads."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or str(uuid.uuid4())
+        self.start = time.time()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def phase_seconds(self) -> Dict[str, float]:
+        """Total time per span name (top-level view of where the request went)."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span['name']] = round(totals.get(span['name'], 0.0) + span['seconds'], 4)
+        return totals
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {'trace_id': self.trace_id, 'spans': list(self.spans)}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('resume_parser_trace', default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('resume_parser_span', default=None)
+_recent_traces: "OrderedDict[str, dict]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[Trace]:
+    """Run a request under a new trace (trace_id may come from the caller, e.g. an X-Request-ID header)."""
+    current = Trace(trace_id)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        with _recent_lock:
+            _recent_traces[current.trace_id] = current.to_dict()
+            _recent_traces.move_to_end(current.trace_id)
+            while len(_recent_traces) > RECENT_TRACES:
+                _recent_traces.popitem(last=False)
+
+
+def get_trace(trace_id: str) -> Optional[dict]:
+    """Spans of a recently finished trace."""
+    with _recent_lock:
+        return _recent_traces.get(trace_id)
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_trace.get()
+    return current.trace_id if current else None
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[dict]:
+    """
+    Time a phase into PHASE_SECONDS and, inside a trace, record it as a span.
+    The yielded dict can be filled with attributes while the span is open.
+    """
+    span_id = uuid.uuid4().hex[:16]
+    record = {'name': name, 'span_id': span_id, 'parent_id': _current_span.get(), **attributes}
+    token = _current_span.set(span_id)
+    start = time.time()
+    try:
+        yield record
+    finally:
+        seconds = time.time() - start
+        _current_span.reset(token)
+        PHASE_SECONDS.labels(phase=name).observe(seconds)
+        current = _current_trace.get()
+        if current is not None:
+            record.update(start=round(start - current.start, 4), seconds=round(seconds, 4))
+            current.add(record)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Wrap a task for a thread pool so it runs inside the submitting thread's trace and span."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Recording helpers
+# ---------------------------------------------------------------------------
+
+def record_request(outcome: str):
+    REQUESTS.labels(outcome=outcome).inc()
+
+
+_slow_files: List[Tuple[float, int, dict]] = []   # min-heap of the slowest extractions
+_extract_outcomes: Dict[str, int] = {}
+_extract_lock = threading.Lock()
+_extract_seq = 0
+
+
+def record_extract(file_format: str, seconds: float, file: str = None, outcome: str = 'ok', pages: int = None):
+    """Time one file's extraction; with a file name it is also a candidate for the slow-file report."""
+    global _extract_seq
+    file_format = file_format or 'unknown'
+    EXTRACT_SECONDS.labels(format=file_format).observe(seconds)
+    EXTRACT_FILES.labels(format=file_format, outcome=outcome).inc()
+    with _extract_lock:
+        _extract_outcomes[outcome] = _extract_outcomes.get(outcome, 0) + 1
+        if file is None:
+            return
+        _extract_seq += 1
+        entry = {'file': file, 'format': file_format, 'seconds': round(seconds, 3), 'outcome': outcome,
+                 'pages': pages, 'at': time.time()}
+        if len(_slow_files) < SLOW_FILES:
+            heapq.heappush(_slow_files, (seconds, _extract_seq, entry))
+        elif seconds > _slow_files[0][0]:
+            heapq.heapreplace(_slow_files, (seconds, _extract_seq, entry))
+
+
+def get_extract_report() -> dict:
+    """Files per extraction outcome since start, and the slowest files (slowest first)."""
+    with _extract_lock:
+        slowest = [entry for _, _, entry in sorted(_slow_files, reverse=True)]
+        return {'outcomes': dict(_extract_outcomes), 'slowest': slowest}
+
+
+def record_provider_call(provider: str, seconds: float, ok: bool):
+    PROVIDER_CALL_SECONDS.labels(provider=provider, outcome='ok' if ok else 'error').observe(seconds)
+
+
+def record_tokens(provider: str, prompt_tokens: int, cached_tokens: int, output_tokens: int):
+    for kind, count in (('prompt', prompt_tokens), ('cached_prompt', cached_tokens), ('output', output_tokens)):
+        if count:
+            TOKENS.labels(provider=provider, kind=kind).inc(count)
+
+
+@contextmanager
+def batch_in_flight(provider: str):
+    gauge = BATCHES_IN_FLIGHT.labels(provider=provider)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def _update_cache_gauges():
+    from .cache_manager import get_cache_stats
+    try:
+        stats = get_cache_stats()
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read cache stats for metrics: {e}")
+        return
+    for layer, s in stats.items():
+        hits, misses = s.get('hits', 0), s.get('misses', 0)
+        CACHE_HITS.labels(layer=layer).set(hits)
+        CACHE_MISSES.labels(layer=layer).set(misses)
+        CACHE_HIT_RATIO.labels(layer=layer).set(hits / (hits + misses) if hits + misses else 0.0)
+        CACHE_ENTRIES.labels(layer=layer).set(s.get('entries', 0))
+        CACHE_BYTES.labels(layer=layer).set(s.get('bytes', 0))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(body, content type) for a Prometheus scrape."""
+    _update_cache_gauges()
+    if prometheus_client is not None:
+        return prometheus_client.generate_latest(_registry), prometheus_client.CONTENT_TYPE_LATEST
+    lines = [line for metric in _registry for line in metric.render()]
+    return ('\n'.join(lines) + '\n').encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+
+__all__ = ['Trace','trace','get_trace','span','current_trace_id','propagate','record_request','record_extract','get_extract_report','record_provider_call',
+           'record_tokens','batch_in_flight','render_metrics']
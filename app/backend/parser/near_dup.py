@@ -0,0 +1,163 @@
+"""Near-duplicate resume detection.
+
+Every extracted text gets a 64-bit SimHash over its word 3-shingles when it is
+stored (ingest.store_texts), kept by content hash in the KV store's 'simhash'
+namespace. Before a search, a corpus's resumes whose fingerprints differ in at
+most NEAR_DUPLICATE_MAX_DISTANCE bits are grouped as versions of one resume
+(v1.pdf, final.docx, updated.pdf). Only the newest version (by file mtime) is
+embedded, searched and sent to the LLM; the older ones come back with it as
+near_duplicate_files.
+
+Candidate pairs come from splitting each fingerprint into
+NEAR_DUPLICATE_MAX_DISTANCE + 1 bands: two fingerprints within that distance
+agree exactly on at least one band, so only resumes sharing a band are compared.
+"""
+
+import hashlib, re, threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+import numpy as np
+
+from .config import NEAR_DUPLICATE_MAX_DISTANCE
+from .cache import get_store
+from .serialization import Candidate
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+NAMESPACE = 'simhash'
+SHINGLE_WORDS = 3
+_WORD = re.compile(r"[a-z0-9]+")
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+_BLOCK_CELLS = 1 << 18  # fingerprint pairs compared per vectorized block (64 bytes each while counting bits)
+_RECENT_GROUPINGS = 8   # corpora whose grouping is kept in memory between searches
+
+_recent: "OrderedDict[str, List[List[str]]]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the text's distinct word 3-shingles (0 for empty text)."""
+    words = _WORD.findall(text.lower())
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))} if words else set()
+    if not shingles:
+        return 0
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little')
+                          for s in shingles), dtype=np.uint64, count=len(shingles))
+    ones = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).sum(axis=0).astype(np.int64)
+    fingerprint = 0
+    for bit in np.nonzero(ones * 2 > len(shingles))[0]:
+        fingerprint |= 1 << int(bit)
+    return fingerprint
+
+
+def fingerprint_texts(texts: Dict[str, str]) -> Dict[str, str]:
+    """{content_hash: hex fingerprint} for the non-empty texts, as stored in the 'simhash' namespace."""
+    return {content_hash: format(simhash(text), '016x') for content_hash, text in texts.items() if text}
+
+
+def _fingerprints(resumes_data: Dict[str, str], versions: Dict[str, dict]) -> Dict[str, int]:
+    """Stored fingerprints by resume key; texts stored before fingerprinting existed are hashed now."""
+    hashes = {key: versions[key]['hash'] for key in resumes_data if versions.get(key, {}).get('hash')}
+    try:
+        stored = get_store().get_many(NAMESPACE, list(set(hashes.values())))
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read fingerprints: {e}")
+        stored = {}
+    fingerprints, missing = {}, {}
+    for key, text in resumes_data.items():
+        value = stored.get(hashes.get(key))
+        if value is None:
+            value = format(simhash(text), '016x')
+            if key in hashes:
+                missing[hashes[key]] = value
+        fingerprints[key] = int(value, 16)
+    if missing:
+        try:
+            get_store().put_many(NAMESPACE, missing.items())
+        except Exception as e:
+            logger.warning(f"⚠️ Warning: Could not store fingerprints: {e}")
+    return fingerprints
+
+
+def _popcounts(values: np.ndarray) -> np.ndarray:
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def group_near_duplicates(fingerprints: Dict[str, int], max_distance: int = None) -> List[List[str]]:
+    """Groups (2+ keys each) of fingerprints linked by Hamming distance <= max_distance."""
+    max_distance = NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+    keys = [k for k, fp in fingerprints.items() if fp]
+    parent = {k: k for k in keys}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    bands = max_distance + 1
+    edges = [round(64 * i / bands) for i in range(bands + 1)]
+    for start, end in zip(edges, edges[1:]):
+        mask = (1 << (end - start)) - 1
+        buckets = defaultdict(list)
+        for key in keys:
+            buckets[(fingerprints[key] >> start) & mask].append(key)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            values = np.array([fingerprints[k] for k in members], dtype=np.uint64)
+            rows = max(1, _BLOCK_CELLS // len(members))
+            for row in range(0, len(members), rows):
+                block = values[row:row + rows, None] ^ values[None, row:]
+                close = _popcounts(block.ravel()).reshape(block.shape) <= max_distance
+                for i, j in zip(*np.nonzero(close)):
+                    if j > i:
+                        a, b = find(members[row + int(i)]), find(members[row + int(j)])
+                        if a != b:
+                            parent[b] = a
+
+    groups = defaultdict(list)
+    for key in keys:
+        groups[find(key)].append(key)
+    return [sorted(members) for members in groups.values() if len(members) > 1]
+
+
+def collapse_near_duplicates(resumes_data: Dict[str, str], versions: Dict[str, dict],
+                             max_distance: int = None) -> Dict[str, List[str]]:
+    """
+    Keep only the newest version of each near-duplicate group in resumes_data (in place).
+    versions maps resume keys to {'hash', 'mtime'}; ties on mtime go to the longer text.
+    Returns {kept_key: [older version keys]}.
+    """
+    fingerprints = _fingerprints(resumes_data, versions)
+    # Repeated searches over an unchanged corpus reuse its grouping
+    signature = hashlib.md5(f"{max_distance}|{sorted(fingerprints.items())}".encode('utf-8')).hexdigest()
+    with _recent_lock:
+        groups = _recent.get(signature)
+    if groups is None:
+        groups = group_near_duplicates(fingerprints, max_distance)
+        with _recent_lock:
+            _recent[signature] = groups
+            while len(_recent) > _RECENT_GROUPINGS:
+                _recent.popitem(last=False)
+    collapsed: Dict[str, List[str]] = {}
+    for members in groups:
+        newest = max(members, key=lambda k: ((versions.get(k) or {}).get('mtime') or 0, len(resumes_data[k]), k))
+        collapsed[newest] = [k for k in members if k != newest]
+        for key in collapsed[newest]:
+            del resumes_data[key]
+    if collapsed:
+        dropped = sum(len(v) for v in collapsed.values())
+        logger.info(f"🪞 Near-duplicates: {len(collapsed)} group(s); {dropped} older version(s) skipped, newest kept",
+                    extra={'groups': len(collapsed), 'skipped': dropped})
+    return collapsed
+
+
+def annotate_near_duplicates(candidate: Optional[Candidate], collapsed: Dict[str, List[str]]) -> Optional[Candidate]:
+    """A copy of the candidate with near_duplicate_files, if it has older versions."""
+    if isinstance(candidate, dict) and candidate.get('source_file') in collapsed:
+        return {**candidate, 'near_duplicate_files': collapsed[candidate['source_file']]}
+    return candidate
+
+__all__ = ['simhash','fingerprint_texts','group_near_duplicates','collapse_near_duplicates','annotate_near_duplicates']
@@ -0,0 +1,106 @@
+"""Sentence embeddings with ONNX Runtime, for CPU-only nodes.
+
+Runs a MiniLM exported (and int8-quantized) by `download_model.py --export-onnx`
+and reproduces the SentenceTransformer pipeline: tokenize, transformer forward
+pass, mean pooling over the attention mask, optional L2 normalization. Neither
+torch nor sentence-transformers is imported, which keeps start-up time and RSS low.
+"""
+
+import os, json
+from typing import List, Union
+import numpy as np
+
+# File names written by download_model.py --export-onnx
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+class FastTokenizer:
+    """
+    Minimal stand-in for a Hugging Face tokenizer call, built on the `tokenizers`
+    library (transformers imports torch as soon as it is available).
+    """
+
+    def __init__(self, tokenizer_file: str, max_length: int):
+        from tokenizers import Tokenizer
+
+        self._plain = Tokenizer.from_file(tokenizer_file)
+        self._plain.no_truncation()
+        self._plain.no_padding()
+        pad_id = self._plain.token_to_id('[PAD]') or 0
+        self._model = Tokenizer.from_file(tokenizer_file)
+        self._model.enable_truncation(max_length)
+        self._model.enable_padding(pad_id=pad_id, pad_token='[PAD]')
+
+    def __call__(self, texts: Union[str, List[str]], add_special_tokens: bool = True, padding: bool = False,
+                 truncation: bool = False, return_offsets_mapping: bool = False, return_tensors: str = None, **kwargs) -> dict:
+        if isinstance(texts, str):
+            texts = [texts]
+        tokenizer = self._model if (padding or truncation) else self._plain
+        encodings = tokenizer.encode_batch(texts, add_special_tokens=add_special_tokens)
+        result = {'input_ids': [e.ids for e in encodings],
+                  'attention_mask': [e.attention_mask for e in encodings],
+                  'token_type_ids': [e.type_ids for e in encodings]}
+        if return_offsets_mapping:
+            result['offset_mapping'] = [e.offsets for e in encodings]
+        if return_tensors == 'np':
+            result = {k: np.asarray(v, dtype=np.int64) for k, v in result.items()}
+        return result
+
+
+class OnnxEmbedder:
+    """Drop-in replacement for the parts of SentenceTransformer the parser uses (encode, tokenizer, max_seq_length)."""
+
+    def __init__(self, model_dir: str, threads: int = 0):
+        import onnxruntime as ort  # optional dependency, only needed for EMBEDDING_BACKEND=onnx
+
+        model_file = os.path.join(model_dir, ONNX_INT8_FILE)
+        if not os.path.exists(model_file):
+            model_file = os.path.join(model_dir, ONNX_FP32_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"No ONNX model in '{model_dir}' (run: python download_model.py --export-onnx)")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_file, options, providers=['CPUExecutionProvider'])
+        self.model_file = model_file
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.max_seq_length = 256
+        config_path = os.path.join(model_dir, "sentence_bert_config.json")
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                self.max_seq_length = json.load(f).get('max_seq_length', self.max_seq_length)
+        self.tokenizer = FastTokenizer(os.path.join(model_dir, "tokenizer.json"), self.max_seq_length)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, normalize_embeddings: bool = False,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        """Embed sentences; returns a float32 array (1-D for a single string, like SentenceTransformer)."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        if not sentences:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        batches = []
+        for i in range(0, len(sentences), batch_size):
+            encoded = self.tokenizer(sentences[i:i+batch_size], padding=True, truncation=True,
+                                     max_length=self.max_seq_length, return_tensors='np')
+            feed = {name: encoded[name] for name in ('input_ids', 'attention_mask', 'token_type_ids')
+                    if name in self._input_names and name in encoded}
+            token_embeddings = self.session.run(None, feed)[0]
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled.astype(np.float32))
+
+        embeddings = np.vstack(batches)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.session.get_outputs()[0].shape[-1])
+
+__all__ = ['OnnxEmbedder','FastTokenizer','ONNX_FP32_FILE','ONNX_INT8_FILE']
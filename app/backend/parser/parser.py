@@ -1,63 +1,194 @@
 import os, time
-from typing import List, Tuple
-from .progress import ProgressTracker
-from .file_readers import read_resumes_parallel
-from .vector_search import semantic_search_resumes
+from typing import Callable, Dict, List, Tuple
+from .corpus import get_corpus_registry, load_corpus
+from .near_dup import annotate_near_duplicates
+from .vector_search import semantic_search_resumes, compress_resumes_for_prompt
 from .batch import parse_resumes_batch
-from .config import ENABLE_MEMORY_OPTIMIZATION, AI_PROVIDER
+from .cache import generate_cache_key, generate_profile_key, get_cached_profiles, save_profiles, save_profile_refs
+from .config import ENABLE_MEMORY_OPTIMIZATION, AI_PROVIDER, PROMPT_MODE
+from .metrics import trace, span, record_request
+from .usage import split_by_resume, record_usage
+from .serialization import Candidate
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+
+def new_request_info() -> dict:
+    """Empty cache_info for one search request (the API response's cache_info)."""
+    return {
+        "genai_cache_hit": False,
+        "vector_cache_hit": False,
+        "cache_key": None,
+        "processing_time": None,
+        "total_resumes": 0,
+        "filtered_resumes": 0,
+        "batches_processed": 0,
+        "total_batches": 0,
+        "prompt_mode": PROMPT_MODE,
+        "corpus_id": None,
+        "duplicate_files": 0,
+        "near_duplicate_files": 0,
+        "near_duplicate_rate": 0.0,
+        "llm_resumes_saved": 0,
+        "normalization_chars_saved": 0,
+        "normalization_tokens_saved": 0,
+        "normalization_rate": 0.0,
+        "prompt_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "output_tokens": 0,
+        "estimated_cost_usd": 0.0,
+        "tokens_per_resume": None,
+        "saved_prompt_tokens": 0,
+        "saved_output_tokens": 0,
+        "saved_cost_usd": 0.0
+    }
+
+
+def record_near_duplicates(cache_info: dict, near_duplicates: Dict[str, List[str]], unique_resumes: int):
+    """Count the older versions left out of a search and their share of the corpus's resumes."""
+    skipped = sum(len(v) for v in near_duplicates.values())
+    cache_info['near_duplicate_files'] = skipped
+    cache_info['near_duplicate_rate'] = round(skipped / (unique_resumes + skipped), 4) if skipped else 0.0
+
+
+def record_text_reduction(cache_info: dict, text_stats: dict):
+    """Characters and estimated tokens that text normalization removed from the searched resumes."""
+    cache_info['normalization_chars_saved'] = text_stats.get('chars_saved', 0)
+    cache_info['normalization_tokens_saved'] = text_stats.get('tokens_saved', 0)
+    cache_info['normalization_rate'] = text_stats.get('rate', 0.0)
+
 
 class ResumeParser:
-    def main(self, dir_path: str, query_string: str, force_analyze: bool=False):
-        """Main function to run the resume parser application."""
-        cache_info = {
-            "genai_cache_hit": False,
-            "vector_cache_hit": False,
-            "cache_key": None,
-            "processing_time": None,
-            "total_resumes": 0,
-            "filtered_resumes": 0,
-            "batches_processed": 0,
-            "total_batches": 0
-        }
-
-        print("🤖 --- AI-Powered Resume Parser (Vector + Batch Mode) ---")
+    def main(self, dir_path: str, query_string: str, force_analyze: bool=False, corpus_id: str=None,
+             on_candidate: Callable[[Candidate], None]=None, trace_id: str=None):
+        """
+        Main function to run the resume parser application.
+        Either dir_path or a registered corpus_id selects the resumes to search.
+        on_candidate, if given, is called with each matched candidate as soon as it
+        is available (cached profiles first, then as the model's response streams in).
+        The run is traced (trace_id defaults to a new one): cache_info reports the
+        trace_id and the seconds spent per phase.
+        """
+        with trace(trace_id) as current:
+            try:
+                with span('request'):
+                    result, cache_info = self._run(dir_path, query_string, force_analyze, corpus_id, on_candidate)
+            except Exception:
+                record_request('error')
+                raise
+            record_request('ok')
+        cache_info['trace_id'] = current.trace_id
+        cache_info['phase_seconds'] = current.phase_seconds()
+        if cache_info.get('total_resumes'):
+            record_usage(cache_info, cache_info.get('corpus_id'))
+        return result, cache_info
+
+    def score_resumes(self, filtered_resumes: dict, required_skills: List[str], force_analyze: bool,
+                      emit: Callable[[Candidate], None], cache_info: dict) -> List[Candidate]:
+        """
+        LLM phase: serve per-resume profiles from cache, send the rest to the provider and
+        store what comes back. Updates cache_info (batches, tokens, savings) in place and
+        returns the matched candidates. emit is called with each candidate as it arrives.
+        """
+        # Per-resume profiles are shared across directories/corpora; only unscored resumes go to the API
+        logger.info(f"🚀 --- {AI_PROVIDER.upper()} API Processing Phase ---")
+        saved = {}  # tokens and cost recorded with the profiles served from cache
         if force_analyze:
-            print("🔥 FORCE ANALYZE MODE - Bypassing all caches")
+            cached_candidates, pending_resumes = [], filtered_resumes
+        else:
+            cached_candidates, pending_resumes = get_cached_profiles(filtered_resumes, required_skills, saved)
+        cache_info['saved_prompt_tokens'] = saved.get('prompt_tokens', 0)
+        cache_info['saved_output_tokens'] = saved.get('output_tokens', 0)
+        cache_info['saved_cost_usd'] = saved.get('cost_usd', 0.0)
+        for c in cached_candidates:
+            emit(c)
 
-        resume_dir = dir_path.strip()
-        if not os.path.isdir(resume_dir):
-            print(f"❌ Error: Directory '{resume_dir}' not found.")
-            return [], cache_info
-        
-        skills_input = query_string.strip()
-        if not skills_input:
-            print("❌ Error: You must specify at least one skill.")
-            return [], cache_info
-        required_skills = [s.strip() for s in skills_input.split(',') if s.strip()]
+        if not pending_resumes:
+            logger.info(f"🎯 PROFILE CACHE HIT: All {len(filtered_resumes)} resume(s) already scored for this query.")
+            cache_info['genai_cache_hit'] = True
+            cache_info['cache_key'] = generate_cache_key(filtered_resumes, required_skills)
+            matched_candidates = cached_candidates
+        else:
+            if cached_candidates or len(pending_resumes) < len(filtered_resumes):
+                logger.info(f"🎯 Profile cache: {len(filtered_resumes) - len(pending_resumes)}/{len(filtered_resumes)} resume(s) already scored")
+            new_candidates, genai_cache_info = parse_resumes_batch(pending_resumes, required_skills, force_analyze,
+                                                                   on_candidate=emit)
 
-        supported_ext = ('.txt','.pdf','.docx','.doc')
-        resume_files = [f for f in os.listdir(resume_dir) if f.lower().endswith(supported_ext)]
+            # Merge cache info (preserve vector_cache_hit and add batch info; savings add up)
+            vector_cache_hit_backup = cache_info['vector_cache_hit']
+            profile_savings = {k: cache_info[k] for k in ('saved_prompt_tokens', 'saved_output_tokens', 'saved_cost_usd')}
+            cache_info.update(genai_cache_info)
+            cache_info['vector_cache_hit'] = vector_cache_hit_backup
+            for key, value in profile_savings.items():
+                cache_info[key] = round(cache_info.get(key, 0) + value, 6)
 
-        if not resume_files:
-            print(f"❌ No supported resumes (.txt, .pdf, .docx) found in '{resume_dir}'.")
-            return [], cache_info
+            # Each resume's estimated share of the tokens, stored with its profile so later hits count as savings
+            if genai_cache_info.get('genai_cache_hit'):
+                spent = (genai_cache_info.get('saved_prompt_tokens', 0), genai_cache_info.get('saved_output_tokens', 0),
+                         genai_cache_info.get('saved_cost_usd', 0.0))
+            else:
+                spent = (genai_cache_info.get('prompt_tokens', 0), genai_cache_info.get('output_tokens', 0),
+                         genai_cache_info.get('estimated_cost_usd', 0.0))
+                cache_info['tokens_per_resume'] = round((spent[0] + spent[1]) / len(pending_resumes), 1)
+            token_shares = split_by_resume(pending_resumes, *spent) if spent[0] or spent[1] else None
+
+            # Non-matches are only recorded when no batch failed, otherwise they'd hide failed resumes
+            all_batches_ok = genai_cache_info.get('genai_cache_hit') or (
+                genai_cache_info.get('processing_time') is not None and
+                genai_cache_info.get('batches_processed') == genai_cache_info.get('total_batches'))
+            save_profiles(pending_resumes, required_skills, new_candidates, include_unmatched=bool(all_batches_ok),
+                          token_shares=token_shares)
+            matched_candidates = cached_candidates + new_candidates
+
+        if cache_info.get('cache_key'):
+            save_profile_refs(cache_info['cache_key'], [generate_profile_key(c, required_skills) for c in filtered_resumes.values()])
 
-        total_files = len(resume_files)
-        print(f"\n📂 Found {total_files} resume(s). Reading content...")
+        return matched_candidates
 
-        # Initialize progress tracker for file reading
-        file_progress = ProgressTracker(total_files, "Reading files")
+    def _run(self, dir_path: str, query_string: str, force_analyze: bool, corpus_id: str,
+             on_candidate: Callable[[Candidate], None]):
+        cache_info = new_request_info()
+
+        logger.info("🤖 --- AI-Powered Resume Parser (Vector + Batch Mode) ---")
+        if force_analyze:
+            logger.info("🔥 FORCE ANALYZE MODE - Bypassing all caches")
+
+        registry = get_corpus_registry()
+        if corpus_id:
+            corpus = registry.get(corpus_id)
+            if not corpus:
+                logger.error(f"❌ Error: Corpus '{corpus_id}' is not registered.")
+                return [], cache_info
+        else:
+            resume_dir = (dir_path or '').strip()
+            if not os.path.isdir(resume_dir):
+                logger.error(f"❌ Error: Directory '{resume_dir}' not found.")
+                return [], cache_info
+            corpus = registry.register([resume_dir])
+        cache_info['corpus_id'] = corpus['id']
 
-        # Use enhanced parallel file reading
+        skills_input = query_string.strip()
+        if not skills_input:
+            logger.error("❌ Error: You must specify at least one skill.")
+            return [], cache_info
+        required_skills = [s.strip() for s in skills_input.split(',') if s.strip()]
+
+        # Recursive scan + manifest: only new/changed files are extracted, identical files only once
         start_reading = time.time()
-        all_resumes_data = read_resumes_parallel(resume_files, resume_dir, file_progress)
-        file_progress.complete()
+        near_duplicates: Dict[str, List[str]] = {}
+        text_stats: dict = {}
+        with span('file_read', directories=len(corpus['paths'])):
+            all_resumes_data, duplicates = load_corpus(corpus, near_duplicates, text_stats)
+        cache_info['duplicate_files'] = sum(len(v) for v in duplicates.values())
+        record_near_duplicates(cache_info, near_duplicates, len(all_resumes_data))
+        record_text_reduction(cache_info, text_stats)
 
         reading_time = time.time() - start_reading
-        print(f"📚 File reading completed in {reading_time:.2f}s")
+        logger.info(f"📚 File reading completed in {reading_time:.2f}s")
 
         if not all_resumes_data:
-            print("\n❌ Could not read any resume content. Exiting.")
+            logger.error("❌ Could not read any resume content. Exiting.")
             return [], cache_info
         
         cache_info['total_resumes'] = len(all_resumes_data)
@@ -66,58 +197,71 @@ class ResumeParser:
         if len(all_resumes_data) > 100:
             total_chars = sum(len(c) for c in all_resumes_data.values())
             avg_size = total_chars / len(all_resumes_data)
-            print(f"📊 Dataset stats: {len(all_resumes_data)} resumes, avg size: {avg_size:.0f} chars, total: {total_chars:,} chars")
+            logger.info(f"📊 Dataset stats: {len(all_resumes_data)} resumes, avg size: {avg_size:.0f} chars, total: {total_chars:,} chars")
             
             # Memory optimization for very large datasets
             if ENABLE_MEMORY_OPTIMIZATION and len(all_resumes_data) > 500:
-                print("🔧 Large dataset detected - enabling memory optimization (placeholder)")
+                logger.info("🔧 Large dataset detected - enabling memory optimization (placeholder)")
                 # For extremely large datasets, we could implement streaming processing
                 # This is a placeholder for future memory optimization techniques
 
         # Perform semantic search to filter resumes before AI model API call
-        print(f"\n🔍 --- Semantic Filtering Phase ---")
+        logger.info(f"🔍 --- Semantic Filtering Phase ---")
         filtered_resumes, vector_cache_hit = semantic_search_resumes(required_skills, all_resumes_data, force_analyze=force_analyze)
         cache_info['vector_cache_hit'] = vector_cache_hit
         cache_info['filtered_resumes'] = len(filtered_resumes)
+        # Older versions of the matched resumes would each have taken an LLM batch slot
+        cache_info['llm_resumes_saved'] = sum(len(near_duplicates.get(key, ())) for key in filtered_resumes)
 
         if not filtered_resumes:
-            print("\n❌ --- No candidates found through semantic search. ---")
+            logger.info("❌ --- No candidates found through semantic search. ---")
             return [], cache_info
         
         if len(filtered_resumes) < len(all_resumes_data):
             reduction_pct = ((len(all_resumes_data) - len(filtered_resumes)) / len(all_resumes_data)) * 100
-            print(f"📊 Semantic search reduced API load: {len(all_resumes_data)} → {len(filtered_resumes)} resumes ({reduction_pct:.1f}% reduction)")
+            logger.info(f"📊 Semantic search reduced API load: {len(all_resumes_data)} → {len(filtered_resumes)} resumes ({reduction_pct:.1f}% reduction)")
+
+        # Optionally shrink each resume to its most relevant chunks before prompting
+        if PROMPT_MODE == 'relevant_chunks':
+            filtered_resumes = compress_resumes_for_prompt(required_skills, filtered_resumes, all_resumes_data)
+
+        def emit(candidate):
+            if not on_candidate:
+                return
+            # Annotate a copy; the originals are cached as-is and annotated below
+            if isinstance(candidate, dict) and candidate.get('source_file') in duplicates:
+                candidate = {**candidate, 'duplicate_files': duplicates[candidate['source_file']]}
+            on_candidate(annotate_near_duplicates(candidate, near_duplicates))
 
-        # The batch AI provider processing happens here with filtered resumes
-        print(f"\n🚀 --- {AI_PROVIDER.upper()} API Processing Phase ---")
-        matched_candidates, genai_cache_info = parse_resumes_batch(filtered_resumes, required_skills, force_analyze)
+        matched_candidates = self.score_resumes(filtered_resumes, required_skills, force_analyze, emit, cache_info)
 
-        # Merge cache info (preserve vector_cache_hit and add batch info)
-        vector_cache_hit_backup = cache_info['vector_cache_hit']
-        cache_info.update(genai_cache_info)
-        cache_info['vector_cache_hit'] = vector_cache_hit_backup
+        for c in matched_candidates:
+            if isinstance(c, dict) and c.get('source_file') in duplicates:
+                c['duplicate_files'] = duplicates[c['source_file']]
+            if isinstance(c, dict) and c.get('source_file') in near_duplicates:
+                c['near_duplicate_files'] = near_duplicates[c['source_file']]
 
         if matched_candidates:
-            print(f"\n\n🎉 --- Found {len(matched_candidates)} Matched Candidate(s) ---")
+            logger.info(f"🎉 --- Found {len(matched_candidates)} Matched Candidate(s) ---")
             # Pretty-print the final JSON output
             # print(json.dumps(matched_candidates, indent=4))
-            print("Matched candidate files:")
+            logger.debug("Matched candidate files:")
             for c in matched_candidates:
-                print(f"  - {c.get('source_file','Unknown')}")
+                logger.debug(f"  - {c.get('source_file','Unknown')}", extra={'file': c.get('source_file')})
 
             # Performance summary for large datasets
             if len(all_resumes_data) > 50:
                 total_time = time.time() - start_reading
                 throughput = len(all_resumes_data) / total_time
-                print(f"\n📈 Performance Summary:")
-                print(f"   • Total processing time: {total_time:.2f}s")
-                print(f"   • Throughput: {throughput:.1f} resumes/second")
+                logger.info(f"📈 Performance Summary:")
+                logger.info(f"   • Total processing time: {total_time:.2f}s")
+                logger.info(f"   • Throughput: {throughput:.1f} resumes/second")
                 if cache_info.get('batches_processed',0) > 0:
-                    print(f"   • Batches processed: {cache_info['batches_processed']}/{cache_info.get('total_batches',0)}")
+                    logger.info(f"   • Batches processed: {cache_info['batches_processed']}/{cache_info.get('total_batches',0)}")
 
             return matched_candidates, cache_info
         else:
-            print("\n❌ --- No candidates matched the required skills from the filtered resumes. ---")
+            logger.info("❌ --- No candidates matched the required skills from the filtered resumes. ---")
             return [], cache_info
 
-__all__ = ['ResumeParser']
+__all__ = ['ResumeParser','new_request_info']
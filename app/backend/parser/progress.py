@@ -1,27 +1,54 @@
 import time
 import threading
+from .config import PROGRESS_LOG_PERCENT_STEP, PROGRESS_LOG_INTERVAL_SECONDS
+from .log import get_logger
+
+logger = get_logger(__name__)
 
 class ProgressTracker:
-    def __init__(self, total_items: int, operation_name: str = "Processing"):
+    """
+    Counts processed items and logs progress at most once per PROGRESS_LOG_PERCENT_STEP
+    and once per PROGRESS_LOG_INTERVAL_SECONDS (the last item is always logged), so a
+    10k-file run writes a few dozen lines instead of one per file.
+    """
+
+    def __init__(self, total_items: int, operation_name: str = "Processing",
+                 percent_step: float = None, interval_seconds: float = None):
         self.total_items = total_items
         self.current_item = 0
         self.operation_name = operation_name
         self.start_time = time.time()
         self.lock = threading.Lock()
+        self.percent_step = PROGRESS_LOG_PERCENT_STEP if percent_step is None else percent_step
+        self.interval_seconds = PROGRESS_LOG_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self._last_log_time = 0.0
+        self._last_log_progress = 0.0
 
     def update(self, increment: int = 1):
+        # Only the counter and throttle check run under the lock; the line itself is queued outside it
         with self.lock:
             self.current_item += increment
-            progress = (self.current_item / self.total_items) * 100 if self.total_items else 100
-            elapsed = time.time() - self.start_time
-            if self.current_item > 0 and self.total_items:
-                eta = (elapsed / self.current_item) * (self.total_items - self.current_item)
-                print(f"🔄 {self.operation_name}: {self.current_item}/{self.total_items} ({progress:.1f}%) - ETA: {eta:.1f}s")
-            else:
-                print(f"🔄 {self.operation_name}: {self.current_item}/{self.total_items} ({progress:.1f}%)")
+            current = self.current_item
+            progress = (current / self.total_items) * 100 if self.total_items else 100
+            now = time.time()
+            done = self.total_items and current >= self.total_items
+            if not done and (progress - self._last_log_progress < self.percent_step or
+                             now - self._last_log_time < self.interval_seconds):
+                return
+            self._last_log_time, self._last_log_progress = now, progress
+        elapsed = now - self.start_time
+        fields = {'operation': self.operation_name, 'done': current, 'total': self.total_items,
+                  'percent': round(progress, 1)}
+        if current > 0 and self.total_items:
+            eta = (elapsed / current) * max(0, self.total_items - current)
+            logger.info(f"🔄 {self.operation_name}: {current}/{self.total_items} ({progress:.1f}%) - ETA: {eta:.1f}s",
+                        extra={**fields, 'eta_seconds': round(eta, 1)})
+        else:
+            logger.info(f"🔄 {self.operation_name}: {current}/{self.total_items} ({progress:.1f}%)", extra=fields)
 
     def complete(self):
         elapsed = time.time() - self.start_time
-        print(f"✅ {self.operation_name} completed in {elapsed:.2f}s")
+        logger.info(f"✅ {self.operation_name} completed in {elapsed:.2f}s",
+                    extra={'operation': self.operation_name, 'items': self.current_item, 'seconds': round(elapsed, 2)})
 
 __all__ = ['ProgressTracker']
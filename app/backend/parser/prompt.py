@@ -1,48 +1,85 @@
-def construct_batch_prompt(resumes_data: dict, required_skills: list[str]) -> str:
-    """
-    Constructs a detailed prompt for the GenAI API to process multiple resumes,
-    filter them by skills, and extract data for the matched ones.
-    """
+# The prompt is laid out as: static instructions + output schema, then the query,
+# then the resumes. The instructions never change and the query is the same for
+# every batch of a request, so providers can reuse the cached prefix (Gemini
+# context caching, Azure OpenAI automatic prompt caching). Keep PROMPT_INSTRUCTIONS
+# free of anything request-specific.
+from .config import OUTPUT_MODE
+from .schema import COMPACT_RESULTS_KEY, field_instructions
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+_INSTRUCTIONS_TEMPLATE = """
+    You are an expert HR recruitment assistant. Your task is to analyze a batch of resumes, identify candidates who match a specific set of skills, and then extract key information for ONLY the matched candidates in a strict JSON format.
+
+    The required technical skills are given after these instructions, followed by a collection of resumes. Each resume is clearly marked with its source filename.
+
+    **Your Instructions:**
+
+    1.  **Analyze and Filter:** Carefully read every resume provided in the batch. Identify which resumes are a strong match for the required skills. A strong match means the resume explicitly mentions several of these skills.
+
+    2.  **Extract Information for Matched Resumes ONLY:** For each resume that you identified as a strong match, extract the following information and format it as a JSON object. {key_note}Adhere strictly to the data types and formats specified:
+{fields}
+
+    **Output Format:**
+    {output_format}
+    Do not include any explanations, introductory text, markdown formatting like ```json, or any text outside of the final JSON {container}.
+    If a piece of information cannot be found, use `null` as the value for that key.
+"""
+
+_FULL_OUTPUT_FORMAT = ("Your output MUST be a single, valid JSON array `[]` containing one JSON object for each matched candidate. "
+                       "If no candidates match the required skills, you MUST return an empty array `[]`.")
+_COMPACT_OUTPUT_FORMAT = (f'Your output MUST be a single, valid JSON object `{{"{COMPACT_RESULTS_KEY}": []}}` whose array contains one JSON object for each matched candidate. '
+                          f'If no candidates match the required skills, you MUST return `{{"{COMPACT_RESULTS_KEY}": []}}`.')
+
+_instructions = {}
+
+
+def get_prompt_instructions(output_mode: str = None) -> str:
+    """Static instructions and schema for 'full' or 'compact' output (identical on every call)."""
+    compact = (output_mode or OUTPUT_MODE) == 'compact'
+    if compact not in _instructions:
+        _instructions[compact] = _INSTRUCTIONS_TEMPLATE.format(
+            key_note="Use the short keys shown in quotes, not the field names in brackets. " if compact else "",
+            fields=field_instructions(compact),
+            output_format=_COMPACT_OUTPUT_FORMAT if compact else _FULL_OUTPUT_FORMAT,
+            container="object" if compact else "array",
+        )
+    return _instructions[compact]
+
+
+PROMPT_INSTRUCTIONS = get_prompt_instructions()
+
+
+def construct_query_section(required_skills: list[str]) -> str:
+    """The request-specific part shared by every batch of one query."""
     skills_string = ", ".join(required_skills)
+    return f"""
+    The required technical skills we are looking for are: {skills_string}.
+"""
 
+
+def construct_batch_request(resumes_data: dict, required_skills: list[str]) -> str:
+    """Everything after PROMPT_INSTRUCTIONS: the query, then this batch's resumes."""
     # Combine all resume texts into one block, with clear separators
     combined_resume_text = ""
     for filename, text in resumes_data.items():
         combined_resume_text += f"--- START OF RESUME: {filename} ---\n{text}\n--- END OF RESUME: {filename} ---\n\n"
-    
-    # The prompt is carefully structured to guide the model.
-    # It first asks the model to filter and then extract.
-    prompt = f"""
-    You are an expert HR recruitment assistant. Your task is to analyze a batch of resumes, identify candidates who match a specific set of skills, and then extract key information for ONLY the matched candidates in a strict JSON format.
-
-    The required technical skills we are looking for are: {skills_string}.
 
-    Below is a collection of resumes. Each resume is clearly marked with its source filename.
+    return construct_query_section(required_skills) + f"""
     --- BATCH OF RESUMES START ---
     {combined_resume_text}
     --- BATCH OF RESUMES END ---
+    """
 
-    **Your Instructions:**
-
-    1.  **Analyze and Filter:** Carefully read every resume provided in the batch above. Identify which resumes are a strong match for the required skills: "{skills_string}". A strong match means the resume explicitly mentions several of these skills.
-
-    2.  **Extract Information for Matched Resumes ONLY:** For each resume that you identified as a strong match, extract the following information and format it as a JSON object. Adhere strictly to the data types and formats specified:
-        * "source_file": (String) The original filename of the resume (provided in the start/end markers).
-        * "name": (String) The full name of the candidate.
-        * "contact_number": (String) The primary phone number.
-        * "last_3_companies": (Array of Strings) A list of the last 3 companies the candidate worked for, starting with the most recent. Crucially, include only official company names. Exclude project names, client names, or internal divisions within a company. If fewer than 3 companies are clearly stated, include only all available.
-        * "top_5_technical_skills": (Array of Strings) A list of up to 5 technical skills explicitly mentioned in the resume that are most directly relevant to the {skills_string} and/or are highly prominent in the candidate's experience.
-        * "years_of_experience": (Number) The total calculated professional work experience in years. Calculate this based on the start and end dates of all full-time work experiences listed. Round it to the nearest whole number
-        * "match_score": (Number) An intelligent match score from 0-100 based on how well the candidate matches the required skills "{skills_string}". Consider: More weightage on skills and experience in relevant technologies.
-        * "score_breakdown": (String) A brief explanation (max 50 words) of why this score was assigned, highlighting the key strengths that contributed to the score.
-        * "summary": (String) A concise summary of the candidate's professional background and expertise, and most significant achievements. This must be no more than 200 words.
 
-    **Output Format:**
-    Your output MUST be a single, valid JSON array `[]` containing one JSON object for each matched candidate. If no candidates match the required skills, you MUST return an empty array `[]`.
-    Do not include any explanations, introductory text, markdown formatting like ```json, or any text outside of the final JSON array.
-    If a piece of information cannot be found, use `null` as the value for that key.
+def construct_batch_prompt(resumes_data: dict, required_skills: list[str], output_mode: str = None) -> str:
+    """
+    Constructs a detailed prompt for the GenAI API to process multiple resumes,
+    filter them by skills, and extract data for the matched ones.
     """
-    print("📝 Constructed a batch prompt for the GenAI API.")
+    prompt = get_prompt_instructions(output_mode) + construct_batch_request(resumes_data, required_skills)
+    logger.debug("📝 Constructed a batch prompt for the GenAI API.")
     return prompt
 
-__all__ = ['construct_batch_prompt']
+__all__ = ['PROMPT_INSTRUCTIONS','get_prompt_instructions','construct_query_section','construct_batch_request','construct_batch_prompt']
@@ -1,6 +1,9 @@
-"""Provider implementations for AI resume parsing (Gemini, Azure OpenAI)."""
+"""Provider implementations for AI resume parsing (Gemini, Azure OpenAI, or a pool of both)."""
 
 __all__ = [
+    'base',
     'batch_gemini',
-    'batch_azure'
+    'batch_azure',
+    'pool',
+    'adaptive'
 ]
\ No newline at end of file
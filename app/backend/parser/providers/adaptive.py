@@ -0,0 +1,234 @@
+"""Adaptive batch size and concurrency (AIMD) per provider/model.
+
+Batch size and concurrency grow by one step while batches finish within
+ADAPTIVE_TARGET_LATENCY_SECONDS, and are cut multiplicatively when the
+provider pushes back: 429/quota errors and timeouts cut concurrency and add a
+delay between requests, oversized-context errors and truncated responses cut
+the batch size. Throttled or oversized batches are re-queued and retried with
+the new limits. The learned limits are saved per provider/model (and prompt /
+output mode, which change how much fits in a batch) to
+INGEST_DIR/provider_limits.json and picked up again after a restart.
+"""
+
+import os, json, math, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+
+from ..config import (
+    INGEST_DIR, MAX_RESUMES_PER_BATCH, BATCH_DELAY_SECONDS, PROMPT_MODE,
+    ADAPTIVE_MIN_BATCH, ADAPTIVE_MAX_BATCH, ADAPTIVE_MAX_CONCURRENCY, ADAPTIVE_TARGET_LATENCY_SECONDS,
+    ADAPTIVE_BACKOFF_FACTOR, ADAPTIVE_MAX_RETRIES,
+)
+from ..ingest import _atomic_write_json
+from ..metrics import propagate
+from ..log import get_logger
+from .base import BatchResult, CandidateCallback, StreamFn, TokenUsage, process_batch
+
+logger = get_logger(__name__)
+
+LIMITS_PATH = os.path.join(INGEST_DIR, "provider_limits.json")
+MAX_DELAY_SECONDS = 60.0
+
+# Failure kinds
+RATE_LIMIT, TIMEOUT, CONTEXT, TRUNCATED, OTHER = 'rate_limit', 'timeout', 'context', 'truncated', 'other'
+_RATE_LIMIT_HINTS = ('429', 'rate limit', 'ratelimit', 'too many requests', 'quota', 'resource exhausted', 'resourceexhausted')
+_TIMEOUT_HINTS = ('timeout', 'timed out', 'deadline exceeded', 'deadlineexceeded', '504')
+_CONTEXT_HINTS = ('context length', 'context_length', 'maximum context', 'too many tokens', 'token limit',
+                  'input token count', 'exceeds the maximum', 'request too large', '413')
+
+
+def classify_failure(error: Optional[Exception], complete: bool) -> Optional[str]:
+    """None for a good batch, otherwise the kind of failure (an unclosed response counts as truncated)."""
+    if error is None:
+        return None if complete else TRUNCATED
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    status = status if isinstance(status, int) else None
+    text = f"{type(error).__name__} {error}".lower()
+    if status == 429 or any(h in text for h in _RATE_LIMIT_HINTS):
+        return RATE_LIMIT
+    if status in (408, 504) or isinstance(error, TimeoutError) or any(h in text for h in _TIMEOUT_HINTS):
+        return TIMEOUT
+    if status == 413 or any(h in text for h in _CONTEXT_HINTS):
+        return CONTEXT
+    return OTHER
+
+
+class AdaptiveLimits:
+    """Current batch size, concurrency and inter-request delay for one provider/model."""
+
+    def __init__(self, key: str, state: Optional[dict] = None):
+        state = state or {}
+        self.key = key
+        self.batch_size = self._clamp_batch(state.get('batch_size', MAX_RESUMES_PER_BATCH))
+        self.concurrency = min(max(1, int(state.get('concurrency', 1))), ADAPTIVE_MAX_CONCURRENCY)
+        self.delay = min(max(0.0, float(state.get('delay', BATCH_DELAY_SECONDS))), MAX_DELAY_SECONDS)
+        self.batches = int(state.get('batches', 0))
+        self.failures: Dict[str, int] = dict(state.get('failures', {}))
+        self._successes = 0
+        self._concurrency_cut_at = 0.0
+        self._batch_cut_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _clamp_batch(size) -> int:
+        return min(max(ADAPTIVE_MIN_BATCH, int(size)), max(ADAPTIVE_MIN_BATCH, ADAPTIVE_MAX_BATCH))
+
+    def record(self, batch_len: int, seconds: float, failure: Optional[str]):
+        with self._lock:
+            self.batches += 1
+            if failure is None:
+                if seconds <= ADAPTIVE_TARGET_LATENCY_SECONDS:
+                    if batch_len >= self.batch_size:   # a short tail batch says nothing about larger ones
+                        self.batch_size = self._clamp_batch(self.batch_size + 1)
+                    self._successes += 1
+                    if self._successes >= self.concurrency:   # one step per round of concurrent batches
+                        self._successes = 0
+                        self.concurrency = min(ADAPTIVE_MAX_CONCURRENCY, self.concurrency + 1)
+                    self.delay = self.delay / 2 if self.delay >= 0.2 else 0.0
+                else:
+                    self.batch_size = self._clamp_batch(self.batch_size - 1)
+                    self._successes = 0
+                return
+            self.failures[failure] = self.failures.get(failure, 0) + 1
+            self._successes = 0
+            # Cut each limit once per congestion event: batches already in flight when
+            # it was cut report the same event and must not cut it again
+            now = time.time()
+            started = now - seconds
+            if failure in (RATE_LIMIT, TIMEOUT) and started >= self._concurrency_cut_at:
+                self.concurrency = max(1, int(self.concurrency * ADAPTIVE_BACKOFF_FACTOR))
+                self.delay = min(MAX_DELAY_SECONDS, max(1.0, self.delay * 2))
+                self._concurrency_cut_at = now
+            if failure in (TIMEOUT, CONTEXT, TRUNCATED) and started >= self._batch_cut_at:
+                self.batch_size = self._clamp_batch(math.floor(min(self.batch_size, batch_len) * ADAPTIVE_BACKOFF_FACTOR))
+                self._batch_cut_at = now
+            elif failure == OTHER:
+                self.concurrency = max(1, self.concurrency - 1)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {'batch_size': self.batch_size, 'concurrency': self.concurrency, 'delay': round(self.delay, 2),
+                    'batches': self.batches, 'failures': dict(self.failures), 'updated': time.time()}
+
+
+_limits: Optional[Dict[str, AdaptiveLimits]] = None
+_limits_lock = threading.Lock()
+
+
+def _load() -> Dict[str, AdaptiveLimits]:
+    global _limits
+    if _limits is None:
+        stored = {}
+        if os.path.exists(LIMITS_PATH):
+            try:
+                with open(LIMITS_PATH, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ Warning: Could not load adaptive provider limits: {e}")
+        _limits = {key: AdaptiveLimits(key, state) for key, state in stored.items()}
+    return _limits
+
+
+def get_limits(key: str) -> AdaptiveLimits:
+    with _limits_lock:
+        limits = _load()
+        if key not in limits:
+            limits[key] = AdaptiveLimits(key)
+        return limits[key]
+
+
+def save_limits():
+    with _limits_lock:
+        data = {key: limits.to_dict() for key, limits in _load().items()}
+    try:
+        os.makedirs(INGEST_DIR, exist_ok=True)
+        _atomic_write_json(LIMITS_PATH, data)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not save adaptive provider limits: {e}")
+
+
+def get_all_limits() -> Dict[str, dict]:
+    with _limits_lock:
+        return {key: limits.to_dict() for key, limits in _load().items()}
+
+
+def limits_key(provider_key: str, output_mode: str) -> str:
+    return f"{provider_key}|{PROMPT_MODE}|{output_mode}"
+
+
+def run_adaptive(label: str, stream_fn: StreamFn, provider_key: str, resumes_data: dict, required_skills: List[str],
+                 on_candidate: Optional[CandidateCallback], output_mode: str) -> List[BatchResult]:
+    """
+    Cut batches off the queue at the current batch size and keep up to the current
+    concurrency in flight, adjusting both after every batch. Returns one result per batch sent.
+    """
+    limits = get_limits(limits_key(provider_key, output_mode))
+    logger.info(f"📈 Adaptive batching ({label}): {len(resumes_data)} resumes, starting at batch size "
+          f"{limits.batch_size}, concurrency {limits.concurrency}, delay {limits.delay:.1f}s")
+    pending = [(filename, text, 0) for filename, text in resumes_data.items()]
+    results: List[BatchResult] = []
+    emitted: Set[str] = set()
+    cond = threading.Condition()
+    state = {'in_flight': 0, 'last_start': 0.0, 'sent': 0}
+
+    def emit_once(candidate: dict):
+        # Candidates streamed before a batch was re-queued are not emitted again
+        with cond:
+            key = candidate.get('source_file')
+            if key in emitted:
+                return
+            emitted.add(key)
+        if on_candidate:
+            on_candidate(candidate)
+
+    def run_one(batch_num: int, items: list):
+        batch = {filename: text for filename, text, _ in items}
+        start = time.time()
+        candidates, complete, usage, error = [], False, TokenUsage(), None
+        try:
+            estimate = batch_num + math.ceil(len(pending) / max(1, limits.batch_size))
+            candidates, complete, usage, error = process_batch(label, stream_fn, batch, required_skills,
+                                                               batch_num, estimate, emit_once, output_mode)
+        except Exception as e:
+            error = e
+        seconds = time.time() - start
+        failure = classify_failure(error, complete)
+        limits.record(len(items), seconds, failure)
+        with cond:
+            if failure in (RATE_LIMIT, TIMEOUT, CONTEXT, TRUNCATED):
+                returned = {c.get('source_file') for c in candidates}
+                retry = [(f, t, n + 1) for f, t, n in items if f not in returned and n < ADAPTIVE_MAX_RETRIES]
+                if retry:
+                    logger.info(f"📉 Batch {batch_num} {failure.replace('_', ' ')}: re-queueing {len(retry)} resume(s); "
+                          f"now batch size {limits.batch_size}, concurrency {limits.concurrency}")
+                    pending[:0] = retry
+                # The batch counts as complete if everything it didn't return is being retried
+                complete = len(retry) + len(returned & set(batch)) >= len(items)
+            results.append(BatchResult(candidates, complete, usage, seconds, label))
+            state['in_flight'] -= 1
+            cond.notify_all()
+
+    with ThreadPoolExecutor(max_workers=max(1, ADAPTIVE_MAX_CONCURRENCY)) as executor:
+        while True:
+            with cond:
+                while state['in_flight'] >= limits.concurrency or (not pending and state['in_flight']):
+                    cond.wait()
+                if not pending:
+                    break
+                wait = state['last_start'] + limits.delay - time.time()
+                if wait > 0:
+                    cond.wait(timeout=wait)
+                    continue
+                items, pending[:] = pending[:limits.batch_size], pending[limits.batch_size:]
+                state['in_flight'] += 1
+                state['sent'] += 1
+                state['last_start'] = time.time()
+                batch_num = state['sent']
+            executor.submit(propagate(run_one), batch_num, items)
+
+    save_limits()
+    logger.info(f"📈 Learned limits for {limits.key}: batch size {limits.batch_size}, "
+          f"concurrency {limits.concurrency}, delay {limits.delay:.1f}s")
+    return results
+
+__all__ = ['classify_failure','AdaptiveLimits','get_limits','save_limits','get_all_limits','limits_key','run_adaptive']
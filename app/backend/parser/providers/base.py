@@ -0,0 +1,276 @@
+"""Shared batch orchestration for the provider modules.
+
+A provider supplies a function that sends one prompt and yields the response
+text as it streams in (plus a TokenUsage once the usage is known); everything
+else (result cache, batching, rate-limit delay, incremental JSON parsing,
+failure and token accounting) lives here.
+"""
+
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from ..config import BATCH_DELAY_SECONDS, MAX_RESUMES_PER_BATCH, OUTPUT_MODE, ADAPTIVE_BATCHING
+from ..prompt import get_prompt_instructions, construct_batch_request
+from ..schema import expand_candidate, normalize_candidate
+from ..serialization import Candidate
+from ..cache import generate_cache_key, get_cached_result, save_to_cache, clear_cache
+from ..json_stream import JsonArrayStream
+from ..metrics import span, batch_in_flight, record_provider_call, record_tokens
+from ..usage import estimate_cost, save_result_usage, get_result_usage
+from ..log import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenUsage(NamedTuple):
+    prompt_tokens: int = 0
+    cached_tokens: int = 0      # prompt tokens served from the provider's prefix cache
+    output_tokens: int = 0
+
+
+# Sends (instructions, request, output_mode) - the prompt is instructions + request - and
+# yields response text deltas; may also yield a TokenUsage. In 'compact' mode the provider
+# enforces the compact response schema.
+StreamFn = Callable[[str, str, str], Iterable[Union[str, TokenUsage]]]
+# Called with each candidate as soon as it has been parsed
+CandidateCallback = Callable[[Candidate], None]
+
+
+class BatchResult(NamedTuple):
+    candidates: List[Candidate]
+    complete: bool
+    usage: TokenUsage
+    seconds: float
+    provider: str
+    model: Optional[str] = None     # for pricing; defaults to the model passed to run_batches
+
+
+# Runs every batch: (batches, required_skills, on_candidate, output_mode) -> one BatchResult per batch
+BatchExecutor = Callable[[List[dict], List[str], Optional[CandidateCallback], str], List[BatchResult]]
+
+
+def new_cache_info() -> dict:
+    return {
+        "genai_cache_hit": False,
+        "vector_cache_hit": False,
+        "cache_key": None,
+        "processing_time": None,
+        "batches_processed": 0,
+        "total_batches": 0,
+        "prompt_tokens": 0,
+        "cached_prompt_tokens": 0,
+        "output_tokens": 0,
+        "output_mode": OUTPUT_MODE,
+        "avg_batch_seconds": None,
+        "providers": {},
+        "estimated_cost_usd": 0.0,
+        "tokens_by_model": {},
+        "batch_usage": [],
+        "usage_unreported_batches": 0,
+        "saved_prompt_tokens": 0,
+        "saved_output_tokens": 0,
+        "saved_cost_usd": 0.0
+    }
+
+
+def split_into_batches(items: dict, batch_size: int) -> List[dict]:
+    items_list = list(items.items())
+    return [dict(items_list[i:i+batch_size]) for i in range(0, len(items_list), batch_size)]
+
+
+def stream_candidates(deltas: Iterable[Union[str, TokenUsage]], on_candidate: Optional[CandidateCallback] = None
+                      ) -> Tuple[List[Candidate], bool, str, TokenUsage, Optional[Exception]]:
+    """
+    Parse a streamed response incrementally. Returns (candidates, complete, raw_text, usage, error);
+    complete is False if the stream broke off (error is set), the array was never closed or an item
+    was malformed. Candidates parsed before a failure are kept.
+    """
+    parser = JsonArrayStream()
+    candidates: List[Candidate] = []
+    usage = TokenUsage()
+
+    def emit(items):
+        for item in items:
+            item = normalize_candidate(expand_candidate(item))  # compact short keys -> API shape
+            candidates.append(item)
+            if on_candidate:
+                on_candidate(item)
+
+    error = None
+    try:
+        for delta in deltas:
+            if isinstance(delta, TokenUsage):
+                usage = delta
+            else:
+                emit(parser.feed(delta))
+    except Exception as e:
+        error = e
+    emit(parser.close())
+    if error is not None:
+        logger.warning(f"⚠️ Response stream interrupted after {len(candidates)} candidate(s): {error}")
+    return candidates, error is None and parser.complete and not parser.skipped, parser.text, usage, error
+
+
+def process_batch(label: str, stream_fn: StreamFn, batch_data: dict, required_skills: List[str],
+                  batch_num: int, total_batches: int, on_candidate: Optional[CandidateCallback] = None,
+                  output_mode: Optional[str] = None) -> Tuple[List[Candidate], bool, TokenUsage, Optional[Exception]]:
+    """Send one batch and return (candidates, complete, usage, error)."""
+    logger.info(f"🚀 Processing batch {batch_num}/{total_batches} ({len(batch_data)} resumes) via {label}...")
+    output_mode = output_mode or OUTPUT_MODE
+    call_start = None
+    try:
+        with span('prompt_build', resumes=len(batch_data)):
+            instructions = get_prompt_instructions(output_mode)
+            request = construct_batch_request(batch_data, required_skills)
+        call_start = time.time()
+        with batch_in_flight(label), span('provider_call', provider=label, batch=batch_num, resumes=len(batch_data)) as call:
+            deltas = stream_fn(instructions, request, output_mode)
+            candidates, complete, raw_text, usage, error = stream_candidates(deltas, on_candidate)
+            call.update(complete=complete, candidates=len(candidates))
+    except Exception as e:
+        logger.error(f"❌ Error processing {label} batch {batch_num}: {e}")
+        if call_start is not None:
+            record_provider_call(label, time.time() - call_start, False)
+        return [], False, TokenUsage(), e
+    record_provider_call(label, time.time() - call_start, complete)
+    record_tokens(label, usage.prompt_tokens, usage.cached_tokens, usage.output_tokens)
+    if complete:
+        logger.info(f"✅ Batch {batch_num}/{total_batches} completed: {len(candidates)} candidates found")
+    else:
+        logger.warning(f"⚠️ Batch {batch_num}/{total_batches} incomplete: kept {len(candidates)} candidate(s) parsed before the failure")
+        logger.debug(f"Raw response (last 400 chars): {raw_text[-400:]}")
+    if usage.prompt_tokens:
+        logger.info(f"🧮 Tokens: {usage.prompt_tokens} prompt ({usage.cached_tokens} cached), {usage.output_tokens} output")
+    return candidates, complete, usage, error
+
+
+def run_sequential(label: str, stream_fn: StreamFn, batches: List[dict], required_skills: List[str],
+                   on_candidate: Optional[CandidateCallback], output_mode: str) -> List[BatchResult]:
+    """Send batches one after another through a single provider, pausing BATCH_DELAY_SECONDS between them."""
+    results = []
+    for batch_num, batch_data in enumerate(batches, 1):
+        batch_start = time.time()
+        candidates, complete, usage, _ = process_batch(label, stream_fn, batch_data, required_skills,
+                                                       batch_num, len(batches), on_candidate, output_mode)
+        results.append(BatchResult(candidates, complete, usage, time.time() - batch_start, label))
+        if batch_num < len(batches):
+            time.sleep(BATCH_DELAY_SECONDS)
+    return results
+
+
+def run_batches(label: str, stream_fn: Optional[StreamFn], resumes_data: dict, required_skills: List[str],
+                force_analyze: bool = False, on_candidate: Optional[CandidateCallback] = None,
+                output_mode: Optional[str] = None, execute: Optional[BatchExecutor] = None,
+                adaptive_key: Optional[str] = None, model: Optional[str] = None):
+    """
+    Cache check, then every batch through stream_fn (or a custom executor such as the
+    provider pool). With ADAPTIVE_BATCHING, batch size and concurrency come from the
+    limits learned for adaptive_key (provider/model). Token usage is priced per model
+    (model, unless the executor reports one per batch). Returns (candidates, cache_info).
+    """
+    cache_info = new_cache_info()
+    output_mode = output_mode or OUTPUT_MODE
+    cache_info['output_mode'] = output_mode
+    if not resumes_data:
+        logger.error("❌ No resume content to process.")
+        return [], cache_info
+
+    cache_key = generate_cache_key(resumes_data, required_skills)
+    cache_info['cache_key'] = cache_key
+    logger.info(f"🔑 Generated cache key: {cache_key[:12]}...")
+
+    cached_result = None
+    if not force_analyze:
+        cached_result = get_cached_result(cache_key)
+    else:
+        logger.info("🔥 Force analyze requested - skipping cache check")
+
+    if cached_result is not None and not force_analyze:
+        cache_info['genai_cache_hit'] = True
+        logger.info(f"🎯 CACHE HIT: Found cached result! Skipping {label} call.")
+        logger.info(f"✅ Returning {len(cached_result)} cached candidate(s)")
+        spent = get_result_usage(cache_key)
+        if spent:
+            cache_info['saved_prompt_tokens'] = spent.get('prompt_tokens', 0)
+            cache_info['saved_output_tokens'] = spent.get('output_tokens', 0)
+            cache_info['saved_cost_usd'] = spent.get('cost_usd') or 0.0
+        if on_candidate:
+            for candidate in cached_result:
+                on_candidate(candidate)
+        return cached_result, cache_info
+
+    if force_analyze:
+        clear_cache(cache_key)
+    logger.info("🔎 CACHE MISS: No cached result found.")
+
+    start_time = time.time()
+    total_resumes = len(resumes_data)
+    if execute is None and adaptive_key and ADAPTIVE_BATCHING:
+        from .adaptive import run_adaptive  # imported lazily: adaptive builds on this module
+        results = run_adaptive(label, stream_fn, adaptive_key, resumes_data, required_skills, on_candidate, output_mode)
+    else:
+        batches = split_into_batches(resumes_data, MAX_RESUMES_PER_BATCH)
+        if len(batches) == 1:
+            logger.info(f"📝 Processing {total_resumes} resumes in single batch ({label})...")
+        else:
+            logger.info(f"📊 Large dataset detected ({total_resumes} resumes). Using {label} batch processing...")
+            logger.info(f"🔄 Processing {total_resumes} resumes in {len(batches)} batches of max {MAX_RESUMES_PER_BATCH} resumes each...")
+        if execute is not None:
+            results = execute(batches, required_skills, on_candidate, output_mode)
+        else:
+            results = run_sequential(label, stream_fn, batches, required_skills, on_candidate, output_mode)
+    cache_info['total_batches'] = len(results)
+
+    all_results, successful_batches = [], 0
+    for result in results:
+        all_results.extend(result.candidates)
+        successful_batches += int(result.complete)
+        usage = result.usage
+        # Every answered prompt has prompt tokens; none means the provider didn't report usage, so the cost is unknown
+        unreported = not usage.prompt_tokens and bool(result.complete or result.candidates)
+        cache_info['usage_unreported_batches'] += int(unreported)
+        cache_info['prompt_tokens'] += usage.prompt_tokens
+        cache_info['cached_prompt_tokens'] += usage.cached_tokens
+        cache_info['output_tokens'] += usage.output_tokens
+        cache_info['providers'][result.provider] = cache_info['providers'].get(result.provider, 0) + 1
+
+        batch_model = result.model or model or result.provider
+        cost = None if unreported else estimate_cost(batch_model, usage.prompt_tokens, usage.cached_tokens, usage.output_tokens)
+        cache_info['estimated_cost_usd'] = round(cache_info['estimated_cost_usd'] + (cost or 0.0), 6)
+        by_model = cache_info['tokens_by_model'].setdefault(batch_model, {
+            'prompt_tokens': 0, 'cached_prompt_tokens': 0, 'output_tokens': 0, 'cost_usd': 0.0})
+        by_model['prompt_tokens'] += usage.prompt_tokens
+        by_model['cached_prompt_tokens'] += usage.cached_tokens
+        by_model['output_tokens'] += usage.output_tokens
+        # None marks a model without a configured price (see MODEL_PRICES) or without reported usage
+        by_model['cost_usd'] = None if cost is None or by_model['cost_usd'] is None else round(by_model['cost_usd'] + cost, 6)
+        cache_info['batch_usage'].append({
+            'provider': result.provider, 'model': batch_model, 'complete': result.complete,
+            'candidates': len(result.candidates), 'seconds': round(result.seconds, 2),
+            'prompt_tokens': None if unreported else usage.prompt_tokens,
+            'cached_prompt_tokens': None if unreported else usage.cached_tokens,
+            'output_tokens': None if unreported else usage.output_tokens, 'cost_usd': cost})
+
+    if cache_info['usage_unreported_batches']:
+        # Token totals only cover the batches that reported usage; the cost is unknown rather than 0
+        cache_info['estimated_cost_usd'] = None
+
+    cache_info['batches_processed'] = successful_batches
+    cache_info['processing_time'] = round(time.time() - start_time, 2)
+    cache_info['avg_batch_seconds'] = round(sum(r.seconds for r in results) / len(results), 2) if results else None
+
+    # Partial results aren't cached under the full key; matched profiles are still saved per resume by the caller
+    if successful_batches == len(results):
+        save_to_cache(cache_key, all_results)
+        if not cache_info['usage_unreported_batches']:
+            save_result_usage(cache_key, {'prompt_tokens': cache_info['prompt_tokens'], 'output_tokens': cache_info['output_tokens'],
+                                          'cost_usd': cache_info['estimated_cost_usd']})
+        logger.info("💾 CACHE SAVE: Result saved to cache for future use.")
+        logger.info(f"✅ {label} returned {len(all_results)} candidate(s) in {cache_info['processing_time']}s")
+    else:
+        logger.warning(f"⚠️ {label}: {successful_batches}/{len(results)} batches completed; "
+              f"returning {len(all_results)} candidate(s) without caching the combined result")
+    return all_results, cache_info
+
+__all__ = ['TokenUsage','BatchResult','new_cache_info','split_into_batches','stream_candidates','process_batch',
+           'run_sequential','run_batches']
@@ -0,0 +1,313 @@
+"""Provider pool: several AI backends serving one request.
+
+Batches are spread over every configured member (Gemini, Azure OpenAI, or
+several Azure deployments) in proportion to its requests-per-minute limit, so
+throughput is the sum of the members' quotas. Each member has a circuit
+breaker: after POOL_FAILURE_THRESHOLD consecutive failed batches it is taken
+out of rotation for POOL_COOLDOWN_SECONDS, then health-checked and given a
+single trial batch before rejoining. A failed batch is retried on another
+member, and candidates are normalized to one shape whichever member answered.
+With ADAPTIVE_BATCHING, each member's concurrency (up to its configured
+maximum) and back-off delay are learned per member like a single provider's.
+"""
+
+import os, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from ..config import (
+    PROVIDER_POOL, POOL_DEFAULT_RPM, POOL_DEFAULT_CONCURRENCY, POOL_FAILURE_THRESHOLD,
+    POOL_COOLDOWN_SECONDS, POOL_MAX_ATTEMPTS, GEMINI_MODEL, ADAPTIVE_BATCHING,
+    AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT, AZURE_OPENAI_API_VERSION,
+)
+from ..metrics import propagate
+from ..log import get_logger
+from .base import (BatchResult, CandidateCallback, StreamFn, TokenUsage, process_batch, run_batches)
+from .adaptive import AdaptiveLimits, RATE_LIMIT, TIMEOUT, classify_failure, get_limits, limits_key, save_limits
+
+logger = get_logger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open (one trial) after `cooldown` seconds."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def available(self, now: float) -> bool:
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        if self.state == HALF_OPEN:
+            return not self.trial_in_flight
+        return True
+
+    def claim(self, now: float) -> bool:
+        """Take a request slot; returns True if it is a half-open trial."""
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, now: float):
+        self.trial_in_flight = False
+        if ok:
+            self.state, self.consecutive_failures = CLOSED, 0
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.threshold:
+            self.state, self.opened_at = OPEN, now
+
+
+class PoolMember:
+    def __init__(self, name: str, kind: str, stream_fn: StreamFn, health_fn: Callable[[], None],
+                 rpm: int, concurrency: int, model: Optional[str] = None):
+        self.name = name
+        self.kind = kind
+        self.model = model          # Gemini model or Azure deployment, for pricing
+        self.stream_fn = stream_fn
+        self.health_fn = health_fn
+        self.rpm = max(1, rpm)
+        self.concurrency = max(1, concurrency)
+        self.breaker = CircuitBreaker(POOL_FAILURE_THRESHOLD, POOL_COOLDOWN_SECONDS)
+        self.in_flight = 0
+        self.next_start = 0.0       # earliest start of the next request under the rpm limit
+        self.batches = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.healthy: Optional[bool] = None
+
+    def limits(self, output_mode: str) -> Optional[AdaptiveLimits]:
+        return get_limits(limits_key(self.name, output_mode)) if ADAPTIVE_BATCHING else None
+
+    def slots(self, output_mode: str) -> int:
+        limits = self.limits(output_mode)
+        return min(self.concurrency, limits.concurrency) if limits else self.concurrency
+
+    def status(self) -> dict:
+        return {
+            "name": self.name, "type": self.kind, "rpm": self.rpm, "concurrency": self.concurrency,
+            "state": self.breaker.state, "in_flight": self.in_flight, "batches": self.batches,
+            "failures": self.failures, "consecutive_failures": self.breaker.consecutive_failures,
+            "healthy": self.healthy, "last_error": self.last_error,
+        }
+
+
+def _parse_pool_spec(spec: str) -> List[dict]:
+    """PROVIDER_POOL as a JSON list of member dicts, or "type[:rpm[:concurrency]]" entries."""
+    spec = (spec or '').strip()
+    if spec.startswith('['):
+        return json.loads(spec)
+    members = []
+    for entry in filter(None, (e.strip() for e in spec.split(','))):
+        parts = entry.split(':')
+        member = {"type": parts[0].lower()}
+        if len(parts) > 1 and parts[1]:
+            member["rpm"] = int(parts[1])
+        if len(parts) > 2 and parts[2]:
+            member["concurrency"] = int(parts[2])
+        members.append(member)
+    return members
+
+
+def _build_member(spec: dict) -> PoolMember:
+    kind = str(spec.get("type", "")).lower()
+    rpm = int(spec.get("rpm") or POOL_DEFAULT_RPM)
+    concurrency = int(spec.get("concurrency") or POOL_DEFAULT_CONCURRENCY)
+    if kind == 'gemini':
+        from . import batch_gemini  # provider SDKs are only imported for configured members
+        model = spec.get("model") or GEMINI_MODEL
+        return PoolMember(spec.get("name") or f"gemini:{model}", kind, batch_gemini.make_stream_fn(model),
+                          lambda: batch_gemini.health_check(model), rpm, concurrency, model)
+    if kind == 'azure':
+        from . import batch_azure
+        api_key = os.getenv(spec["api_key_env"], "") if spec.get("api_key_env") else spec.get("api_key", AZURE_OPENAI_API_KEY)
+        params = dict(deployment=spec.get("deployment") or AZURE_OPENAI_DEPLOYMENT,
+                      endpoint=spec.get("endpoint") or AZURE_OPENAI_ENDPOINT,
+                      api_key=api_key,
+                      api_version=spec.get("api_version") or AZURE_OPENAI_API_VERSION)
+        return PoolMember(spec.get("name") or f"azure:{params['deployment']}", kind, batch_azure.make_stream_fn(**params),
+                          lambda: batch_azure.health_check(**params), rpm, concurrency, params['deployment'])
+    raise ValueError(f"unknown provider type '{kind}' (expected 'gemini' or 'azure')")
+
+
+class ProviderPool:
+    def __init__(self, members: List[PoolMember], max_attempts: int = POOL_MAX_ATTEMPTS):
+        if not members:
+            raise ValueError("provider pool has no members")
+        names = [m.name for m in members]
+        for i, member in enumerate(members):
+            if names.count(member.name) > 1:
+                member.name = f"{member.name}#{names[:i].count(member.name) + 1}"
+        self.members = members
+        self.max_attempts = max(1, max_attempts)
+        self._cond = threading.Condition()
+
+    @property
+    def concurrency(self) -> int:
+        return sum(m.concurrency for m in self.members)
+
+    def _acquire(self, exclude: Set[str], output_mode: str) -> Tuple[Optional[PoolMember], bool]:
+        """
+        Block until a member has a free slot and its rate limit allows a request, preferring
+        the member that can start soonest. Returns (None, False) if every member not in
+        `exclude` has an open circuit.
+        """
+        with self._cond:
+            while True:
+                now = time.time()
+                eligible = [m for m in self.members if m.name not in exclude]
+                candidates = [m for m in eligible if m.breaker.available(now)]
+                if not candidates:
+                    if any(m.breaker.state == HALF_OPEN for m in eligible):
+                        self._cond.wait(timeout=1.0)  # a trial batch will decide soon
+                        continue
+                    return None, False
+                free = [m for m in candidates if m.in_flight < m.slots(output_mode)]
+                if not free:
+                    self._cond.wait(timeout=1.0)
+                    continue
+                member = min(free, key=lambda m: (max(m.next_start, now), (m.in_flight + 1) / m.rpm))
+                wait = member.next_start - now
+                if wait > 0:
+                    self._cond.wait(timeout=wait)
+                    continue
+                member.in_flight += 1
+                member.next_start = max(member.next_start, now) + 60.0 / member.rpm
+                return member, member.breaker.claim(now)
+
+    def _release(self, member: PoolMember, ok: bool, error: Optional[str] = None,
+                 limits: Optional[AdaptiveLimits] = None, failure: Optional[str] = None,
+                 batch_len: int = 0, seconds: float = 0.0):
+        with self._cond:
+            member.in_flight -= 1
+            if limits is not None:
+                limits.record(batch_len, seconds, failure)
+                if failure in (RATE_LIMIT, TIMEOUT):
+                    member.next_start = max(member.next_start, time.time() + limits.delay)
+            member.batches += 1
+            if not ok:
+                member.failures += 1
+                member.last_error = error
+            previous = member.breaker.state
+            member.breaker.record(ok, time.time())
+            if member.breaker.state == OPEN and previous != OPEN:
+                logger.info(f"🔌 Circuit opened for {member.name} after {member.breaker.consecutive_failures} failure(s); "
+                      f"retrying it in {member.breaker.cooldown:.0f}s")
+            elif previous == HALF_OPEN and ok:
+                logger.info(f"🔌 Circuit closed for {member.name}: provider recovered")
+            self._cond.notify_all()
+
+    def _run_batch(self, batch_data: dict, required_skills: List[str], batch_num: int, total: int,
+                   on_candidate: Optional[CandidateCallback], output_mode: str) -> BatchResult:
+        """One batch with failover: each attempt goes to a different member."""
+        emitted: Set[str] = set()
+        partial: Dict[str, dict] = {}
+        usage = TokenUsage()
+        start = time.time()
+        tried: Set[str] = set()
+        model = None    # tokens of failed attempts are priced at the last member's model
+
+        def emit_once(candidate: dict):
+            # A retried batch may re-emit candidates streamed by a failed attempt
+            key = candidate.get('source_file')
+            if key in emitted:
+                return
+            emitted.add(key)
+            if on_candidate:
+                on_candidate(candidate)
+
+        for _ in range(self.max_attempts):
+            member, trial = self._acquire(tried, output_mode)
+            if member is None:
+                break
+            tried.add(member.name)
+            if trial:
+                try:
+                    member.health_fn()
+                    member.healthy = True
+                except Exception as e:
+                    member.healthy = False
+                    logger.warning(f"⚠️ Health check failed for {member.name}: {e}")
+                    self._release(member, False, f"health check: {e}")
+                    continue
+            attempt_start = time.time()
+            model = member.model
+            candidates, complete, attempt_usage, error = process_batch(member.name, member.stream_fn, batch_data,
+                                                                       required_skills, batch_num, total, emit_once, output_mode)
+            usage = TokenUsage(*(a + b for a, b in zip(usage, attempt_usage)))
+            self._release(member, complete, None if complete else str(error or "incomplete response"),
+                          member.limits(output_mode), classify_failure(error, complete),
+                          len(batch_data), time.time() - attempt_start)
+            if complete:
+                return BatchResult(candidates, True, usage, time.time() - start, member.name, member.model)
+            for candidate in candidates:
+                partial.setdefault(candidate.get('source_file'), candidate)
+            if len(tried) < len(self.members):
+                logger.info(f"🔁 Failing over batch {batch_num}/{total} from {member.name}")
+        logger.error(f"❌ Batch {batch_num}/{total} failed on every available provider ({', '.join(sorted(tried)) or 'none available'})")
+        return BatchResult(list(partial.values()), False, usage, time.time() - start, "failed", model)
+
+    def execute(self, batches: List[dict], required_skills: List[str],
+                on_candidate: Optional[CandidateCallback], output_mode: str) -> List[BatchResult]:
+        """Run all batches concurrently across the members (results in batch order)."""
+        lock = threading.Lock()
+
+        def callback(candidate: dict):
+            with lock:
+                on_candidate(candidate)
+
+        logger.info(f"🌐 Provider pool: {len(batches)} batch(es) across {', '.join(m.name for m in self.members)}")
+        with ThreadPoolExecutor(max_workers=min(len(batches), self.concurrency)) as executor:
+            futures = [executor.submit(propagate(self._run_batch), batch, required_skills, i, len(batches),
+                                       callback if on_candidate else None, output_mode)
+                       for i, batch in enumerate(batches, 1)]
+            results = [f.result() for f in futures]
+        if ADAPTIVE_BATCHING:
+            save_limits()
+        return results
+
+    def check_health(self) -> List[dict]:
+        """Run every member's health check now; returns member status."""
+        for member in self.members:
+            try:
+                member.health_fn()
+                member.healthy = True
+            except Exception as e:
+                member.healthy = False
+                member.last_error = f"health check: {e}"
+        return self.status()
+
+    def status(self) -> List[dict]:
+        with self._cond:
+            return [m.status() for m in self.members]
+
+
+_pool: Optional[ProviderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProviderPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProviderPool([_build_member(spec) for spec in _parse_pool_spec(PROVIDER_POOL)])
+            logger.info("🌐 Provider pool ready: " + ", ".join(f"{m.name} ({m.rpm} rpm)" for m in _pool.members))
+        return _pool
+
+
+def parse_resumes_batch(resumes_data: dict, required_skills: List[str], force_analyze: bool=False,
+                        on_candidate: CandidateCallback=None, output_mode: str=None):
+    """Pool implementation: same interface as the single-provider modules."""
+    return run_batches("Provider pool", None, resumes_data, required_skills, force_analyze, on_candidate,
+                       output_mode, execute=get_pool().execute)
+
+__all__ = ['CircuitBreaker','PoolMember','ProviderPool','get_pool','parse_resumes_batch']
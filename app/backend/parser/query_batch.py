@@ -0,0 +1,202 @@
+"""Batch queries: score many skill queries against one corpus in a single run.
+
+The corpus is read and its vector index loaded (or built) once, and every
+query is embedded in one batch up front. Queries are then grouped by their
+normalized skill set (the same key the per-resume profile cache uses), so
+requisitions that ask for the same skills share one semantic search and one
+set of LLM batches. Resumes already scored for a skill set by an earlier run
+or query come from the profile cache, as in interactive searches.
+
+Each query yields one result record with its candidates, token counts and
+per-phase timings; the one-off corpus load and index times are in the summary.
+"""
+
+import csv, json, os, time
+from typing import Dict, Iterator, List, Optional
+
+from .config import PROMPT_MODE
+from .corpus import get_corpus_registry, load_corpus
+from .vector_search import create_vector_database, embed_skill_queries, semantic_search_resumes, compress_resumes_for_prompt
+from .parser import ResumeParser, new_request_info, record_near_duplicates, record_text_reduction
+from .metrics import trace, span, record_request
+from .usage import record_usage
+from .serialization import dumps
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# cache_info fields copied into each result record
+RESULT_INFO_FIELDS = ('filtered_resumes', 'llm_resumes_saved', 'genai_cache_hit', 'batches_processed', 'total_batches', 'prompt_tokens',
+                      'cached_prompt_tokens', 'output_tokens', 'estimated_cost_usd', 'saved_prompt_tokens',
+                      'saved_output_tokens', 'saved_cost_usd')
+
+
+def parse_skills(value) -> List[str]:
+    """Skills from a comma-separated string or a list."""
+    items = value if isinstance(value, list) else str(value or '').split(',')
+    return [str(s).strip() for s in items if str(s).strip()]
+
+
+def skills_key(skills: List[str]) -> str:
+    """Order- and case-insensitive key; queries with equal keys share their results."""
+    return ','.join(sorted({s.lower() for s in skills}))
+
+
+def read_queries(path: str) -> List[dict]:
+    """
+    Load queries from a CSV file (header with a 'skills' or 'query' column and an
+    optional 'id' column) or a JSONL file ({"id": ..., "skills": "Python, SQL"} per line;
+    skills may also be a list). Queries without an id are numbered by position.
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson', '.json'):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for i, row in enumerate(rows, 1):
+            row = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+            skills = parse_skills(row.get('skills', row.get('query')))
+            queries.append({'id': str(row.get('id') or i), 'skills': skills})
+    return queries
+
+
+def _group_queries(queries: List[dict]) -> Dict[str, List[dict]]:
+    groups: Dict[str, List[dict]] = {}
+    for query in queries:
+        if query['skills']:
+            groups.setdefault(skills_key(query['skills']), []).append(query)
+    return groups
+
+
+def _resolve_corpus(paths: Optional[List[str]], corpus_id: Optional[str]) -> dict:
+    registry = get_corpus_registry()
+    if corpus_id:
+        corpus = registry.get(corpus_id)
+        if not corpus:
+            raise ValueError(f"Corpus '{corpus_id}' is not registered")
+    else:
+        missing = [p for p in paths or [] if not os.path.isdir(p)]
+        if not paths or missing:
+            raise ValueError(f"Directory not found: {', '.join(missing) or '(none given)'}")
+        corpus = registry.register(paths)
+    return corpus
+
+
+def run_query_batch(queries: List[dict], paths: Optional[List[str]] = None, corpus_id: Optional[str] = None,
+                    force_analyze: bool = False, summary: Optional[dict] = None) -> Iterator[dict]:
+    """
+    Score every query against one corpus (directories or a registered corpus id).
+    Yields one record per query, grouped by shared skill set; pass summary to
+    receive the run totals (corpus load and index times, groups, tokens, cost).
+    """
+    run_start = time.time()
+    corpus = _resolve_corpus(paths, corpus_id)
+    corpus_id = corpus['id']
+
+    start = time.time()
+    near_duplicates: Dict[str, List[str]] = {}
+    text_stats: dict = {}
+    with span('file_read', directories=len(corpus['paths'])):
+        all_resumes_data, duplicates = load_corpus(corpus, near_duplicates, text_stats)
+    load_seconds = time.time() - start
+    if not all_resumes_data:
+        raise ValueError("Could not read any resume content")
+
+    start = time.time()
+    create_vector_database(all_resumes_data, force_analyze)   # loaded once; each search below reuses it
+    index_seconds = time.time() - start
+
+    groups = _group_queries(queries)
+    group_skills = [members[0]['skills'] for members in groups.values()]
+    start = time.time()
+    query_embeddings = embed_skill_queries(group_skills)
+    embed_seconds = time.time() - start
+    logger.info(f"📋 {len(queries)} quer(ies), {len(groups)} distinct skill set(s) against {len(all_resumes_data)} resume(s) "
+                f"(read {load_seconds:.2f}s, index {index_seconds:.2f}s, query embedding {embed_seconds:.2f}s)",
+                extra={'queries': len(queries), 'skill_sets': len(groups), 'resumes': len(all_resumes_data)})
+
+    totals = {'queries': len(queries), 'skill_sets': len(groups), 'resumes': len(all_resumes_data), 'corpus_id': corpus_id,
+              'load_seconds': round(load_seconds, 2), 'index_seconds': round(index_seconds, 2),
+              'query_embedding_seconds': round(embed_seconds, 2), 'failed': 0,
+              'near_duplicate_files': sum(len(v) for v in near_duplicates.values()), 'llm_resumes_saved': 0,
+              'normalization_chars_saved': text_stats.get('chars_saved', 0),
+              'normalization_tokens_saved': text_stats.get('tokens_saved', 0),
+              'prompt_tokens': 0, 'output_tokens': 0, 'estimated_cost_usd': 0.0}
+
+    for query in queries:
+        if not query['skills']:
+            totals['failed'] += 1
+            yield {'id': query['id'], 'skills': [], 'error': 'no skills given', 'candidates': []}
+
+    agent = ResumeParser()
+    for i, (key, members) in enumerate(groups.items()):
+        skills = members[0]['skills']
+        query_embedding = query_embeddings[i:i+1] if query_embeddings is not None else None
+        cache_info = new_request_info()
+        cache_info['corpus_id'] = corpus_id
+        cache_info['total_resumes'] = len(all_resumes_data)
+        record_near_duplicates(cache_info, near_duplicates, len(all_resumes_data))
+        record_text_reduction(cache_info, text_stats)
+        timings, error, candidates = {}, None, []
+        logger.info(f"🔎 Skill set {i + 1}/{len(groups)}: {', '.join(skills)} ({len(members)} quer(ies))")
+        with trace() as current:
+            try:
+                with span('request'):
+                    start = time.time()
+                    filtered, cache_info['vector_cache_hit'] = semantic_search_resumes(
+                        skills, all_resumes_data, query_embedding=query_embedding)
+                    cache_info['filtered_resumes'] = len(filtered)
+                    cache_info['llm_resumes_saved'] = sum(len(near_duplicates.get(key, ())) for key in filtered)
+                    timings['filter_seconds'] = round(time.time() - start, 3)
+                    if filtered and PROMPT_MODE == 'relevant_chunks':
+                        start = time.time()
+                        filtered = compress_resumes_for_prompt(skills, filtered, all_resumes_data,
+                                                               query_embedding=query_embedding)
+                        timings['prompt_seconds'] = round(time.time() - start, 3)
+                    if filtered:
+                        start = time.time()
+                        candidates = agent.score_resumes(filtered, skills, force_analyze, lambda c: None, cache_info)
+                        timings['llm_seconds'] = round(time.time() - start, 3)
+                record_request('ok')
+            except Exception as e:
+                record_request('error')
+                logger.error(f"❌ Skill set '{', '.join(skills)}' failed: {e}")
+                error = str(e)
+        timings['total_seconds'] = round(sum(timings.values()), 3)
+        cache_info['trace_id'] = current.trace_id
+        if not error:
+            record_usage(cache_info, corpus_id)
+        for c in candidates:
+            if isinstance(c, dict) and c.get('source_file') in duplicates:
+                c['duplicate_files'] = duplicates[c['source_file']]
+            if isinstance(c, dict) and c.get('source_file') in near_duplicates:
+                c['near_duplicate_files'] = near_duplicates[c['source_file']]
+
+        totals['failed'] += len(members) if error else 0
+        for field in ('prompt_tokens', 'output_tokens', 'estimated_cost_usd', 'llm_resumes_saved'):
+            totals[field] = round(totals[field] + (cache_info.get(field) or 0), 6)
+        for query in members:
+            record = {'id': query['id'], 'skills': query['skills'], 'candidates': candidates,
+                      'shared_with': [q['id'] for q in members if q is not query], 'timings': timings,
+                      'trace_id': current.trace_id, **{field: cache_info.get(field) for field in RESULT_INFO_FIELDS}}
+            if error:
+                record['error'] = error
+            yield record
+
+    totals['total_seconds'] = round(time.time() - run_start, 2)
+    if summary is not None:
+        summary.update(totals)
+
+
+def write_results(records: Iterator[dict], out_path: str) -> int:
+    """Write records as JSONL, one flushed line per query so partial runs keep their results. Returns the count."""
+    count = 0
+    with open(out_path, 'wb') as f:
+        for record in records:
+            f.write(dumps(record) + b'\n')
+            f.flush()
+            count += 1
+    return count
+
+__all__ = ['parse_skills','skills_key','read_queries','run_query_batch','write_results']
@@ -0,0 +1,161 @@
+"""Server-side result store.
+
+Every search's matched candidates are saved under a result id in the KV store
+('results' namespace, bounded by the 'results' cache manager: RESULTS_MAX_MB,
+RESULTS_MAX_ENTRIES, RESULTS_TTL_HOURS). GET /results/{id} then serves pages
+of it, filtered, sorted and projected, without re-running any pipeline stage.
+The most recently read results are kept decoded in memory, so paging through
+one result set decodes it from the store only once.
+"""
+
+import threading, time, uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .config import RESULTS_PAGE_SIZE
+from .cache import get_store
+from .cache_manager import get_cache_manager
+from .serialization import Candidate
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+NAMESPACE = 'results'
+SORT_FIELDS = ('match_score', 'years_of_experience')
+MAX_PAGE_SIZE = 1000
+_DECODED_RESULTS = 8    # result sets kept decoded in memory
+
+_recent: "OrderedDict[str, dict]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def _remember(result_id: str, record: dict):
+    with _recent_lock:
+        _recent[result_id] = record
+        _recent.move_to_end(result_id)
+        while len(_recent) > _DECODED_RESULTS:
+            _recent.popitem(last=False)
+
+
+def remove_result(result_id: str):
+    """Delete a stored result from the store and memory (the results cache manager's remove callback)."""
+    with _recent_lock:
+        _recent.pop(result_id, None)
+    get_store().delete(NAMESPACE, result_id)
+
+
+def delete_result(result_id: str) -> bool:
+    """Delete a stored result on request. Returns False if it wasn't stored."""
+    if get_store().size_of(NAMESPACE, result_id) is None:
+        return False
+    get_cache_manager('results').discard(result_id)
+    remove_result(result_id)
+    return True
+
+
+def save_result(candidates: List[Candidate], cache_info: dict, query: str, summary: Optional[dict] = None) -> Optional[str]:
+    """Persist a search's candidates and return the new result id (None if the store is unavailable)."""
+    result_id = uuid.uuid4().hex
+    record = {'id': result_id, 'created': time.time(), 'query': query, 'corpus_id': cache_info.get('corpus_id'),
+              'trace_id': cache_info.get('trace_id'), 'summary': summary or {},
+              'candidates': [c for c in candidates if isinstance(c, dict)]}
+    try:
+        size = get_store().put(NAMESPACE, result_id, record)
+        get_cache_manager('results').record_put(result_id, size)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not store result: {e}")
+        return None
+    _remember(result_id, record)
+    return result_id
+
+
+def load_result(result_id: str) -> Optional[dict]:
+    manager = get_cache_manager('results')
+    if not manager.lookup(result_id):
+        manager.record_miss()
+        return None
+    with _recent_lock:
+        record = _recent.get(result_id)
+    if record is None:
+        record = get_store().get(NAMESPACE, result_id)
+        if record is None:
+            manager.discard(result_id)
+            manager.record_miss()
+            return None
+        _remember(result_id, record)
+    manager.record_hit(result_id)
+    return record
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_candidates(candidates: List[Candidate], min_score: float = None, min_years: float = None,
+                      max_years: float = None, skill: str = None) -> List[Candidate]:
+    """Keep candidates with match_score/years_of_experience in range and (if skill is given) a matching top skill."""
+    skill = (skill or '').strip().lower()
+    kept = []
+    for c in candidates:
+        score, years = _number(c.get('match_score')), _number(c.get('years_of_experience'))
+        if min_score is not None and (score is None or score < min_score):
+            continue
+        if min_years is not None and (years is None or years < min_years):
+            continue
+        if max_years is not None and (years is None or years > max_years):
+            continue
+        if skill and not any(skill in str(s).lower() for s in c.get('top_5_technical_skills') or []):
+            continue
+        kept.append(c)
+    return kept
+
+
+def sort_candidates(candidates: List[Candidate], sort: str = 'match_score', descending: bool = True) -> List[Candidate]:
+    """Sort by a numeric field; candidates without a value go last either way."""
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+    present = [c for c in candidates if _number(c.get(sort)) is not None]
+    missing = [c for c in candidates if _number(c.get(sort)) is None]
+    return sorted(present, key=lambda c: _number(c.get(sort)), reverse=descending) + missing
+
+
+def project(candidates: List[Candidate], fields: Optional[List[str]]) -> List[Candidate]:
+    if not fields:
+        return candidates
+    return [{f: c[f] for f in fields if f in c} for c in candidates]
+
+
+def get_result_page(result_id: str, offset: int = 0, limit: int = None, sort: str = 'match_score',
+                    order: str = 'desc', fields: Optional[List[str]] = None, **filters) -> Optional[dict]:
+    """
+    One page of a stored result: filters (min_score, min_years, max_years, skill) apply first,
+    then sorting and offset/limit; fields projects each candidate. None if the id is unknown or expired.
+    """
+    record = load_result(result_id)
+    if record is None:
+        return None
+    limit = max(1, min(MAX_PAGE_SIZE, limit or RESULTS_PAGE_SIZE))
+    offset = max(0, offset)
+    matched = filter_candidates(record['candidates'], **filters)
+    ordered = sort_candidates(matched, sort, order != 'asc')
+    page = ordered[offset:offset + limit]
+    return {
+        'result_id': result_id,
+        'query': record.get('query'),
+        'corpus_id': record.get('corpus_id'),
+        'created': record.get('created'),
+        'total': len(record['candidates']),
+        'matched': len(matched),
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < len(matched) else None,
+        'sort': sort,
+        'order': 'asc' if order == 'asc' else 'desc',
+        'summary': record.get('summary', {}),
+        'result': project(page, fields),
+    }
+
+__all__ = ['save_result','load_result','remove_result','delete_result','get_result_page','filter_candidates','sort_candidates','project']
@@ -0,0 +1,141 @@
+"""Candidate output schema.
+
+One field table drives the prompt's field list, the response schemas passed
+to the providers, and expansion of compact (short-key) output back to the
+API shape. In compact mode the model writes single-letter keys and shorter
+text fields under a formal schema, which cuts output tokens and malformed JSON.
+"""
+
+import re
+from typing import List, Optional, Tuple
+from .config import (SUMMARY_MAX_WORDS, SCORE_BREAKDOWN_MAX_WORDS,
+                     COMPACT_SUMMARY_MAX_WORDS, COMPACT_SCORE_BREAKDOWN_MAX_WORDS)
+
+# (key, compact key, JSON type, nullable, description); {breakdown_words}/{summary_words} depend on the mode
+CANDIDATE_FIELDS: List[Tuple[str, str, str, bool, str]] = [
+    ("source_file", "f", "string", False,
+     "(String) The original filename of the resume (provided in the start/end markers)."),
+    ("name", "n", "string", True,
+     "(String) The full name of the candidate."),
+    ("contact_number", "p", "string", True,
+     "(String) The primary phone number."),
+    ("last_3_companies", "c", "array", False,
+     "(Array of Strings) A list of the last 3 companies the candidate worked for, starting with the most recent. Crucially, include only official company names. Exclude project names, client names, or internal divisions within a company. If fewer than 3 companies are clearly stated, include only all available."),
+    ("top_5_technical_skills", "k", "array", False,
+     "(Array of Strings) A list of up to 5 technical skills explicitly mentioned in the resume that are most directly relevant to the required skills and/or are highly prominent in the candidate's experience."),
+    ("years_of_experience", "y", "number", True,
+     "(Number) The total calculated professional work experience in years. Calculate this based on the start and end dates of all full-time work experiences listed. Round it to the nearest whole number"),
+    ("match_score", "s", "number", False,
+     "(Number) An intelligent match score from 0-100 based on how well the candidate matches the required skills. Consider: More weightage on skills and experience in relevant technologies."),
+    ("score_breakdown", "b", "string", False,
+     "(String) A brief explanation (max {breakdown_words} words) of why this score was assigned, highlighting the key strengths that contributed to the score."),
+    ("summary", "u", "string", False,
+     "(String) A concise summary of the candidate's professional background and expertise, and most significant achievements. This must be no more than {summary_words} words."),
+]
+
+# Compact output wraps the array in an object, as Azure's json_schema requires an object at the top level
+COMPACT_RESULTS_KEY = "r"
+
+
+def field_instructions(compact: bool) -> str:
+    """The bullet list of output fields for the prompt."""
+    words = dict(summary_words=COMPACT_SUMMARY_MAX_WORDS if compact else SUMMARY_MAX_WORDS,
+                 breakdown_words=COMPACT_SCORE_BREAKDOWN_MAX_WORDS if compact else SCORE_BREAKDOWN_MAX_WORDS)
+    lines = []
+    for key, short, _, _, description in CANDIDATE_FIELDS:
+        label = f'"{short}" ({key})' if compact else f'"{key}"'
+        lines.append(f"        * {label}: {description.format(**words)}")
+    return "\n".join(lines)
+
+
+def _property(json_type: str, nullable: bool, gemini: bool) -> dict:
+    prop = {"type": "array", "items": {"type": "string"}} if json_type == "array" else {"type": json_type}
+    if gemini:
+        prop = {**prop, "type": prop["type"].upper()}
+        if "items" in prop:
+            prop["items"] = {"type": "STRING"}
+        if nullable:
+            prop["nullable"] = True
+    elif nullable:
+        prop["type"] = [prop["type"], "null"]
+    return prop
+
+
+def gemini_response_schema() -> dict:
+    """Compact schema in the OpenAPI subset Gemini's response_schema accepts."""
+    item = {
+        "type": "OBJECT",
+        "properties": {short: _property(t, nullable, True) for _, short, t, nullable, _ in CANDIDATE_FIELDS},
+        "required": [short for _, short, _, _, _ in CANDIDATE_FIELDS],
+    }
+    return {"type": "OBJECT", "properties": {COMPACT_RESULTS_KEY: {"type": "ARRAY", "items": item}},
+            "required": [COMPACT_RESULTS_KEY]}
+
+
+def azure_response_format() -> dict:
+    """Compact schema as a strict Azure OpenAI json_schema response_format."""
+    item = {
+        "type": "object",
+        "properties": {short: _property(t, nullable, False) for _, short, t, nullable, _ in CANDIDATE_FIELDS},
+        "required": [short for _, short, _, _, _ in CANDIDATE_FIELDS],
+        "additionalProperties": False,
+    }
+    schema = {"type": "object", "properties": {COMPACT_RESULTS_KEY: {"type": "array", "items": item}},
+              "required": [COMPACT_RESULTS_KEY], "additionalProperties": False}
+    return {"type": "json_schema", "json_schema": {"name": "matched_candidates", "strict": True, "schema": schema}}
+
+
+def expand_candidate(candidate: dict) -> Optional[dict]:
+    """Map a compact candidate back to the full key names; full-key objects pass through."""
+    if not isinstance(candidate, dict) or "source_file" in candidate:
+        return candidate
+    return {key: candidate.get(short) for key, short, _, _, _ in CANDIDATE_FIELDS}
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def _as_number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, str):
+        match = _NUMBER.search(value)  # e.g. "85%", "7 years"
+        value = float(match.group()) if match else None
+    if not isinstance(value, (int, float)):
+        return None
+    return int(value) if float(value).is_integer() else round(float(value), 1)
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list):
+        return [str(value)]
+    return [str(v).strip() for v in value if v is not None and str(v).strip()]
+
+
+def normalize_candidate(candidate: dict) -> dict:
+    """
+    Coerce a candidate to the API shape whichever provider produced it: every field
+    present, numbers as numbers, lists as lists of strings. Extra keys are kept.
+    """
+    if not isinstance(candidate, dict):
+        return candidate
+    normalized = {}
+    for key, _, json_type, _, _ in CANDIDATE_FIELDS:
+        value = candidate.get(key)
+        if json_type == "array":
+            value = _as_list(value)
+        elif json_type == "number":
+            value = _as_number(value)
+        elif value is not None:
+            value = str(value).strip()
+        normalized[key] = value
+    if normalized["match_score"] is not None:
+        normalized["match_score"] = max(0, min(100, normalized["match_score"]))
+    normalized.update({k: v for k, v in candidate.items() if k not in normalized})
+    return normalized
+
+__all__ = ['CANDIDATE_FIELDS','COMPACT_RESULTS_KEY','field_instructions','gemini_response_schema',
+           'azure_response_format','expand_candidate','normalize_candidate']
@@ -0,0 +1,121 @@
+"""Pluggable JSON serialization for the KV store, API responses and result files.
+
+dumps() returns compact UTF-8 bytes and loads() accepts bytes or str, through
+the fastest available backend: orjson, then msgspec, then the stdlib json
+module. JSON_BACKEND ('auto', 'orjson', 'msgspec' or 'stdlib') pins one; a
+pinned backend that isn't installed falls back to the next available one.
+All backends write the same compact JSON, so data written by one is read by
+any other. Values the fast backends reject (NaN written by the stdlib, ints
+beyond 64 bits) are retried through the stdlib.
+
+This module has no package dependencies, so the KV store stays importable on
+its own.
+"""
+
+import json
+from typing import Any, Callable, List, Optional, TypedDict, Union
+
+BACKENDS = ('orjson', 'msgspec', 'stdlib')
+
+
+class Candidate(TypedDict, total=False):
+    """A matched candidate as streamed by the providers, cached and returned by the API (see schema.CANDIDATE_FIELDS)."""
+    source_file: str
+    name: Optional[str]
+    contact_number: Optional[str]
+    last_3_companies: List[Optional[str]]
+    top_5_technical_skills: List[str]
+    years_of_experience: Optional[float]
+    match_score: float
+    score_breakdown: str
+    summary: str
+    duplicate_files: List[str]
+    near_duplicate_files: List[str]
+
+
+def _fallback(value: Any) -> Any:
+    # numpy scalars/arrays, sets and anything else: nearest JSON type, else str
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_fallback).encode('utf-8')
+
+
+def _stdlib_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+
+def _load_backend(name: str):
+    """(dumps, loads) for a backend, or None if it isn't installed."""
+    if name == 'orjson':
+        try:
+            import orjson  # type: ignore
+        except ImportError:
+            return None
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        return (lambda value: orjson.dumps(value, default=_fallback, option=options)), orjson.loads
+    if name == 'msgspec':
+        try:
+            import msgspec  # type: ignore
+        except ImportError:
+            return None
+        encoder, decoder = msgspec.json.Encoder(enc_hook=_fallback), msgspec.json.Decoder()
+        return encoder.encode, decoder.decode
+    return _stdlib_dumps, _stdlib_loads
+
+
+_backend_name = 'stdlib'
+_dumps: Callable[[Any], bytes] = _stdlib_dumps
+_loads: Callable[[Union[bytes, str]], Any] = _stdlib_loads
+
+
+def set_backend(name: str = 'auto') -> str:
+    """Select the serializer; returns the backend actually in use."""
+    global _backend_name, _dumps, _loads
+    name = (name or 'auto').lower()
+    order = BACKENDS if name not in BACKENDS else (name,) + tuple(b for b in BACKENDS if b != name)
+    for candidate in order:
+        functions = _load_backend(candidate)
+        if functions:
+            _backend_name, (_dumps, _loads) = candidate, functions
+            return candidate
+    return _backend_name
+
+
+def get_backend() -> str:
+    return _backend_name
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON."""
+    try:
+        return _dumps(value)
+    except Exception:
+        # The fast backends raise their own error types (e.g. ints beyond 64 bits)
+        if _dumps is _stdlib_dumps:
+            raise
+        return _stdlib_dumps(value)
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    try:
+        return _loads(data)
+    except Exception:
+        # e.g. NaN/Infinity tokens written by the stdlib encoder, which the fast parsers reject
+        if _loads is _stdlib_loads:
+            raise
+        return _stdlib_loads(data)
+
+
+set_backend('auto')
+
+__all__ = ['Candidate','BACKENDS','set_backend','get_backend','dumps','dumps_str','loads']
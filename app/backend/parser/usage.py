@@ -0,0 +1,124 @@
+"""Token usage and cost accounting.
+
+Token counts reported by the providers are priced per model (MODEL_PRICES,
+USD per 1M tokens: input, cached input, output) and recorded three ways:
+
+* per request and batch in cache_info (see providers/base.py),
+* per resume, as an estimated share stored with each cached profile,
+* per day and per corpus, accumulated in the KV store.
+
+Results served from cache report the tokens (and cost) it took to produce
+them as saved_* fields, so the effect of caching and filtering is visible.
+Batches whose provider reported no usage are counted in
+usage_unreported_batches, and their cost is None rather than 0.
+"""
+
+import datetime, threading
+from typing import Dict, List, Optional
+
+from .config import MODEL_PRICES
+from .cache import get_store
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+USAGE_NAMESPACE = 'usage'            # tokens spent producing a cached GenAI result, by cache key
+DAILY_NAMESPACE = 'usage_daily'      # totals per UTC day (YYYY-MM-DD)
+CORPUS_NAMESPACE = 'usage_corpus'    # totals per corpus id
+MAX_REPORT_DAYS = 366
+TOTAL_FIELDS = ('requests', 'prompt_tokens', 'cached_prompt_tokens', 'output_tokens', 'estimated_cost_usd',
+                'saved_prompt_tokens', 'saved_output_tokens', 'saved_cost_usd', 'usage_unreported_batches')
+
+_totals_lock = threading.Lock()
+
+
+def price_for(model: Optional[str]) -> Optional[List[float]]:
+    """[input, cached input, output] USD per 1M tokens for the longest matching model-name prefix."""
+    if not model:
+        return None
+    name = model.lower().split('/')[-1]   # "models/gemini-2.5-flash" -> "gemini-2.5-flash"
+    matches = [key for key in MODEL_PRICES if name.startswith(key.lower())]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, cached_tokens: int, output_tokens: int,
+                  factor: float = 1.0) -> Optional[float]:
+    """Estimated USD cost, or None if the model has no configured price."""
+    price = price_for(model)
+    if price is None:
+        return None
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return round((uncached * price[0] + cached_tokens * price[1] + output_tokens * price[2]) / 1e6 * factor, 6)
+
+
+def split_by_resume(resumes_data: dict, prompt_tokens: int, output_tokens: int, cost_usd: float) -> Dict[str, dict]:
+    """
+    Estimated share of a request's tokens per resume: prompt tokens in proportion to
+    each resume's text length, output tokens and cost split the same way.
+    """
+    total_chars = sum(len(text) for text in resumes_data.values())
+    if not resumes_data or not total_chars:
+        return {}
+    shares = {}
+    for filename, text in resumes_data.items():
+        weight = len(text) / total_chars
+        shares[filename] = {'prompt_tokens': round(prompt_tokens * weight), 'output_tokens': round(output_tokens * weight),
+                            'cost_usd': round((cost_usd or 0.0) * weight, 6)}
+    return shares
+
+
+def save_result_usage(cache_key: str, usage: dict):
+    """Remember what a cached GenAI result cost, so later cache hits can report the savings."""
+    try:
+        get_store().put(USAGE_NAMESPACE, cache_key, usage)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not save token usage: {e}")
+
+
+def get_result_usage(cache_key: str) -> Optional[dict]:
+    try:
+        return get_store().get(USAGE_NAMESPACE, cache_key)
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not read token usage: {e}")
+        return None
+
+
+def _add(totals: dict, cache_info: dict, by_model: bool) -> dict:
+    totals = {field: totals.get(field, 0) for field in TOTAL_FIELDS} | {'models': totals.get('models', {})}
+    totals['requests'] += 1
+    for field in TOTAL_FIELDS[1:]:
+        totals[field] = round(totals[field] + (cache_info.get(field) or 0), 6)
+    if by_model:
+        for model, usage in (cache_info.get('tokens_by_model') or {}).items():
+            entry = totals['models'].setdefault(model, {})
+            for field, value in usage.items():
+                entry[field] = round(entry.get(field, 0) + (value or 0), 6)
+    return totals
+
+
+def record_usage(cache_info: dict, corpus_id: Optional[str] = None):
+    """Add one request's token counts, cost and savings to today's and the corpus's totals."""
+    day = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+    try:
+        store = get_store()
+        with _totals_lock:
+            store.put(DAILY_NAMESPACE, day, _add(store.get(DAILY_NAMESPACE, day) or {}, cache_info, True))
+            if corpus_id:
+                store.put(CORPUS_NAMESPACE, corpus_id,
+                          _add(store.get(CORPUS_NAMESPACE, corpus_id) or {}, cache_info, True))
+    except Exception as e:
+        logger.warning(f"⚠️ Warning: Could not record token usage: {e}")
+
+
+def get_usage_report(days: int = 30) -> dict:
+    """Daily totals for the last `days` days (newest first, at most MAX_REPORT_DAYS) and totals per corpus."""
+    days = min(max(1, days), MAX_REPORT_DAYS)
+    store = get_store()
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    keys = [(today - datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+    daily = store.get_many(DAILY_NAMESPACE, keys)
+    corpora = store.get_many(CORPUS_NAMESPACE, [key for key, _, _ in store.entries(CORPUS_NAMESPACE)])
+    return {'daily': [{'date': key, **daily[key]} for key in keys if key in daily], 'corpora': corpora}
+
+__all__ = ['price_for','estimate_cost','split_by_resume','save_result_usage','get_result_usage','record_usage',
+           'get_usage_report']
@@ -1,25 +1,74 @@
 import os, hashlib, pickle
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 import faiss  # type: ignore
 from .config import (VECTOR_DB_DIR, SIMILARITY_THRESHOLD, MAX_VECTOR_RESULTS,
-                     ENABLE_VECTOR_SEARCH, get_embedding_model)
+                     ENABLE_VECTOR_SEARCH, PROMPT_TOP_K_CHUNKS, PROMPT_MAX_TOKENS_PER_RESUME,
+                     CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, get_embedding_model)
+from .cache_manager import get_cache_manager
+from .chunking import split_text_into_word_chunks, split_text_into_token_chunks, chunking_signature
+from .onnx_embedder import OnnxEmbedder
+from .embedding import encode_texts
+from .metrics import span
+from .log import get_logger
+
+logger = get_logger(__name__)
+
+# Per-resume chunk embeddings, keyed by content hash, shared by every index build
+EMBEDDING_CACHE_DIR = os.path.join(VECTOR_DB_DIR, "embeddings")
+os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+
+# Most recently loaded/created vector DB, so follow-up lookups in the same
+# request (e.g. prompt compression) don't re-read the index from disk. It is one
+# (path, index, metadata, chunk ids by filename) tuple that is only ever replaced
+# whole, so a concurrent request never pairs one corpus's index with another's metadata.
+_loaded_db: Optional[Tuple[str, object, list, Dict[str, List[int]]]] = None
 
 # Utilities
 
-def split_text_into_chunks(text: str, chunk_size: int = 512, overlap: int = 50) -> list:
-    """Split text into overlapping chunks for better semantic search."""
-    words = text.split()
-    chunks = []
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)."""
+    return max(1, len(text) // 4)
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate text on a word boundary so it fits within max_tokens."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def _chunking_params():
+    """(tokenizer, max_tokens) of the embedding model, or (None, None) if it exposes no tokenizer."""
+    embed_model = get_embedding_model()
+    tokenizer = getattr(embed_model, 'tokenizer', None)
+    if tokenizer is None:
+        return None, None
+    max_tokens = CHUNK_MAX_TOKENS or getattr(embed_model, 'max_seq_length', None) or 256
+    return tokenizer, max_tokens
 
-    for i in range(0, len(words), chunk_size - overlap):
-        chunk = ' '.join(words[i:i+chunk_size])
-        if chunk.strip():
-            chunks.append(chunk)
 
+def split_text_into_chunks(text: str) -> list:
+    """
+    Split text into overlapping chunks for better semantic search, sized to the
+    embedding model's max sequence length so no part of a chunk is truncated.
+    """
+    tokenizer, max_tokens = _chunking_params()
+    if tokenizer is None:
+        return split_text_into_word_chunks(text)
+    chunks = split_text_into_token_chunks(text, tokenizer, max_tokens, CHUNK_OVERLAP_TOKENS)
     return chunks if chunks else [text]
 
 
+def _index_signature() -> str:
+    """Embedding backend plus chunking scheme; cached embeddings and indexes are only reused when both match."""
+    tokenizer, max_tokens = _chunking_params()
+    backend = 'onnx' if isinstance(get_embedding_model(), OnnxEmbedder) else 'torch'
+    return f"{backend}|{chunking_signature(tokenizer, max_tokens, CHUNK_OVERLAP_TOKENS)}"
+
+
 def get_vector_db_path(resumes_data: dict) -> str:
     """Generate a unique vector database path based on resume content."""
     parts = []
@@ -27,82 +76,202 @@ def get_vector_db_path(resumes_data: dict) -> str:
         h = hashlib.md5(content.encode('utf-8')).hexdigest()[:8]
         parts.append(f"{filename}:{h}")
 
-    combined = '|'.join(parts)
+    combined = '|'.join(parts) + f"|{_index_signature()}"
     db_hash = hashlib.md5(combined.encode('utf-8')).hexdigest()
     return os.path.join(VECTOR_DB_DIR, f"resume_db_{db_hash}")
 
 
+def _embedding_key(content: str) -> str:
+    return hashlib.md5(f"{_index_signature()}|{content}".encode('utf-8')).hexdigest()
+
+
+def _embedding_cache_path(embedding_key: str) -> str:
+    return os.path.join(EMBEDDING_CACHE_DIR, embedding_key[:2], f"{embedding_key}.npy")
+
+
+def embed_resume_chunks(resumes_data: dict, force: bool=False) -> Dict[str, Tuple[List[str], np.ndarray]]:
+    """
+    Return {filename: (chunks, normalized float32 embeddings)}. Embeddings are
+    cached per resume content, so only new or changed resumes are encoded
+    (unless force is set).
+    """
+    embed_model = get_embedding_model()
+    manager = get_cache_manager('embeddings')
+    result: Dict[str, Tuple[List[str], np.ndarray]] = {}
+    pending: Dict[str, List[str]] = {}
+
+    with span('chunking', resumes=len(resumes_data)):
+        chunks_by_file = {filename: split_text_into_chunks(content) for filename, content in resumes_data.items()}
+
+    for filename, content in resumes_data.items():
+        chunks = chunks_by_file[filename]
+        embedding_key = _embedding_key(content)
+        cache_path = _embedding_cache_path(embedding_key)
+        if not force and manager.lookup(embedding_key) and os.path.exists(cache_path):
+            try:
+                cached = np.load(cache_path)
+                if cached.shape[0] == len(chunks):
+                    result[filename] = (chunks, cached)
+                    manager.record_hit(embedding_key)
+                    continue
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load cached embeddings for '{filename}': {e}")
+        manager.record_miss()
+        pending[filename] = chunks
+
+    if pending:
+        texts = [chunk for chunks in pending.values() for chunk in chunks]
+        logger.info(f"🔧 Generating embeddings for {len(texts)} text chunks ({len(pending)} new resume(s))...")
+        with span('embedding', chunks=len(texts)):
+            embeddings = encode_texts(texts)
+            faiss.normalize_L2(embeddings)
+
+        offset = 0
+        for filename, chunks in pending.items():
+            chunk_embeddings = embeddings[offset:offset+len(chunks)]
+            offset += len(chunks)
+            result[filename] = (chunks, chunk_embeddings)
+            embedding_key = _embedding_key(resumes_data[filename])
+            cache_path = _embedding_cache_path(embedding_key)
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                np.save(cache_path, chunk_embeddings)
+                manager.record_put(embedding_key, os.path.getsize(cache_path))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not cache embeddings for '{filename}': {e}")
+
+    # Preserve the caller's ordering
+    return {filename: result[filename] for filename in resumes_data if filename in result}
+
+
+def precompute_embeddings(resumes_data: dict) -> int:
+    """Warm the per-resume embedding cache. Returns the number of resumes covered."""
+    if not get_embedding_model() or not resumes_data:
+        return 0
+    return len(embed_resume_chunks(resumes_data))
+
+
+def _remember_db(db_path: str, index, metadata: list) -> tuple:
+    """Make this DB the loaded one; returns its (path, index, metadata, chunk ids by filename) tuple."""
+    global _loaded_db
+    chunk_ids: Dict[str, List[int]] = {}
+    for idx, meta in enumerate(metadata):
+        chunk_ids.setdefault(meta['filename'], []).append(idx)
+    _loaded_db = loaded = (db_path, index, metadata, chunk_ids)
+    return loaded
+
+
 def create_vector_database(resumes_data: dict, force_rebuild: bool=False):
     """Create FAISS vector database from resume content."""
+    loaded, cache_hit = _open_vector_database(resumes_data, force_rebuild)
+    if loaded is None:
+        return None, None, False
+    return loaded[1], loaded[2], cache_hit
+
+
+def _open_vector_database(resumes_data: dict, force_rebuild: bool=False) -> Tuple[Optional[tuple], bool]:
+    """The loaded-DB tuple for these resumes (see _loaded_db), reused, read from disk or built, and whether it was cached."""
     embed_model = get_embedding_model()
     if not embed_model:
-        return None, None, False
+        return None, False
     
     db_path = get_vector_db_path(resumes_data)
+    db_key = os.path.basename(db_path)
+    manager = get_cache_manager('vector')
+
+    loaded = _loaded_db   # read once: another request may replace it meanwhile
+    if not force_rebuild and loaded is not None and loaded[0] == db_path and manager.lookup(db_key):
+        manager.record_hit(db_key)
+        return loaded, True
 
     # Check if vector DB already exists (unless force rebuild is requested)
-    if (not force_rebuild and
+    if (not force_rebuild and manager.lookup(db_key) and
         os.path.exists(f"{db_path}.index") and os.path.exists(f"{db_path}_metadata.pkl")):
         try:
             # Load existing vector database
             index = faiss.read_index(f"{db_path}.index")
             with open(f"{db_path}_metadata.pkl", 'rb') as f: 
                 metadata = pickle.load(f)
-            print(f"📂 Loaded existing vector database: {os.path.basename(db_path)}")
-            return index, metadata, True
+            logger.info(f"📂 Loaded existing vector database: {os.path.basename(db_path)}")
+            manager.record_hit(db_key)
+            return _remember_db(db_path, index, metadata), True
         except Exception as e:
-            print(f"⚠️ Could not load existing vector DB: {e}")
+            logger.warning(f"⚠️ Could not load existing vector DB: {e}")
+    manager.record_miss()
 
-    print("🔥 Force rebuild requested - creating new vector database..." if force_rebuild else "🔧 Creating vector database from resumes...")
+    logger.info("🔥 Force rebuild requested - creating new vector database..." if force_rebuild else "🔧 Creating vector database from resumes...")
     
-    # Create new vector database
-    texts, metadata = [], []
+    # Create new vector database from per-resume chunk embeddings (cached by content hash)
+    chunked = embed_resume_chunks(resumes_data, force=force_rebuild)
+    texts, metadata, vectors = [], [], []
 
-    for filename, content in resumes_data.items():
-        # Split content into chunks for better semantic search
-        for i, chunk in enumerate(split_text_into_chunks(content)):
+    for filename, (chunks, chunk_embeddings) in chunked.items():
+        for i, chunk in enumerate(chunks):
             texts.append(chunk)
             metadata.append({
                 'filename': filename,
                 'chunk_id': i,
                 'content': chunk
             })
+        vectors.append(chunk_embeddings)
 
     if not texts:
-        print("❌ No text content to vectorize")
-        return None, None, False
-    
-    # Generate embeddings
-    print(f"🔧 Generating embeddings for {len(texts)} text chunks...")
-    embeddings = embed_model.encode(texts, show_progress_bar=False)
+        logger.error("❌ No text content to vectorize")
+        return None, False
+    embeddings = np.vstack(vectors).astype(np.float32)
 
-    # Create FAISS index
+    # Create FAISS index (embeddings are already L2-normalized for cosine similarity)
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-
-    # Normalize embeddings for cosine similarity
-    faiss.normalize_L2(embeddings)
-    index.add(embeddings.astype(np.float32))
+    with span('index_build', vectors=len(texts)):
+        index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+        index.add(embeddings)
 
     # Save vector database
     try:
         faiss.write_index(index, f"{db_path}.index")
         with open(f"{db_path}_metadata.pkl", 'wb') as f: 
             pickle.dump(metadata, f)
-        print(f"💾 Vector database saved: {os.path.basename(db_path)}")
+        logger.info(f"💾 Vector database saved: {os.path.basename(db_path)}")
+        manager.record_put(db_key, os.path.getsize(f"{db_path}.index") + os.path.getsize(f"{db_path}_metadata.pkl"))
     except Exception as e:
-        print(f"⚠️ Could not save vector DB: {e}")
+        logger.warning(f"⚠️ Could not save vector DB: {e}")
+
+    return _remember_db(db_path, index, metadata), False  # False indicates new database created
+
+
+def _skills_query(required_skills: List[str]) -> str:
+    return f"Required skills and experience: {', '.join(required_skills)}"
+
+
+def _embed_query(embed_model, required_skills: List[str]) -> np.ndarray:
+    with span('embedding', chunks=1):
+        query_embedding = embed_model.encode([_skills_query(required_skills)])
+        faiss.normalize_L2(query_embedding)
+    return query_embedding
+
 
-    return index, metadata, False  # False indicates new database created
+def embed_skill_queries(skill_sets: List[List[str]]) -> Optional[np.ndarray]:
+    """Embed many skill queries in one length-bucketed batch (one normalized row per query), or None without a model."""
+    if not get_embedding_model() or not skill_sets:
+        return None
+    with span('embedding', chunks=len(skill_sets)):
+        embeddings = encode_texts([_skills_query(skills) for skills in skill_sets])
+        faiss.normalize_L2(embeddings)
+    return embeddings
 
 
-def semantic_search_resumes(required_skills: List[str], resumes_data: dict, top_k: int=None, similarity_threshold: float=None, force_analyze: bool=False):
-    """Perform semantic search to filter resumes based on required skills."""
+def semantic_search_resumes(required_skills: List[str], resumes_data: dict, top_k: int=None, similarity_threshold: float=None, force_analyze: bool=False,
+                            query_embedding: np.ndarray=None):
+    """
+    Perform semantic search to filter resumes based on required skills.
+    query_embedding (shape (1, dim), normalized) skips encoding the query, e.g. when
+    a batch of queries was embedded up front with embed_skill_queries.
+    """
     vector_cache_hit = False
     
     embed_model = get_embedding_model()
     if not embed_model:
-        print("⚠️ Vector search disabled - returning all resumes")
+        logger.warning("⚠️ Vector search disabled - returning all resumes")
         return resumes_data, vector_cache_hit
     
     if not required_skills or not resumes_data:
@@ -117,16 +286,16 @@ def semantic_search_resumes(required_skills: List[str], resumes_data: dict, top_
     # Create or load vector database
     index, metadata, vector_cache_hit = create_vector_database(resumes_data, force_analyze)
     if not index or not metadata:
-        print("❌ Could not create vector database - returning all resumes")
+        logger.error("❌ Could not create vector database - returning all resumes")
         return resumes_data, False
 
-    skills_query = f"Required skills and experience: {', '.join(required_skills)}"
-    print(f"🔍 Performing semantic search for: {skills_query}")
-    query_embedding = embed_model.encode([skills_query])
-    faiss.normalize_L2(query_embedding)
+    logger.info(f"🔍 Performing semantic search for: {_skills_query(required_skills)}")
+    if query_embedding is None:
+        query_embedding = _embed_query(embed_model, required_skills)
 
     search_k = min(len(metadata), top_k if top_k else len(metadata))
-    scores, indices = index.search(query_embedding.astype(np.float32), search_k)
+    with span('faiss_search', k=search_k):
+        scores, indices = index.search(query_embedding.astype(np.float32), search_k)
 
     resume_scores = {}
     for score, idx in zip(scores[0], indices[0]):
@@ -139,17 +308,87 @@ def semantic_search_resumes(required_skills: List[str], resumes_data: dict, top_
         avg_score = sum(scores_list) / len(scores_list)
         if avg_score >= similarity_threshold:
             filtered_resumes[filename] = resumes_data[filename]
-            print(f"  ✅ {filename} (similarity: {avg_score:.3f})")
+            logger.debug(f"  ✅ {filename} (similarity: {avg_score:.3f})", extra={'file': filename, 'similarity': round(float(avg_score), 3)})
 
     if filtered_resumes:
-        print(f"🎯 Vector search filtered {len(resumes_data)} → {len(filtered_resumes)} resumes")
+        logger.info(f"🎯 Vector search filtered {len(resumes_data)} → {len(filtered_resumes)} resumes",
+                    extra={'resumes': len(resumes_data), 'matched': len(filtered_resumes)})
         return filtered_resumes, vector_cache_hit
-    print(f"⚠️ No resumes met similarity threshold ({similarity_threshold}) - returning all resumes")
+    logger.warning(f"⚠️ No resumes met similarity threshold ({similarity_threshold}) - returning all resumes")
     return resumes_data, vector_cache_hit
 
 
+def compress_resumes_for_prompt(required_skills: List[str], resumes_data: dict, corpus_data: dict=None,
+                                top_k: int=None, max_tokens: int=None, query_embedding: np.ndarray=None) -> dict:
+    """
+    Reduce each resume to its header chunk plus the top-k chunks most similar
+    to the skill query, capped at max_tokens per resume.
+
+    corpus_data is the full resume set the vector DB was built from, so the
+    existing index (and its chunk embeddings) is reused instead of re-encoding.
+    """
+    embed_model = get_embedding_model()
+    if not embed_model or not resumes_data:
+        return resumes_data
+
+    if top_k is None:
+        top_k = PROMPT_TOP_K_CHUNKS
+    if max_tokens is None:
+        max_tokens = PROMPT_MAX_TOKENS_PER_RESUME
+
+    loaded, _ = _open_vector_database(corpus_data or resumes_data)
+    if loaded is None or not loaded[2]:
+        logger.warning("⚠️ No vector database available - sending full resume text")
+        return resumes_data
+    _, index, metadata, chunk_ids = loaded
+
+    if query_embedding is None:
+        query_embedding = _embed_query(embed_model, required_skills)
+    chunks_by_file = {filename: chunk_ids[filename] for filename in resumes_data if filename in chunk_ids}
+    ids = np.fromiter((i for file_ids in chunks_by_file.values() for i in file_ids), dtype=np.int64)
+    # IndexFlatIP keeps raw (normalized) vectors: reconstruct only these resumes' chunks and score them in one matmul
+    with span('faiss_search', k=len(ids)):
+        scores = index.reconstruct_batch(ids) @ query_embedding[0].astype(np.float32) if len(ids) else []
+        chunk_scores = dict(zip(ids.tolist(), np.asarray(scores).tolist()))
+
+    compressed = {}
+    original_tokens = compressed_tokens = 0
+    for filename, text in resumes_data.items():
+        original_tokens += estimate_tokens(text)
+        chunk_ids = chunks_by_file.get(filename)
+        if not chunk_ids:
+            compressed[filename] = _truncate_to_tokens(text, max_tokens)
+            compressed_tokens += estimate_tokens(compressed[filename])
+            continue
+
+        header_id = min(chunk_ids, key=lambda i: metadata[i]['chunk_id'])
+        ranked = sorted((i for i in chunk_ids if i != header_id), key=lambda i: chunk_scores[i], reverse=True)
+
+        # Header first (name, contact details), then the best matching chunks, until the budget runs out
+        selected, budget = {}, max_tokens
+        for idx in [header_id] + ranked[:top_k]:
+            if budget <= 0:
+                break
+            chunk = _truncate_to_tokens(metadata[idx]['content'], budget)
+            selected[idx] = chunk
+            budget -= estimate_tokens(chunk)
+
+        # Keep the excerpts in document order so the timeline still reads naturally
+        ordered = sorted(selected, key=lambda i: metadata[i]['chunk_id'])
+        compressed[filename] = "\n[...]\n".join(selected[i] for i in ordered)
+        compressed_tokens += estimate_tokens(compressed[filename])
+
+    if original_tokens:
+        reduction_pct = (1 - compressed_tokens / original_tokens) * 100
+        logger.info(f"✂️ Prompt compression: ~{original_tokens:,} → ~{compressed_tokens:,} tokens ({reduction_pct:.1f}% reduction)")
+    return compressed
+
+
 def clear_vector_cache():
-    # Placeholder - vector cache cleared externally by deleting files
-    pass
+    # Vector DB files are deleted externally; only drop in-memory state here
+    global _loaded_db
+    _loaded_db = None
+    get_cache_manager('vector').reset()
+    get_cache_manager('embeddings').reset()
 
-__all__ = ['semantic_search_resumes','clear_vector_cache']
+__all__ = ['semantic_search_resumes','compress_resumes_for_prompt','embed_skill_queries','estimate_tokens','precompute_embeddings','clear_vector_cache']
@@ -9,6 +9,53 @@ import time
 import json
 from parser import ResumeParser  # type: ignore
 
+def test_prompt_prefix_stability():
+    """The prompt prefix (instructions + query) must be byte-identical across batches so providers can cache it."""
+    from parser.prompt import PROMPT_INSTRUCTIONS, construct_query_section  # type: ignore
+    from parser.providers.base import process_batch, split_into_batches  # type: ignore
+
+    skills = ["Python", "SQL", "AWS"]
+    resumes = {f"resume_{i}.txt": f"Candidate {i}\nSkills: Python, SQL\nExperience: {i} years" for i in range(7)}
+    sent = []
+
+    def record(instructions, request, output_mode):
+        sent.append((instructions + request).encode('utf-8'))
+        yield "[]"
+
+    for batch_num, batch in enumerate(split_into_batches(resumes, 3), 1):
+        process_batch("test", record, batch, skills, batch_num, 3)
+
+    prefix = (PROMPT_INSTRUCTIONS + construct_query_section(skills)).encode('utf-8')
+    assert len(sent) == 3
+    assert all(prompt.startswith(prefix) for prompt in sent), "prompt prefix differs between batches"
+    assert len({prompt[len(prefix):] for prompt in sent}) == 3, "batches should differ only after the prefix"
+    # Instructions must not depend on the query
+    assert construct_query_section(["Java"]).encode('utf-8') not in PROMPT_INSTRUCTIONS.encode('utf-8')
+    assert "Python" not in PROMPT_INSTRUCTIONS
+    print(f"✅ Prompt prefix is byte-stable across batches ({len(prefix)} bytes)")
+
+def test_json_stream_truncated():
+    """A response cut off mid-object must not count as a finished batch, whatever arrays it contains."""
+    from parser.json_stream import JsonArrayStream  # type: ignore
+
+    def run(chunks):
+        stream = JsonArrayStream()
+        items = [item for chunk in chunks for item in stream.feed(chunk)]
+        return items + stream.close(), stream.complete
+
+    # Bare candidate object cut off after a list field
+    assert run(['{"source_file":"a","last_3_companies":', '["x"]']) == ([], False)
+    # Wrapped array cut off inside the second item
+    items, complete = run(['{"r":[{"source_file":"a","last_3_companies":["x"]},', '{"source_file":"b","last_3'])
+    assert [i['source_file'] for i in items] == ["a"] and not complete
+    # Bare array cut off inside an item's list field
+    assert run(['[{"source_file":"a","last_3_companies":["x"]', ']']) == ([], False)
+    # Complete responses still finish
+    assert run(['```json\n{"candidates": [{"source_file":"a","skills":["x"]}]}\n```'])[1]
+    assert run(['[]']) == ([], True)
+    assert run(['{"source_file":"a","last_3_companies":["x"]}']) == ([{"source_file": "a", "last_3_companies": ["x"]}], True)
+    print("✅ Truncated JSON responses are never reported complete")
+
 def test_performance():
     """Test the performance of the resume parser with different dataset sizes."""
     
@@ -136,4 +183,6 @@ def test_performance():
         print("   • Monitor memory usage for datasets larger than 1000 resumes")
 
 if __name__ == "__main__":
+    test_prompt_prefix_stability()
+    test_json_stream_truncated()
     test_performance()
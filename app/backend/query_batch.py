@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Score many skill queries (e.g. a week's requisitions) against one resume corpus.
+
+The corpus is read and indexed once and all queries are embedded together;
+queries with the same skills share one search and one set of LLM batches.
+Results are written as JSONL, one line per query with its candidates, token
+counts and timings.
+
+Usage:
+  python query_batch.py --queries requisitions.csv --dir ../../resumes --out results.jsonl
+  python query_batch.py --queries requisitions.jsonl --corpus <corpus_id> --out results.jsonl [--force]
+
+CSV files need a header with a 'skills' (or 'query') column and may have an 'id'
+column; JSONL lines look like {"id": "REQ-12", "skills": "Python, SQL"}.
+"""
+
+import sys
+import argparse
+from parser.query_batch import read_queries, run_query_batch, write_results  # type: ignore
+from parser.log import flush_logging  # type: ignore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many skill queries against one corpus")
+    parser.add_argument("--queries", required=True, help="CSV or JSONL file of queries")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", action="append", help="resume directory (repeatable)")
+    source.add_argument("--corpus", help="registered corpus id")
+    parser.add_argument("--out", required=True, help="JSONL results file")
+    parser.add_argument("--force", action="store_true", help="bypass caches and rebuild the vector index")
+    args = parser.parse_args()
+
+    print("📋 Batch Queries")
+    print("=" * 50)
+    try:
+        queries = read_queries(args.queries)
+        if not queries:
+            print(f"❌ No queries found in '{args.queries}'")
+            return 1
+        summary = {}
+        count = write_results(run_query_batch(queries, args.dir, args.corpus, args.force, summary), args.out)
+    except (OSError, ValueError) as e:
+        flush_logging()
+        print(f"❌ {e}")
+        return 1
+
+    flush_logging()
+    print(f"\n✅ Wrote {count} result(s) to {args.out}")
+    print(f"   • {summary['skill_sets']} distinct skill set(s) for {summary['queries']} quer(ies), "
+          f"{summary['resumes']} resume(s) in corpus {summary['corpus_id']}")
+    print(f"   • Corpus read {summary['load_seconds']}s, index {summary['index_seconds']}s, "
+          f"query embedding {summary['query_embedding_seconds']}s, total {summary['total_seconds']}s")
+    print(f"   • Tokens: {summary['prompt_tokens']} prompt, {summary['output_tokens']} output, "
+          f"~${summary['estimated_cost_usd']:.4f}")
+    if summary['near_duplicate_files']:
+        print(f"   • Near-duplicates: {summary['near_duplicate_files']} older version(s) skipped, "
+              f"{summary['llm_resumes_saved']} LLM resume slot(s) saved")
+    if summary['normalization_chars_saved']:
+        print(f"   • Text normalization: {summary['normalization_chars_saved']:,} chars "
+              f"(~{summary['normalization_tokens_saved']:,} tokens) removed from the corpus")
+    if summary['failed']:
+        print(f"   ⚠️ {summary['failed']} quer(ies) failed; see the 'error' field")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the JSON serializers behind the KV store and API responses.
+Round-trips one cached result of 5,000 candidates (configurable) through every
+installed backend (orjson, msgspec, stdlib), the legacy json.dump(indent=2)
+cache format, and the KV store's compressed blob encoding.
+
+Usage: python serialization_benchmark.py [--candidates 5000] [--repeat 20]
+"""
+
+import sys
+import json
+import time
+import argparse
+from parser import serialization  # type: ignore
+from parser.kv_store import encode_value, decode_value  # type: ignore
+
+
+def sample_result(count: int) -> list:
+    """A cached GenAI result with count matched candidates of typical size."""
+    return [{
+        "source_file": f"resume_{i}.pdf",
+        "name": f"Candidate {i}",
+        "contact_number": "+1 555 0100",
+        "last_3_companies": ["Contoso", "Fabrikam", "Northwind"],
+        "top_5_technical_skills": ["Python", "FastAPI", "SQL", "Docker", "AWS"],
+        "years_of_experience": i % 20,
+        "match_score": i % 100,
+        "score_breakdown": "Strong Python and API experience; cloud deployment exposure. " * 2,
+        "summary": "Backend engineer with experience building data pipelines and REST services. " * 8,
+    } for i in range(count)]
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-repeat seconds for one call."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label: str, encode, decode, repeat: int):
+    blob = encode()
+    assert decode(blob) is not None
+    enc, dec = timed(encode, repeat), timed(lambda: decode(blob), repeat)
+    print(f"  {label:<22} encode {enc * 1e3:7.2f}ms  decode {dec * 1e3:7.2f}ms  "
+          f"round trip {(enc + dec) * 1e3:7.2f}ms  {len(blob) / (1024 * 1024):5.2f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serializer round-trip benchmark")
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20, help="best of N runs per measurement")
+    args = parser.parse_args()
+
+    print("🧪 Serialization Benchmark")
+    print("=" * 50)
+    result = sample_result(args.candidates)
+    print(f"\n📦 {args.candidates:,} candidates")
+
+    report("json indent=2 (legacy)", lambda: json.dumps(result, indent=2, ensure_ascii=False),
+           json.loads, args.repeat)
+    active = serialization.get_backend()
+    for backend in serialization.BACKENDS:
+        if serialization.set_backend(backend) != backend:
+            print(f"  {backend:<22} not installed")
+            continue
+        report(backend, lambda: serialization.dumps(result), serialization.loads, args.repeat)
+        report(f"{backend} + KV blob", lambda: encode_value(result), decode_value, args.repeat)
+    serialization.set_backend(active)
+    print(f"\nActive backend (JSON_BACKEND): {active}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
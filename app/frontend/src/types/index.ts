@@ -8,6 +8,8 @@ export interface Resume {
   years_of_experience?: number;
   score_breakdown?: string;
   summary?: string;
+  duplicate_files?: string[];
+  near_duplicate_files?: string[];
 }
 
 export interface CacheInfo {
@@ -19,13 +21,51 @@ export interface CacheInfo {
   processing_time?: number;
   total_batches?: number;
   batches_processed?: number;
+  corpus_id?: string;
+  duplicate_files?: number;
+  near_duplicate_files?: number;
+  near_duplicate_rate?: number;
+  llm_resumes_saved?: number;
+  normalization_chars_saved?: number;
+  normalization_tokens_saved?: number;
+  normalization_rate?: number;
+  prompt_tokens?: number;
+  cached_prompt_tokens?: number;
+  output_tokens?: number;
+  output_mode?: 'full' | 'compact';
+  avg_batch_seconds?: number;
+  providers?: Record<string, number>;
+  trace_id?: string;
+  phase_seconds?: Record<string, number>;
+  estimated_cost_usd?: number;
+  tokens_per_resume?: number | null;
+  tokens_by_model?: Record<string, { prompt_tokens: number; cached_prompt_tokens: number; output_tokens: number; cost_usd: number | null }>;
+  saved_prompt_tokens?: number;
+  saved_output_tokens?: number;
+  saved_cost_usd?: number;
 }
 
 export interface ParseResumeResponse {
   result: Resume[];
+  result_id?: string | null;
   cache_info: CacheInfo;
 }
 
+export interface ResultPage {
+  result_id: string;
+  query: string;
+  corpus_id?: string;
+  created: number;
+  total: number;
+  matched: number;
+  offset: number;
+  limit: number;
+  next_offset: number | null;
+  sort: 'match_score' | 'years_of_experience';
+  order: 'asc' | 'desc';
+  result: Partial<Resume>[];
+}
+
 export interface ScanProfilesResponse {
   message: string;
   result: {